@@ -0,0 +1,4 @@
+# Standalone benchmarks, run from the project root, e.g.
+# python -m src.email_management.benchmarks.bench_smtp_pool
+# Importing the package creates the Supabase client, so SUPABASE_URL and
+# SUPABASE_KEY must be set; the benchmarks swap in an in-memory stand-in.
@@ -0,0 +1,186 @@
+"""
+Precision and recall of the rule-based bounce / auto-reply detection on a
+labelled corpus, against the body patterns it had before, plus throughput.
+
+    python -m src.email_management.benchmarks.bench_auto_reply_classifier
+
+The corpus mixes real-world shaped notices (Exchange, Gmail, Postfix NDRs,
+out-of-office replies in en/de/nl/es) with human replies that use the same
+words ("I'm away next week", "my email wasn't delivered"). A human reply
+classified as a notice is never answered, so precision matters most.
+"""
+
+import argparse
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.email_management.src.lib.auto_reply_classifier import (
+    AUTO_REPLY, BOUNCE, _body_start, classify_auto_reply
+)
+
+HUMAN = None
+DSN = {'content-type': 'multipart/report; report-type=delivery-status; boundary="b1"'}
+AUTO = {'auto-submitted': 'auto-replied'}
+AUTO_GENERATED = {'auto-submitted': 'auto-generated'}
+EXCHANGE_OOF = {'x-auto-response-suppress': 'All'}
+
+# (label, headers, sender local part, subject, body)
+CORPUS: List[Tuple[Optional[str], Dict[str, str], str, str, str]] = [
+    # Bounces with DSN headers or daemon senders
+    (BOUNCE, DSN, 'mailer-daemon', 'Undelivered Mail Returned to Sender',
+     'This is the mail system at host mx.example.com. I\'m sorry to have to inform you that your message '
+     'could not be delivered to one or more recipients.'),
+    (BOUNCE, {}, 'postmaster', 'Undeliverable: Quick question about automation',
+     'Delivery has failed to these recipients or groups: lead@example.com'),
+    (BOUNCE, {'x-failed-recipients': 'lead@example.com'}, 'mail', 'Mail failure',
+     'A message that you sent could not be delivered to one or more of its recipients.'),
+    (BOUNCE, {}, 'microsoftexchange329e71ec88ae4615bbc36ab6ce41109e', 'Quick question',
+     'Your message to lead@example.com couldn\'t be delivered.'),
+    (BOUNCE, DSN, 'mailer-daemon', 'Delivery Status Notification (Failure)',
+     'Address not found. Your message wasn\'t delivered to lead@example.com because the address '
+     'couldn\'t be found, or is unable to receive mail.'),
+    (BOUNCE, {}, 'postmaster', 'Unzustellbar: Kurze Frage',
+     'Ihre Nachricht konnte nicht zugestellt werden. Die folgenden Empfänger konnten nicht erreicht werden.'),
+    (BOUNCE, {}, 'mailer-daemon', 'Onbestelbaar: Korte vraag',
+     'Uw bericht kon niet worden bezorgd aan lead@example.nl.'),
+    # Bounces recognizable only by their content
+    (BOUNCE, {}, 'mail', 'Returned',
+     'Remote Server returned \'550 5.1.1 RESOLVER.ADR.RecipNotFound; not found\''),
+    (BOUNCE, {}, 'notifications', 'Your message',
+     'The following recipient address rejected your message: <lead@example.com>: Recipient address rejected: '
+     'User unknown in virtual mailbox table'),
+    (BOUNCE, AUTO_GENERATED, 'mail', 'Message status',
+     'Your message to lead@example.com could not be delivered. The mailbox is full.'),
+    (BOUNCE, {}, 'support', 'Fwd: message',
+     'Delivery Status Notification. 550-5.1.1 The email account that you tried to reach does not exist.'),
+    (BOUNCE, {}, 'servidor', 'Error',
+     'No se pudo entregar el mensaje. Dirección no encontrada: lead@example.es'),
+    # Auto-replies with headers or subjects
+    (AUTO_REPLY, AUTO, 'jan', 'Automatic reply: Quick question about automation',
+     'I am out of the office until 12 May.'),
+    (AUTO_REPLY, EXCHANGE_OOF, 'maria', 'Re: Quick question',
+     'Thank you for your message. I am on annual leave.'),
+    (AUTO_REPLY, {'precedence': 'auto_reply'}, 'tom', 'Re: Quick question', 'Away until Monday.'),
+    (AUTO_REPLY, {}, 'noreply', 'Your request has been received', 'We will get back to you shortly.'),
+    (AUTO_REPLY, {}, 'peter', 'Abwesenheitsnotiz: Kurze Frage', 'Ich bin bis zum 3. Juni nicht im Büro.'),
+    (AUTO_REPLY, {}, 'sanne', 'Afwezig: Korte vraag', 'Ik ben afwezig tot maandag.'),
+    (AUTO_REPLY, {}, 'lucia', 'Respuesta automática: Pregunta rápida', 'Estoy fuera de la oficina.'),
+    # Auto-replies recognizable only by their content
+    (AUTO_REPLY, {}, 'jane', 'Re: Quick question about automation',
+     'Thank you for your email. I am currently out of the office with limited access to email. '
+     'I will respond upon my return on Monday 14 October.'),
+    (AUTO_REPLY, {}, 'mark', 'Re: Quick question about invoices',
+     'I\'m on vacation until 20 August. For urgent matters please contact support@example.com.'),
+    (AUTO_REPLY, {}, 'erik', 'Re: Quick question',
+     'This is an automatic reply. I am away and will get back to you when I\'m back.'),
+    (AUTO_REPLY, {}, 'klaus', 'AW: Kurze Frage',
+     'Vielen Dank für Ihre Nachricht. Ich bin derzeit nicht im Büro. In dringenden Fällen wenden Sie sich '
+     'bitte an meine Kollegin.'),
+    (AUTO_REPLY, {}, 'anke', 'AW: Kurze Frage',
+     'Ich bin im Urlaub und habe eingeschränkten Zugriff auf meine E-Mails.'),
+    (AUTO_REPLY, {}, 'dirk', 'RE: Korte vraag',
+     'Ik ben momenteel niet op kantoor. In dringende gevallen kunt u contact opnemen met de receptie.'),
+    (AUTO_REPLY, {}, 'pablo', 'RE: Pregunta rápida',
+     'Estoy de vacaciones. Responderé a mi regreso. En caso de urgencia contacte con info@example.es.'),
+    (AUTO_REPLY, {}, 'lisa', 'Re: Quick question about hiring',
+     'This is an automated response. Your email has been received and will be answered within two days.'),
+    (AUTO_REPLY, {}, 'bram', 'RE: Korte vraag', 'Dit is een automatisch antwoord. Ik ben met vakantie.'),
+    # Human replies, including wording the old body patterns took for notices
+    (HUMAN, {}, 'jane', 'Re: Quick question about automation',
+     'Hi, I\'m away next week but happy to talk after. Does Tuesday the 22nd work?'),
+    (HUMAN, {}, 'mark', 'Re: Quick question about invoices',
+     'Thanks! I think my earlier email wasn\'t delivered, resending the invoice list below.'),
+    (HUMAN, {}, 'tom', 'Re: Quick question',
+     'Sorry for the late answer, I was on holiday. I\'m away again from Friday, so let\'s speak Thursday.'),
+    (HUMAN, {}, 'anna', 'Re: Quick question about hiring',
+     'We tried that tool, but half of the notifications could not be delivered to our team. Not interested.'),
+    (HUMAN, {}, 'klaus', 'AW: Kurze Frage',
+     'Ich bin im Urlaub, aber Ihr Angebot klingt interessant. Rufen Sie mich nächste Woche an.'),
+    (HUMAN, {}, 'dirk', 'RE: Korte vraag',
+     'Ik ben afwezig op vrijdag, maar donderdag kan ik bellen. Het pakket kon niet worden bezorgd bij ons, '
+     'dus dat is precies ons probleem.'),
+    (HUMAN, {}, 'pablo', 'RE: Pregunta rápida',
+     'Estoy de vacaciones hasta el lunes, pero me interesa. ¿Podemos hablar el martes?'),
+    (HUMAN, {}, 'erik', 'Re: Quick question',
+     'Our shipments often couldn\'t be delivered on time, that\'s the real issue. How does your system help?'),
+    (HUMAN, {}, 'lisa', 'Re: Quick question about AI',
+     'I\'m on leave until June, but my colleague Sam can take a look. Looping them in.'),
+    (HUMAN, {}, 'sanne', 'Re: Korte vraag', 'Graag! Wanneer kunnen we bellen?'),
+    (HUMAN, {}, 'paul', 'Re: Quick question about support',
+     'Not interested, please remove me from your list.'),
+    (HUMAN, {}, 'ines', 'Re: Quick question',
+     'I\'m out of the office this afternoon, can you send the pricing? We had delivery has failed errors '
+     'with our current provider all month.'),
+]
+
+# Body patterns before they were tightened
+LEGACY_AUTO_REPLY_BODY = re.compile(
+    r"(?:i am|i'm|i will be) (?:currently )?(?:out of (?:the )?office|away|on (?:annual )?leave|on vacation|on holiday)|"
+    r"limited access to (?:my )?e-?mail|"
+    r"(?:ich bin|bin ich) (?:derzeit |momentan |bis [^.]{0,40})?(?:nicht im b(?:ü|ue)ro|abwesend|im urlaub|au(?:ß|ss)er haus)|"
+    r"ik ben (?:momenteel |tot [^.]{0,40})?(?:afwezig|niet aanwezig|met vakantie|niet op kantoor)|"
+    r"(?:estoy|estar(?:é|e)) (?:actualmente )?(?:fuera de la oficina|ausente|de vacaciones)",
+    re.IGNORECASE
+)
+LEGACY_BOUNCE_BODY = re.compile(
+    r"(?:couldn't|could not|wasn't|was not) (?:be )?delivered|delivery has failed|"
+    r"message (?:could not|couldn't) be delivered|recipient address rejected|"
+    r"konnte nicht zugestellt werden|kon niet worden bezorgd|no se pudo entregar",
+    re.IGNORECASE
+)
+
+
+def legacy_classify(headers, sender, subject, body):
+    """Header, sender and subject checks as now, then the old body patterns"""
+    label = classify_auto_reply(headers, sender, subject, None)
+    if label is not None:
+        return label
+    text = _body_start(body)
+    if LEGACY_BOUNCE_BODY.search(text):
+        return BOUNCE
+    if LEGACY_AUTO_REPLY_BODY.search(text):
+        return AUTO_REPLY
+    return None
+
+
+def scores(classify) -> Dict[str, Tuple[float, float]]:
+    predictions = [(label, classify(headers, sender, subject, body))
+                   for label, headers, sender, subject, body in CORPUS]
+    result = {}
+    for cls in (BOUNCE, AUTO_REPLY):
+        tp = sum(1 for label, predicted in predictions if label == cls and predicted == cls)
+        fp = sum(1 for label, predicted in predictions if label != cls and predicted == cls)
+        fn = sum(1 for label, predicted in predictions if label == cls and predicted != cls)
+        result[cls] = (tp / (tp + fp) if tp + fp else 1.0, tp / (tp + fn) if tp + fn else 1.0)
+    humans = [predicted for label, predicted in predictions if label is HUMAN]
+    result['human kept'] = (sum(1 for predicted in humans if predicted is None) / len(humans), None)
+    return result
+
+
+def throughput(classify, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for _, headers, sender, subject, body in CORPUS:
+            classify(headers, sender, subject, body)
+    return rounds * len(CORPUS) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    counts = {name: sum(1 for label, *_ in CORPUS if label == cls)
+              for name, cls in (('bounce', BOUNCE), ('auto_reply', AUTO_REPLY), ('human', HUMAN))}
+    print(f"{len(CORPUS)} messages: " + ', '.join(f"{count} {name}" for name, count in counts.items()))
+    print(f"{'rules':>8} {'bounce P/R':>12} {'auto P/R':>12} {'human kept':>11} {'msg/s':>9}")
+    for name, classify in (('legacy', legacy_classify), ('current', classify_auto_reply)):
+        result = scores(classify)
+        (bounce_p, bounce_r), (auto_p, auto_r) = result[BOUNCE], result[AUTO_REPLY]
+        print(f"{name:>8} {bounce_p:>5.2f}/{bounce_r:<6.2f} {auto_p:>5.2f}/{auto_r:<6.2f} "
+              f"{result['human kept'][0]:>11.2f} {throughput(classify, args.rounds):>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
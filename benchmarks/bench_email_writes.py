@@ -0,0 +1,84 @@
+"""
+Storing a poll's worth of emails: post_email per row (SELECT, then INSERT)
+against EmailRecordBuffer/post_emails_bulk (one upsert per batch).
+
+    python -m src.email_management.benchmarks.bench_email_writes --emails 1000 --rtt-ms 20
+
+Runs against the in-memory PostgREST stand-in. Network time is modeled as
+one RTT per request plus --row-us per row sent or returned; client time is
+the Python work of the code under test, without the stand-in's own.
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import time
+
+from src.email_management.benchmarks.fake_postgrest import FakePostgrest
+from src.email_management.src.lib import supabase_client as db_module
+from src.email_management.src.lib.supabase_client import EmailRecordBuffer, post_email
+
+
+def make_emails(count: int, offset: int = 0):
+    return [
+        {
+            'email_id': f'AAMk-{i}',
+            'sender': f'lead{i}@example.com',
+            'recipient': 'worker@veloxforce.de',
+            'subject': f'Re: Quick question {i % 50}',
+            'body': 'Thanks, sounds interesting. ' * 20,
+            'conversation_id': f'conv-{i}',
+            'message_id': f'<{i}@example.com>',
+            'created_at': '2026-10-18T08:00:00+00:00',
+        }
+        for i in range(offset, offset + count)
+    ]
+
+
+def run(name: str, store, emails, already_stored, args) -> None:
+    fake = FakePostgrest()
+    fake.load('received_email', [{'email_id': e['email_id']} for e in already_stored], key='email_id')
+    db_module.supabase_client.client = fake
+
+    started = time.perf_counter()
+    # Both paths print per email or batch, keep the output to the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        store(emails)
+    client = time.perf_counter() - started - fake.server_seconds
+    network = fake.modeled_seconds(args.rtt_ms, args.row_us)
+    print(f"{name:>9}: {fake.round_trips:5d} requests, {fake.rows_sent + fake.rows_returned:6d} rows, "
+          f"client {client * 1000:7.1f}ms, modeled total {client + network:6.2f}s")
+
+
+def per_row(emails) -> None:
+    for email in emails:
+        post_email(dict(email), 'received')
+
+
+def buffered(emails, batch_size: int) -> None:
+    with EmailRecordBuffer(batch_size=batch_size) as buffer:
+        for email in emails:
+            buffer.add(dict(email), 'received')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--emails', type=int, default=1000)
+    parser.add_argument('--duplicates', type=float, default=0.1, help='share already in the table')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--rtt-ms', type=float, default=20.0)
+    parser.add_argument('--row-us', type=float, default=20.0)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    emails = make_emails(args.emails)
+    already_stored = emails[:int(args.emails * args.duplicates)]
+    print(f"{args.emails} emails, {len(already_stored)} already stored, "
+          f"RTT {args.rtt_ms}ms, {args.row_us}us per row")
+    run('per-row', per_row, emails, already_stored, args)
+    run('bulk', lambda e: buffered(e, args.batch_size), emails, already_stored, args)
+
+
+if __name__ == '__main__':
+    main()
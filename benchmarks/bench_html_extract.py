@@ -0,0 +1,93 @@
+"""
+CPU time and peak memory of extracting the newest message from long quoted
+threads, against the BeautifulSoup version it replaced.
+
+    python -m src.email_management.benchmarks.bench_html_extract --replies 200 --rounds 20
+
+Bodies are generated the way Outlook (elementToProof, divRplyFwdMsg) and
+Gmail (div dir=ltr, gmail_quote, nested blockquotes) quote earlier messages,
+with --replies earlier messages each. CPU time is per body, peak memory is
+what tracemalloc sees during one extraction. The legacy version only knows
+the Outlook div, it returns nothing for Gmail bodies.
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+from bs4 import BeautifulSoup
+
+from src.email_management.src.lib.html_extract import extract_first_message
+
+PARAGRAPH = ('Thanks for the quick reply. We looked at the proposal with the team and have a few questions '
+             'about the onboarding, the pricing for additional seats and the data retention terms.')
+
+
+def legacy_extract_first_message(html_content: str) -> Optional[str]:
+    """extract_first_message as it was in reciever.py"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    first_message = soup.find('div', class_='elementToProof')
+    return first_message.text.strip() if first_message else None
+
+
+def outlook_thread(replies: int) -> str:
+    quoted = ''.join(
+        f'<hr style="display:inline-block;width:98%" tabindex="-1">'
+        f'<div id="divRplyFwdMsg" dir="ltr"><font face="Calibri" style="font-size:11pt">'
+        f'<b>From:</b> Lead {n} &lt;lead{n}@example.com&gt;<br><b>Sent:</b> Monday, 12 October 2026 09:{n % 60:02d}<br>'
+        f'<b>Subject:</b> RE: Quick question</font><div>&nbsp;</div></div>'
+        f'<div class="elementToProof" style="font-family:Aptos"><p>{PARAGRAPH}</p><p>{PARAGRAPH}</p></div>'
+        for n in range(replies)
+    )
+    return (
+        '<html><head><style>p {margin:0}</style></head><body><div dir="ltr">'
+        f'<div class="elementToProof" style="font-family:Aptos">Hi Anna,<br><br>{PARAGRAPH}<br><br>Best, Jan</div>'
+        f'<div id="appendonsend"></div>{quoted}</div></body></html>'
+    )
+
+
+def gmail_thread(replies: int) -> str:
+    quoted = ''
+    for n in reversed(range(replies)):
+        quoted = (
+            f'<div class="gmail_quote"><div dir="ltr" class="gmail_attr">On Mon, 12 Oct 2026 at 09:{n % 60:02d}, '
+            f'Lead {n} &lt;lead{n}@example.com&gt; wrote:<br></div>'
+            f'<blockquote class="gmail_quote" style="margin:0 0 0 .8ex;border-left:1px #ccc solid;padding-left:1ex">'
+            f'<div dir="ltr"><div>{PARAGRAPH}</div><div>{PARAGRAPH}</div></div>{quoted}</blockquote></div>'
+        )
+    return (
+        f'<div dir="ltr"><div>Hi Anna,</div><div><br></div><div>{PARAGRAPH}</div><div><br></div>'
+        f'<div>Best, Jan</div></div><br>{quoted}'
+    )
+
+
+def measure(extract: Callable[[str], Optional[str]], body: str, rounds: int):
+    started = time.process_time()
+    for _ in range(rounds):
+        extract(body)
+    cpu_ms = (time.process_time() - started) / rounds * 1000
+
+    tracemalloc.start()
+    text = extract(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu_ms, peak / 1024, len(text or '')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--replies', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.replies} quoted replies per thread, {args.rounds} rounds")
+    print(f"{'thread':>8} {'KiB':>7} {'version':>8} {'cpu ms':>9} {'peak KiB':>9} {'chars':>6}")
+    for thread, body in (('outlook', outlook_thread(args.replies)), ('gmail', gmail_thread(args.replies))):
+        for name, extract in (('legacy', legacy_extract_first_message), ('current', extract_first_message)):
+            cpu_ms, peak_kib, chars = measure(extract, body, args.rounds)
+            print(f"{thread:>8} {len(body) / 1024:>7.0f} {name:>8} {cpu_ms:>9.2f} {peak_kib:>9.0f} {chars:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Reply classification latency and throughput against a local fake LLM
+server, for several concurrency levels.
+
+    python -m src.email_management.benchmarks.bench_reply_classifier --replies 400 --concurrency 1 4 8 16
+
+The server speaks the OpenAI chat completions API on 127.0.0.1, answers
+after a log-normal delay around --latency-ms and rejects --rate-limited of
+the requests with a 429 and a retry-after, so ReplyClassifier's backoff is
+exercised. Requests go through the OpenAI client exactly as in production,
+only its base_url points at the fake server. Nothing is stored or cached.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai import OpenAI
+
+from src.email_management.src.lib.classification_pipeline import ProccessedEmailAnalysis, ReplyClassifier
+from src.email_management.src.lib.prompts import system_prompt
+
+ANALYSIS = {
+    'level_of_interest': 'medium',
+    'is_related': True,
+    'reply': {'subject': 'Re: Quick question', 'body': 'Thanks for getting back to me, does Tuesday work?'},
+}
+
+
+def make_handler(latency_ms: float, rate_limited: float, seed: int):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    class FakeLLMHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('content-length', 0)))
+            with lock:
+                limited = rng.random() < rate_limited
+                delay = rng.lognormvariate(0, 0.5) * latency_ms / 1000
+            if limited:
+                self._reply(429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_error'}},
+                            {'retry-after': '0.05'})
+                return
+            time.sleep(delay)
+            self._reply(200, {
+                'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': 'fake',
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': json.dumps(ANALYSIS)}}],
+                'usage': {'prompt_tokens': 500, 'completion_tokens': 80, 'total_tokens': 580},
+            })
+
+        def _reply(self, status, payload, headers=None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('content-type', 'application/json')
+            self.send_header('content-length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FakeLLMHandler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--replies', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--latency-ms', type=float, default=100.0)
+    parser.add_argument('--rate-limited', type=float, default=0.05)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.latency_ms, args.rate_limited, seed=7))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Retries are left to ReplyClassifier, as with the production client
+    client = OpenAI(base_url=f'http://127.0.0.1:{server.server_port}/v1', api_key='bench', max_retries=0)
+
+    def generate(user_input: str) -> ProccessedEmailAnalysis:
+        response = client.beta.chat.completions.parse(
+            messages=[{'role': 'system', 'content': system_prompt}, {'role': 'user', 'content': user_input}],
+            model='fake',
+            response_format=ProccessedEmailAnalysis,
+        )
+        return response.choices[0].message.parsed
+
+    emails = [{'email_id': f'AAMk-{i}', 'body': f'Sounds interesting, tell me more ({i})'}
+              for i in range(args.replies)]
+    print(f"{args.replies} replies, ~{args.latency_ms:.0f}ms per request, {args.rate_limited:.0%} rate limited")
+    print(f"{'in flight':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'retries':>8} {'failed':>7} {'replies/s':>10}")
+    try:
+        for concurrency in args.concurrency:
+            classifier = ReplyClassifier(generate=generate, max_in_flight=concurrency, base_delay=0.05,
+                                         store=len, cache=None)
+            asyncio.run(classifier.run(emails))
+            stats = classifier.stats()
+            print(f"{concurrency:>9} {stats['p50_seconds'] * 1000:>8.1f} {stats['p90_seconds'] * 1000:>8.1f} "
+                  f"{stats['p99_seconds'] * 1000:>8.1f} {stats['retries']:>8} {stats['failed']:>7} "
+                  f"{stats['throughput_per_second']:>10.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Slot search cost: SlotAllocator against the per-email window scan it
+replaced (find_optimal_slot / get_available_slots_for_day /
+check_time_interval), scheduling recipients over 50 senders.
+
+    python -m src.email_management.benchmarks.bench_slot_allocator --recipients 10000 50000 100000
+
+The window scan is O(emails x window slots x queue length), so it only
+runs for the --legacy sizes.
+"""
+
+import argparse
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import pytz
+
+from src.email_management.scheduler.models.sending_rules import SendingRules
+from src.email_management.scheduler.utils.slot_allocator import (
+    SlotAllocator, schedule_day_key, schedule_day_number
+)
+
+TIMEZONES = ['Europe/Amsterdam', 'America/New_York', 'Asia/Singapore']
+DAILY_LIMIT = 30
+
+
+def make_tracker(senders: int) -> Dict:
+    return {
+        "sending_accounts": {
+            f"worker{i}@veloxforce.de": {"daily_limit": DAILY_LIMIT, "daily_schedule_count": {}, "email_queue": []}
+            for i in range(senders)
+        }
+    }
+
+
+def window_days(recipients: int, senders: int) -> int:
+    # Sundays are excluded and timezones don't all overlap, leave headroom
+    return math.ceil(recipients / (senders * DAILY_LIMIT) * 1.5) + 3
+
+
+def schedule_with_allocator(recipients: int, senders: int, start: datetime) -> int:
+    tracker = make_tracker(senders)
+    rules = SendingRules.from_dict({"daily_limit_per_sender": DAILY_LIMIT})
+    allocator = SlotAllocator(start, start + timedelta(days=window_days(recipients, senders)), tracker, rules)
+    sender_emails = list(tracker["sending_accounts"])
+    placed = 0
+    for i in range(recipients):
+        sender_email = sender_emails[i % senders]
+        slot = allocator.find_slot(sender_email, TIMEZONES[i % len(TIMEZONES)])
+        if slot is None:
+            continue
+        allocator.reserve(sender_email, slot)
+        counts = tracker["sending_accounts"][sender_email]["daily_schedule_count"]
+        day = schedule_day_key(schedule_day_number(slot.timestamp()))
+        counts[day] = counts.get(day, 0) + 1
+        placed += 1
+    return placed
+
+
+# The scan as it was before the allocator, without its logging
+def _schedule_day(moment: datetime) -> str:
+    utc_time = moment.astimezone(pytz.UTC)
+    if utc_time.hour < 7:
+        return (utc_time.date() - timedelta(days=1)).strftime("%Y-%m-%d")
+    return utc_time.date().strftime("%Y-%m-%d")
+
+
+def _slots_for_day(start: datetime, end: datetime, recipient_tz: str, target_day: str) -> List[datetime]:
+    slots = []
+    current = start
+    while current < end:
+        if _schedule_day(current) == target_day:
+            if 7 <= current.astimezone(pytz.timezone(recipient_tz)).hour < 18:
+                slots.append(current)
+        current += timedelta(minutes=20)
+    return slots
+
+
+def _check_time_interval(queue: List[Dict], proposed: datetime) -> bool:
+    for email in queue:
+        if abs((proposed - datetime.fromisoformat(email['scheduled_time'])).total_seconds()) < 1200:
+            return False
+    return True
+
+
+def _find_optimal_slot(start: datetime, end: datetime, recipient_tz: str, queue: List[Dict],
+                       counts: Dict[str, int]) -> Optional[datetime]:
+    day = datetime.strptime(_schedule_day(start), "%Y-%m-%d")
+    for _ in range(10):
+        day_key = day.strftime("%Y-%m-%d")
+        if counts.get(day_key, 0) < DAILY_LIMIT:
+            for slot in _slots_for_day(start, end, recipient_tz, day_key):
+                if _check_time_interval(queue, slot):
+                    in_window = len([
+                        e for e in queue
+                        if slot - timedelta(hours=24) <= datetime.fromisoformat(e['scheduled_time']) <= slot
+                    ])
+                    if in_window < DAILY_LIMIT:
+                        return slot
+        day += timedelta(days=1)
+    return None
+
+
+def schedule_with_window_scan(recipients: int, senders: int, start: datetime) -> int:
+    tracker = make_tracker(senders)
+    end = start + timedelta(days=window_days(recipients, senders))
+    sender_emails = list(tracker["sending_accounts"])
+    placed = 0
+    for i in range(recipients):
+        account = tracker["sending_accounts"][sender_emails[i % senders]]
+        slot = _find_optimal_slot(start, end, TIMEZONES[i % len(TIMEZONES)],
+                                  account["email_queue"], account["daily_schedule_count"])
+        if slot is None:
+            continue
+        account["email_queue"].append({"scheduled_time": slot.isoformat()})
+        day = _schedule_day(slot)
+        account["daily_schedule_count"][day] = account["daily_schedule_count"].get(day, 0) + 1
+        placed += 1
+    return placed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--recipients', type=int, nargs='*', default=[1000, 10000, 50000, 100000])
+    parser.add_argument('--legacy', type=int, nargs='*', default=[1000])
+    parser.add_argument('--senders', type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    # A Monday morning, so every run sees the same calendar
+    start = datetime(2026, 10, 19, 6, 0, tzinfo=pytz.UTC)
+
+    runs = [('window scan', n, schedule_with_window_scan) for n in args.legacy]
+    runs += [('allocator', n, schedule_with_allocator) for n in args.recipients]
+    print(f"{args.senders} senders, limit {DAILY_LIMIT}/day, timezones {', '.join(TIMEZONES)}")
+    for name, recipients, schedule in runs:
+        started = time.perf_counter()
+        placed = schedule(recipients, args.senders, start)
+        elapsed = time.perf_counter() - started
+        print(f"{name:>12}: {recipients:>7} recipients, {placed:>7} placed in {elapsed:7.2f}s "
+              f"({elapsed / recipients * 1e6:8.1f}us each)")
+
+
+if __name__ == '__main__':
+    main()
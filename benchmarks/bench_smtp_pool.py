@@ -0,0 +1,118 @@
+"""
+Messages/sec with and without the SMTP session pool, against a local
+aiosmtpd server that speaks STARTTLS and AUTH like smtp.office365.com.
+
+    pip install aiosmtpd
+    python -m src.email_management.benchmarks.bench_smtp_pool --messages 200 --accounts 4
+
+The certificate is a throwaway self-signed one made with the openssl CLI.
+Only the per-message handshake cost is measured, the local server adds no
+network latency, so real-world savings are larger.
+"""
+
+import argparse
+import logging
+import os
+import smtplib
+import socket
+import ssl
+import subprocess
+import tempfile
+import time
+from email.mime.text import MIMEText
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from src.email_management.src.lib.smtp_pool import SMTPConnectionPool
+
+HOST = '127.0.0.1'
+PASSWORD = 'secret'
+
+
+class _Sink:
+    async def handle_DATA(self, server, session, envelope):
+        return '250 OK'
+
+
+def _accept_all(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+
+def _tls_context(workdir: str) -> ssl.SSLContext:
+    cert, key = os.path.join(workdir, 'cert.pem'), os.path.join(workdir, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-subj', f'/CN={HOST}', '-keyout', key, '-out', cert],
+        check=True, capture_output=True
+    )
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _message(sender: str, i: int) -> MIMEText:
+    msg = MIMEText(f"Benchmark message {i}", 'plain', 'utf-8')
+    msg['From'] = sender
+    msg['To'] = 'recipient@example.com'
+    msg['Subject'] = f"Benchmark {i}"
+    return msg
+
+
+def send_unpooled(port: int, accounts, messages: int) -> float:
+    """What send_email did before the pool: connect, STARTTLS and AUTH per message"""
+    start = time.perf_counter()
+    for i in range(messages):
+        sender = accounts[i % len(accounts)]
+        with smtplib.SMTP(HOST, port, timeout=30) as server:
+            server.starttls()
+            server.login(sender, PASSWORD)
+            server.send_message(_message(sender, i))
+    return time.perf_counter() - start
+
+
+def send_pooled(port: int, accounts, messages: int) -> float:
+    pool = SMTPConnectionPool(host=HOST, port=port)
+    start = time.perf_counter()
+    for i in range(messages):
+        sender = accounts[i % len(accounts)]
+        with pool.connection(sender, PASSWORD) as server:
+            server.send_message(_message(sender, i))
+    elapsed = time.perf_counter() - start
+    pool.close_all()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--messages', type=int, default=200)
+    parser.add_argument('--accounts', type=int, default=4)
+    args = parser.parse_args()
+    # aiosmtpd logs every command at INFO
+    logging.getLogger('mail.log').setLevel(logging.ERROR)
+    accounts = [f'worker{i}@example.com' for i in range(1, args.accounts + 1)]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        port = _free_port()
+        controller = Controller(
+            _Sink(), hostname=HOST, port=port,
+            server_kwargs={'tls_context': _tls_context(workdir), 'authenticator': _accept_all}
+        )
+        controller.start()
+        try:
+            for name, run in (('unpooled', send_unpooled), ('pooled', send_pooled)):
+                elapsed = run(port, accounts, args.messages)
+                print(f"{name:>9}: {args.messages} messages in {elapsed:.2f}s, "
+                      f"{args.messages / elapsed:.0f} msg/s")
+        finally:
+            controller.stop()
+
+
+if __name__ == '__main__':
+    main()
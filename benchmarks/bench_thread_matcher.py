@@ -0,0 +1,113 @@
+"""
+Parent lookup for inbound replies against the number of outbound threads:
+the old subject query filtered in Python against ThreadMatcher (Message-ID
+first, database-side filtering, LRU index).
+
+    python -m src.email_management.benchmarks.bench_thread_matcher --threads 1000 10000 50000
+
+Runs against the in-memory PostgREST stand-in, see bench_email_writes for
+the latency model. Half of the replies carry In-Reply-To, the rest are
+matched by (sender, recipient, subject). Campaigns reuse a few subjects,
+as real ones do.
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from src.email_management.benchmarks.fake_postgrest import FakePostgrest
+from src.email_management.src.lib import supabase_client as db_module
+from src.email_management.src.lib.thread_matcher import ThreadMatcher, normalize_subject
+
+SUBJECTS = [f'Quick question about {topic}' for topic in ('automation', 'invoices', 'hiring', 'AI', 'support')]
+
+
+def legacy_find_parent(email_data):
+    """find_parent_email before the ThreadMatcher, without its debug prints"""
+    cleaned_subject = normalize_subject(email_data['subject'])
+    result = db_module.supabase_client.client.from_("outbound_email") \
+        .select("*") \
+        .or_(f"subject.eq.{cleaned_subject},conversation_topic.eq.{cleaned_subject}") \
+        .execute()
+    matching = [
+        email for email in result.data
+        if email['recipient'].lower() == email_data['sender'].lower()
+        and email['sender'].lower() == email_data['recipient'].lower()
+    ]
+    return sorted(matching, key=lambda x: x['created_at'])[-1] if matching else None
+
+
+def make_outbound(threads: int):
+    return [
+        {
+            'email_id': f'AAMk-{i}',
+            'sender': f'worker{i % 20}@veloxforce.de',
+            'recipient': f'lead{i}@example.com',
+            'subject': SUBJECTS[i % len(SUBJECTS)],
+            'conversation_topic': SUBJECTS[i % len(SUBJECTS)],
+            'internet_message_id': f'<{i}@veloxforce.de>',
+            'created_at': f'2026-10-{1 + i % 28:02d}T08:00:00+00:00',
+        }
+        for i in range(threads)
+    ]
+
+
+def make_replies(outbound, count: int, rng: random.Random):
+    replies = []
+    for n, parent in enumerate(rng.sample(outbound, count)):
+        reply = {
+            'sender': parent['recipient'],
+            'recipient': parent['sender'],
+            'subject': f"Re: {parent['subject']}",
+        }
+        if n % 2 == 0:
+            reply['in_reply_to'] = parent['internet_message_id']
+        replies.append(reply)
+    return replies
+
+
+def measure(find, replies, fake, args):
+    fake.reset_counters()
+    started = time.perf_counter()
+    for reply in replies:
+        assert find(reply) is not None
+    client = time.perf_counter() - started - fake.server_seconds
+    network = fake.modeled_seconds(args.rtt_ms, args.row_us)
+    per_lookup_ms = (client + network) * 1000 / len(replies)
+    return fake.round_trips, fake.rows_returned, per_lookup_ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--replies', type=int, default=200)
+    parser.add_argument('--rtt-ms', type=float, default=20.0)
+    parser.add_argument('--row-us', type=float, default=20.0)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(7)
+
+    print(f"{args.replies} replies per run, RTT {args.rtt_ms}ms, {args.row_us}us per row")
+    print(f"{'threads':>8} {'path':>13} {'requests':>9} {'rows':>9} {'ms/lookup':>10}")
+    for threads in args.threads:
+        outbound = make_outbound(threads)
+        replies = make_replies(outbound, args.replies, rng)
+        fake = FakePostgrest()
+        fake.load('outbound_email', outbound)
+        db_module.supabase_client.client = fake
+
+        matcher = ThreadMatcher()
+        runs = (
+            ('legacy', legacy_find_parent),
+            ('matcher cold', matcher.find_parent),
+            # Same replies again, e.g. a second message in each thread
+            ('matcher warm', matcher.find_parent),
+        )
+        for name, find in runs:
+            requests, rows, per_lookup_ms = measure(find, replies, fake, args)
+            print(f"{threads:>8} {name:>13} {requests:>9} {rows:>9} {per_lookup_ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
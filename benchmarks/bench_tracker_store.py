@@ -0,0 +1,102 @@
+"""
+Per-send persistence cost against queue size: rewriting sending_tracker.json
+(what process_scheduled_emails did after every send) against
+TrackerStore.record_send on SQLite in WAL mode.
+
+    python -m src.email_management.benchmarks.bench_tracker_store --queue-sizes 1000 10000 100000
+
+Both run in a temporary directory, so the numbers depend on the local disk.
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+
+import pytz
+
+from src.email_management.scheduler.utils.tracker_store import TrackerStore
+
+CAMPAIGN_ID = 'benchmark-campaign'
+
+
+def make_tracker(queue_size: int, senders: int = 50) -> Dict:
+    start = datetime(2026, 10, 19, 7, 0, tzinfo=pytz.UTC)
+    accounts = {
+        f"worker{i}@veloxforce.de": {
+            "daily_limit": 30,
+            "time_between_emails": 20,
+            "last_scheduled_time": start.isoformat(),
+            "daily_schedule_count": {},
+            "email_queue": [],
+        }
+        for i in range(senders)
+    }
+    sender_emails = list(accounts)
+    for n in range(queue_size):
+        slot = start + timedelta(minutes=20 * (n // senders))
+        accounts[sender_emails[n % senders]]["email_queue"].append({
+            "campaign_id": CAMPAIGN_ID,
+            "scheduled_time": slot.isoformat(),
+            "status": "pending",
+            "attempt_count": 0,
+            "email_data": {
+                "email_recipient": f"lead{n}@example.com",
+                "subjectline": "Quick question",
+                "email_content": "Hi there, " + "a short cold email body. " * 30,
+                "time_zone": "Europe/Amsterdam",
+            },
+        })
+    return {
+        "sending_accounts": accounts,
+        "campaigns": {CAMPAIGN_ID: {"status": "new", "total_emails": queue_size, "emails_sent": 0}},
+    }
+
+
+def bench_json(tracker: Dict, sends: int, workdir: str) -> float:
+    path = os.path.join(workdir, 'sending_tracker.json')
+    queues = [account["email_queue"] for account in tracker["sending_accounts"].values()]
+    started = time.perf_counter()
+    for n in range(sends):
+        queues[n % len(queues)].pop(0)
+        tracker["campaigns"][CAMPAIGN_ID]["emails_sent"] += 1
+        with open(path, 'w') as f:
+            json.dump(tracker, f, indent=2)
+    return (time.perf_counter() - started) / sends
+
+
+def bench_sqlite(tracker: Dict, sends: int, workdir: str) -> float:
+    store = TrackerStore(os.path.join(workdir, 'sending_tracker.db'))
+    store.save(tracker)
+    queues = [account["email_queue"] for account in tracker["sending_accounts"].values()]
+    started = time.perf_counter()
+    for n in range(sends):
+        entry = queues[n % len(queues)].pop(0)
+        store.record_send(entry["queue_id"], CAMPAIGN_ID, "emails_sent")
+    elapsed = (time.perf_counter() - started) / sends
+    store.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--queue-sizes', type=int, nargs='+', default=[1000, 10000, 50000, 100000])
+    parser.add_argument('--sends', type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"mean cost per send over {args.sends} sends")
+    print(f"{'queue':>8} {'json rewrite':>13} {'sqlite':>10}")
+    for queue_size in args.queue_sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            json_cost = bench_json(make_tracker(queue_size), args.sends, workdir)
+            sqlite_cost = bench_sqlite(make_tracker(queue_size), args.sends, workdir)
+        print(f"{queue_size:>8} {json_cost * 1000:>11.2f}ms {sqlite_cost * 1000:>8.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
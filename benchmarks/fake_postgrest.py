@@ -0,0 +1,170 @@
+"""
+In-memory stand-in for the supabase-py query builder, enough of it for the
+benchmarks. Every execute() counts as one round trip; the rows sent and
+returned are counted too, so a run can be priced with a latency model
+instead of a live PostgREST. Time spent in the fake is tracked separately
+so it can be left out of the client-side cost.
+"""
+
+import copy
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+_OR_TERM = re.compile(r'(\w+)\.eq\.("(?:[^"\\]|\\.)*"|[^,]*)')
+
+
+def _unquote(value: str) -> str:
+    if value.startswith('"') and value.endswith('"'):
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+
+def _like_regex(pattern: str) -> str:
+    """LIKE pattern as a regex: % and _ (or PostgREST's *) are wildcards, \\ escapes"""
+    parts = []
+    for escaped, char in re.findall(r'(\\)?(.)', pattern, re.DOTALL):
+        if escaped:
+            parts.append(re.escape(char))
+        elif char in '%*':
+            parts.append('.*')
+        elif char == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    return ''.join(parts)
+
+
+class FakeQuery:
+    def __init__(self, db: 'FakePostgrest', table: str):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.action = 'select'
+        self.payload = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.order_by = None
+        self.limit_to = None
+
+    # Filters
+    def eq(self, column: str, value: Any) -> 'FakeQuery':
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> 'FakeQuery':
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def ilike(self, column: str, pattern: str) -> 'FakeQuery':
+        regex = re.compile(_like_regex(pattern), re.IGNORECASE | re.DOTALL)
+        self.filters.append(lambda row: regex.fullmatch(row.get(column) or '') is not None)
+        return self
+
+    def or_(self, expression: str) -> 'FakeQuery':
+        terms = [(column, _unquote(value)) for column, value in _OR_TERM.findall(expression)]
+        self.filters.append(lambda row: any(row.get(column) == value for column, value in terms))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> 'FakeQuery':
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, count: int) -> 'FakeQuery':
+        self.limit_to = count
+        return self
+
+    # Actions
+    def select(self, columns: str = '*') -> 'FakeQuery':
+        self.action = 'select'
+        return self
+
+    def insert(self, rows) -> 'FakeQuery':
+        self.action, self.payload = 'insert', rows
+        return self
+
+    def upsert(self, rows, on_conflict: Optional[str] = None, ignore_duplicates: bool = False) -> 'FakeQuery':
+        self.action, self.payload = 'upsert', rows
+        self.on_conflict, self.ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def update(self, values: Dict) -> 'FakeQuery':
+        self.action, self.payload = 'update', values
+        return self
+
+    def execute(self) -> SimpleNamespace:
+        started = time.perf_counter()
+        try:
+            return self._execute()
+        finally:
+            self.db.server_seconds += time.perf_counter() - started
+
+    def _execute(self) -> SimpleNamespace:
+        rows = self.db.tables.setdefault(self.table, [])
+        self.db.round_trips += 1
+        if self.action == 'select':
+            data = [row for row in rows if all(f(row) for f in self.filters)]
+            if self.order_by:
+                column, desc = self.order_by
+                data.sort(key=lambda row: row.get(column) or '', reverse=desc)
+            if self.limit_to is not None:
+                data = data[:self.limit_to]
+        elif self.action in ('insert', 'upsert'):
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            self.db.rows_sent += len(payload)
+            data = []
+            for row in payload:
+                key = self.on_conflict or 'email_id'
+                if row.get(key) is not None and row[key] in self.db.keys(self.table, key):
+                    if self.action == 'insert':
+                        raise Exception('duplicate key value violates unique constraint (23505)')
+                    if not self.ignore_duplicates:
+                        existing = next(r for r in rows if r.get(key) == row[key])
+                        existing.update(row)
+                        data.append(existing)
+                    continue
+                rows.append(dict(row))
+                self.db.keys(self.table, key).add(row.get(key))
+                data.append(row)
+        else:
+            data = [row for row in rows if all(f(row) for f in self.filters)]
+            for row in data:
+                row.update(self.payload)
+        self.db.rows_returned += len(data)
+        return SimpleNamespace(data=copy.deepcopy(data))
+
+
+class FakePostgrest:
+    """Tables as lists of dicts, with a unique index per conflict column"""
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict]] = {}
+        self._keys: Dict[tuple, set] = {}
+        self.round_trips = 0
+        self.rows_sent = 0
+        self.rows_returned = 0
+        # Time spent inside the fake itself, subtract it from client timings
+        self.server_seconds = 0.0
+
+    def keys(self, table: str, column: str) -> set:
+        return self._keys.setdefault((table, column), set())
+
+    def load(self, table: str, rows: List[Dict], key: Optional[str] = None) -> None:
+        self.tables.setdefault(table, []).extend(rows)
+        if key:
+            self.keys(table, key).update(row[key] for row in rows)
+
+    def from_(self, table: str) -> FakeQuery:
+        return FakeQuery(self, table)
+
+    table = from_
+
+    def reset_counters(self) -> None:
+        self.round_trips = self.rows_sent = self.rows_returned = 0
+        self.server_seconds = 0.0
+
+    def modeled_seconds(self, rtt_ms: float, row_us: float) -> float:
+        """Network time of the counted traffic: one RTT per request plus a cost per row"""
+        return self.round_trips * rtt_ms / 1000 + (self.rows_sent + self.rows_returned) * row_us / 1e6
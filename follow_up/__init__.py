@@ -1,4 +1,6 @@
 from .follow_up_manager import FollowUpManager
 from .follow_up_scheduler import FollowUpScheduler
+from .sequence_engine import SequenceEngine, FollowUpSequence, SequenceStage, sequence_engine
 
-__all__ = ['FollowUpManager', 'FollowUpScheduler'] 
\ No newline at end of file
+__all__ = ['FollowUpManager', 'FollowUpScheduler', 'SequenceEngine', 'FollowUpSequence', 'SequenceStage',
+           'sequence_engine'] 
\ No newline at end of file
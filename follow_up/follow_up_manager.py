@@ -1,90 +1,203 @@
 from datetime import datetime, timedelta
+import asyncio
+import os
 import pytz
 import logging
-from typing import List, Dict
-from src.email_management.src.lib.supabase_client import supabase_client
+from typing import Iterator, List, Dict, Optional
+from src.email_management.src.lib.supabase_client import (
+    supabase_client, update_followup_due, followup_due_at
+)
+from .sequence_engine import SequenceEngine, sequence_engine
 from src.email_management.sendreply import send_reply
-import re
+from src.email_management.scheduler.send_workers import SenderWorkers
+from src.email_management.scheduler.utils.rate_limiter import TokenBucket
 logger = logging.getLogger(__name__)
 
+# Candidates fetched and marked per round trip
+FOLLOWUP_PAGE_SIZE = int(os.getenv('FOLLOWUP_PAGE_SIZE', 200))
+# Threads shared by the per-account follow-up workers
+FOLLOWUP_CONCURRENCY = int(os.getenv('FOLLOWUP_CONCURRENCY', 8))
+# Minimum seconds between two follow-ups of the same account
+FOLLOWUP_SEND_INTERVAL = float(os.getenv('FOLLOWUP_SEND_INTERVAL', 2))
+# Seconds a failed follow-up waits before it is due again
+FOLLOWUP_RETRY_DELAY = int(os.getenv('FOLLOWUP_RETRY_DELAY', 3600))
+# Failed sends of one stage before its sequence is stopped
+FOLLOWUP_MAX_ATTEMPTS = int(os.getenv('FOLLOWUP_MAX_ATTEMPTS', 5))
+
+# Only what sending and threading a follow-up needs, never the bodies
+FOLLOWUP_COLUMNS = (
+    "id, email_id, sender, recipient, subject, time_zone, created_at, message_id, "
+    "conversational_id, parent_folder_id, thread_topic, thread_index, campaign_id, followup_stage, "
+    "followup_attempts"
+)
+
 class FollowUpManager:
-    def __init__(self):
+    def __init__(self, engine: SequenceEngine = sequence_engine):
         self.supabase = supabase_client
-        self.follow_up_template = """
-Have you seen my email? i was wondering what you thought of it?
-"""
+        self.engine = engine
 
-    def get_emails_needing_followup(self) -> List[Dict]:
+    def iter_followup_candidates(self, page_size: int = FOLLOWUP_PAGE_SIZE) -> Iterator[List[Dict]]:
         """
-        Fetch emails that:
-        1. Were sent 5 days ago
-        2. Haven't received a reply
-        3. Haven't had a follow-up sent yet
-        4. Are initial emails (not replies)
+        Yield pages of emails whose followup_due_at has passed. The column is
+        set when an initial email is stored and cleared once a reply arrives
+        or the follow-up went out, so only due rows are read.
+        Pages are keyed on id, so marking rows as sent between pages is safe.
         """
-        five_days_ago = datetime.now(pytz.UTC) - timedelta(days=5)
-        print(f"five_days_ago: {five_days_ago}")
-        try:
-            response = self.supabase.client.from_("received_email") \
-                .select("*") \
-                .lt("created_at", five_days_ago.isoformat()) \
+        now = datetime.now(pytz.UTC).isoformat()
+        last_id = None
+        while True:
+            query = self.supabase.client.from_("received_email") \
+                .select(FOLLOWUP_COLUMNS) \
+                .lte("followup_due_at", now)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            response = query.order("id").limit(page_size).execute()
+            page = response.data or []
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            last_id = page[-1]['id']
+
+    def next_followup_due(self) -> Optional[datetime]:
+        """When the earliest pending follow-up is due, None if there is none"""
+        response = self.supabase.client.from_("received_email") \
+            .select("followup_due_at") \
+            .not_.is_("followup_due_at", "null") \
+            .order("followup_due_at") \
+            .limit(1) \
+            .execute()
+        if not response.data:
+            return None
+        return datetime.fromisoformat(response.data[0]['followup_due_at'].replace('Z', '+00:00'))
+
+    def backfill_followup_due(self, page_size: int = FOLLOWUP_PAGE_SIZE) -> int:
+        """
+        One-off migration: give initial emails stored before followup_due_at
+        existed the due time of their campaign's first stage.
+        Returns the number of rows that were backfilled.
+        """
+        backfilled = 0
+        last_id = None
+        while True:
+            query = self.supabase.client.from_("received_email") \
+                .select("id, created_at, campaign_id") \
+                .is_("followup_due_at", "null") \
                 .eq("replied", False) \
                 .eq("followup_send", False) \
-                .eq("email_type", "initial") \
-                .execute()
-            print(f"response: {response}")
-            return response.data
+                .eq("email_type", "initial")
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            page = query.order("id").limit(page_size).execute().data or []
+            # Rows created in the same second share one update
+            ids_by_due: Dict[str, List] = {}
+            for row in page:
+                due_at = followup_due_at(row['created_at'][:19], self.engine.first_delay_days(row.get('campaign_id')))
+                if due_at:
+                    ids_by_due.setdefault(due_at, []).append(row['id'])
+            for due_at, ids in ids_by_due.items():
+                backfilled += update_followup_due(ids, due_at)
+            if len(page) < page_size:
+                return backfilled
+            last_id = page[-1]['id']
+
+    def get_emails_needing_followup(self) -> List[Dict]:
+        """All emails currently due for a follow-up"""
+        try:
+            return [email for page in self.iter_followup_candidates() for email in page]
         except Exception as e:
             logger.error(f"Error fetching emails for follow-up: {str(e)}")
             return []
 
+    def _send_follow_up(self, original_email: Dict) -> bool:
+        """Send the row's next stage, blocking. Does not touch the original's row"""
+        subject, body = self.engine.render(original_email)
+        success, error = send_reply(
+            sender=original_email['sender'],
+            recipient=original_email['recipient'],
+            subject=subject,
+            body=body,
+            original_email_id=original_email['email_id'],
+            time_zone=original_email.get('time_zone') or 'Europe/Amsterdam',
+            original_email=original_email,
+            update_original=False
+        )
+        if not success:
+            logger.error(f"Failed to send follow-up for email {original_email['id']}: {error}")
+        return success
+
     async def send_follow_up(self, original_email: Dict) -> bool:
         """Send a follow-up email for the given original email"""
         try:
-            print(f"original_email: {original_email}\n\n")
-            # Prepare follow-up content
-            follow_up_subject = f"Re: {original_email['subject']}"
-            follow_up_body = self._generate_follow_up_content(original_email)
-            print(f"follow_up_body: {follow_up_body[:50]}")
-            # Send the follow-up email
-            success, error = send_reply(
-                sender=original_email['sender'],
-                recipient=original_email['recipient'],
-                subject=follow_up_subject,
-                body=follow_up_body,
-                original_email_id=original_email['email_id'],
-                time_zone=original_email.get('time_zone', 'Europe/Amsterdam')
-            )
-
-            if success:
-                # Update the original email record
-                self.supabase.client.from_("received_email") \
-                    .update({"followup_send": True}) \
-                    .eq("id", original_email['id']) \
-                    .execute()
-                
-                logger.info(f"Follow-up sent successfully for email {original_email['id']}")
-                return True
-            else:
-                logger.error(f"Failed to send follow-up for email {original_email['id']}: {error}")
+            if self.engine.is_finished(original_email):
+                self.engine.finish([original_email])
                 return False
-
+            if not await asyncio.to_thread(self._send_follow_up, original_email):
+                return False
+            self.engine.advance([original_email])
+            logger.info(f"Follow-up sent successfully for email {original_email['id']}")
+            return True
         except Exception as e:
             logger.error(f"Error in send_follow_up: {str(e)}")
             return False
 
-    def _generate_follow_up_content(self, original_email: Dict) -> str:
-        """Generate follow-up email content based on the original email"""
-        # Extract recipient name from email or use a default
-        recipient_name = original_email.get('recipient_name', 'there')
-        
-        # Clean up the subject by removing any 'Re:', 'Fwd:', etc.
-        clean_subject = re.sub(r'^(Re:\s*|Fwd:\s*)*', '', original_email['subject'])
-        
-        return self.follow_up_template.format(
-            recipient_name=recipient_name,
-            subject=clean_subject,
-            sender_name=original_email.get('sender_name', ''),
-            original_body=original_email.get('body', '')
+    async def process_followups(self) -> int:
+        """
+        Send every due follow-up stage. Each page of candidates is spread
+        over one worker per sending account and moved to its next stage with
+        bulk updates once the page is done, failed ones are due again after
+        FOLLOWUP_RETRY_DELAY until they failed FOLLOWUP_MAX_ATTEMPTS times.
+        Returns the number of follow-ups sent.
+        """
+        sent_rows, failed_rows = [], []
+
+        def send(sender_email: str, original_email: Dict) -> bool:
+            success = False
+            try:
+                success = self._send_follow_up(original_email)
+            finally:
+                if success:
+                    sent_rows.append(original_email)
+                else:
+                    failed_rows.append(original_email)
+            return success
+
+        def flush() -> int:
+            sent, sent_rows[:] = sent_rows[:], []
+            failed, failed_rows[:] = failed_rows[:], []
+            if sent:
+                self.engine.advance(sent)
+            if failed:
+                self.engine.retry(failed, timedelta(seconds=FOLLOWUP_RETRY_DELAY), FOLLOWUP_MAX_ATTEMPTS)
+            return len(sent)
+
+        workers = SenderWorkers(
+            send,
+            lambda sender_email: TokenBucket(interval=FOLLOWUP_SEND_INTERVAL),
+            max_threads=FOLLOWUP_CONCURRENCY
         )
- 
\ No newline at end of file
+        total = 0
+        try:
+            for page in self.iter_followup_candidates():
+                # Rows left without a stage, e.g. after a sequence got shorter
+                finished = [email for email in page if self.engine.is_finished(email)]
+                if finished:
+                    self.engine.finish(finished)
+                for email in page:
+                    if not self.engine.is_finished(email):
+                        workers.submit(email['sender'], email)
+                await workers.join()
+                sent = flush()
+                total += sent
+                logger.info(f"Sent {sent} of {len(page)} follow-ups in this batch")
+        except Exception as e:
+            logger.error(f"Error processing follow-ups: {str(e)}")
+        finally:
+            await workers.close()
+            # Rows handled after a failure still get marked
+            total += flush()
+        return total
+
+    def _generate_follow_up_content(self, original_email: Dict) -> str:
+        """Body of the next follow-up stage for the given original email"""
+        return self.engine.render(original_email)[1]
@@ -2,13 +2,15 @@ import asyncio
 import logging
 from datetime import datetime
 import time
+import pytz
 from typing import Optional
+from src.email_management.src.lib.log_utils import configure_logging
 from .follow_up_manager import FollowUpManager
 
 logger = logging.getLogger(__name__)
 
 class FollowUpScheduler:
-    def __init__(self, check_interval: int = 432000):  # 900 seconds = 15 minutes
+    def __init__(self, check_interval: int = 3600):  # longest sleep between two checks
         self.manager = FollowUpManager()
         self.check_interval = check_interval
         self.is_running = False
@@ -16,33 +18,41 @@ class FollowUpScheduler:
 
     async def start(self):
         """Start the follow-up scheduler"""
+        configure_logging()
         self.is_running = True
         logger.info("Follow-up scheduler started")
         
         while self.is_running:
             try:
-                # Get emails needing follow-up
-                emails = self.manager.get_emails_needing_followup()
-                
-                if emails:
-                    logger.info(f"Found {len(emails)} emails needing follow-up")
-                    
-                    # Process each email
-                    for email in emails:
-                        await self.manager.send_follow_up(email)
-                        # Add a small delay between sends to avoid overwhelming the email server
-                        await asyncio.sleep(2)
+                # Send all due follow-ups, batched per sending account
+                sent = await self.manager.process_followups()
+                if sent:
+                    logger.info(f"Sent {sent} follow-ups")
                 
                 self._last_run = datetime.now()
                 
-                # Wait for the next check interval
-                await asyncio.sleep(self.check_interval)
+                # Sleep until the next follow-up is due
+                await asyncio.sleep(self.seconds_until_next_due())
                 
             except Exception as e:
                 logger.error(f"Error in follow-up scheduler: {str(e)}")
                 # Wait a bit before retrying after an error
                 await asyncio.sleep(60)
 
+    def seconds_until_next_due(self) -> float:
+        """
+        Seconds until the earliest pending follow-up is due, at most
+        check_interval. Rows stored or rescheduled while sleeping can be due
+        sooner (a campaign's first stage may be shorter than a day, a failed
+        send is retried after FOLLOWUP_RETRY_DELAY), they are picked up by
+        the next check, so at most check_interval late.
+        """
+        next_due = self.manager.next_followup_due()
+        if next_due is None:
+            return self.check_interval
+        delay = (next_due - datetime.now(pytz.UTC)).total_seconds()
+        return min(max(delay, 1), self.check_interval)
+
     def stop(self):
         """Stop the follow-up scheduler"""
         self.is_running = False
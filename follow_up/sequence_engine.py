@@ -0,0 +1,287 @@
+import json
+import logging
+import os
+import re
+import string
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import pytz
+
+from src.email_management.src.lib.supabase_client import (
+    supabase_client, update_followup_due, FOLLOWUP_DELAY_DAYS
+)
+from src.email_management.src.lib.auto_reply_classifier import AUTO_REPLY, BOUNCE
+
+logger = logging.getLogger(__name__)
+
+# Campaign sequences as JSON: {"default": {...}, "<campaign_id>": {...}}
+FOLLOWUP_SEQUENCES_FILE = os.getenv(
+    'FOLLOWUP_SEQUENCES_FILE', 'src/email_management/follow_up/sequences.json'
+)
+
+STOP_REPLY = 'reply'
+STOP_BOUNCE = 'bounce'
+STOP_UNSUBSCRIBE = 'unsubscribe'
+STOP_AUTO_REPLY = 'auto_reply'
+STOP_REASONS = {STOP_REPLY, STOP_BOUNCE, STOP_UNSUBSCRIBE, STOP_AUTO_REPLY}
+# Set by the engine itself when a stage kept failing to send, not a stop_on condition
+STOP_SEND_FAILED = 'send_failed'
+DEFAULT_STOP_ON = frozenset({STOP_REPLY, STOP_BOUNCE, STOP_UNSUBSCRIBE})
+# When one conversation has several incoming emails the strongest reason wins
+STOP_PRIORITY = [STOP_UNSUBSCRIBE, STOP_BOUNCE, STOP_REPLY, STOP_AUTO_REPLY]
+
+# en / de / nl / es, the languages we send in
+UNSUBSCRIBE = re.compile(
+    r'unsubscribe|remove me|take me off|stop (?:e-?mailing|contacting|sending)|not interested,? (?:please )?stop|'
+    r'abmelden|austragen|keine (?:weiteren )?e-?mails|'
+    r'afmelden|uitschrijven|geen (?:e-?mails|berichten) meer|'
+    r'darme de baja|dar de baja|no (?:me )?(?:escriba|contacte)',
+    re.IGNORECASE
+)
+
+# Placeholders a template or stage subject may use, literal braces are written {{ }}
+TEMPLATE_FIELDS = frozenset({'recipient_name', 'sender_name', 'recipient', 'sender', 'subject'})
+# Mailboxes that don't belong to a person, they are greeted with "there"
+ROLE_MAILBOXES = frozenset({
+    'info', 'contact', 'hello', 'office', 'sales', 'support', 'service', 'team', 'admin', 'mail',
+    'kontakt', 'hallo', 'buero', 'verkauf', 'contacto', 'ventas', 'hola', 'algemeen'
+})
+
+DEFAULT_TEMPLATE = """
+Have you seen my email? i was wondering what you thought of it?
+"""
+
+
+@dataclass(frozen=True)
+class SequenceStage:
+    delay_days: float
+    template: str
+    # Defaults to "Re: <original subject>" to stay in the thread
+    subject: Optional[str] = None
+
+
+def check_template(template: str) -> None:
+    """Raise ValueError unless str.format can fill `template` from TEMPLATE_FIELDS"""
+    try:
+        fields = [name for _, name, _, _ in string.Formatter().parse(template) if name is not None]
+    except ValueError as e:
+        raise ValueError(f"{e}, write literal braces as {{{{ }}}}") from None
+    unknown = sorted(set(fields) - TEMPLATE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown placeholders {unknown}, expected some of {sorted(TEMPLATE_FIELDS)}; "
+                         f"write literal braces as {{{{ }}}}")
+
+
+@dataclass(frozen=True)
+class FollowUpSequence:
+    """Ordered follow-up stages, each delay counts from the previous touch"""
+    stages: Tuple[SequenceStage, ...]
+    stop_on: FrozenSet[str] = field(default=DEFAULT_STOP_ON)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FollowUpSequence':
+        stages = tuple(
+            SequenceStage(float(stage['delay_days']), stage['template'], stage.get('subject'))
+            for stage in data.get('stages', [])
+        )
+        if any(stage.delay_days <= 0 for stage in stages):
+            raise ValueError("Stage delays must be positive")
+        for number, stage in enumerate(stages, 1):
+            for text in (stage.template, stage.subject or ''):
+                try:
+                    check_template(text)
+                except ValueError as e:
+                    raise ValueError(f"Stage {number}: {e}") from None
+        stop_on = frozenset(data.get('stop_on', DEFAULT_STOP_ON))
+        unknown = stop_on - STOP_REASONS
+        if unknown:
+            raise ValueError(f"Unknown stop conditions: {sorted(unknown)}")
+        return cls(stages, stop_on)
+
+    def delay_before(self, stage: int) -> Optional[timedelta]:
+        """Wait before follow-up number `stage` (0-based), None once the sequence is done"""
+        if stage >= len(self.stages):
+            return None
+        return timedelta(days=self.stages[stage].delay_days)
+
+
+DEFAULT_SEQUENCE = FollowUpSequence((SequenceStage(FOLLOWUP_DELAY_DAYS, DEFAULT_TEMPLATE),))
+
+
+def name_from_address(address: Optional[str], full: bool = False) -> Optional[str]:
+    """
+    Name from a first.last style address: 'jan.de-vries@x.nl' -> 'Jan', or
+    'Jan De-Vries' with `full`. None for role mailboxes and local parts that
+    aren't clearly a name (e.g. 'jdevries'), rows carry no name columns.
+    """
+    local = (address or '').split('@')[0].split('+')[0].lower()
+    parts = [part for part in re.split(r'[._]', local) if part]
+    if (len(parts) < 2 or parts[0] in ROLE_MAILBOXES
+            or not all(len(part) > 1 and part.replace('-', '').isalpha() for part in parts)):
+        return None
+    return ' '.join(part.capitalize() for part in (parts if full else parts[:1]))
+
+
+def load_sequences(path: str = FOLLOWUP_SEQUENCES_FILE) -> Dict[str, FollowUpSequence]:
+    """Sequences by campaign id, the 'default' key applies to every other campaign"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {campaign_id: FollowUpSequence.from_dict(data) for campaign_id, data in json.load(f).items()}
+
+
+def stop_reason(email: Dict) -> str:
+    """Why an incoming email ends the sequence of its conversation"""
+    label = email.get('auto_classification')
+    if label == BOUNCE:
+        return STOP_BOUNCE
+    if label == AUTO_REPLY:
+        return STOP_AUTO_REPLY
+    if UNSUBSCRIBE.search(email.get('subject') or '') or UNSUBSCRIBE.search(email.get('body') or ''):
+        return STOP_UNSUBSCRIBE
+    return STOP_REPLY
+
+
+class SequenceEngine:
+    """
+    Multi-stage follow-ups per campaign.
+
+    State lives on the initial received_email row: followup_stage counts the
+    follow-ups sent so far and followup_due_at is when the next one is due
+    (null once the sequence finished or stopped, followup_stop_reason says
+    why). Due work is read through the followup_due_at index only, so a tick
+    costs O(due rows) no matter how many sequences are active.
+    """
+
+    def __init__(self, sequences: Optional[Dict[str, FollowUpSequence]] = None,
+                 path: str = FOLLOWUP_SEQUENCES_FILE):
+        self.path = path
+        self._sequences = sequences
+
+    @property
+    def sequences(self) -> Dict[str, FollowUpSequence]:
+        if self._sequences is None:
+            self._sequences = load_sequences(self.path)
+        return self._sequences
+
+    def reload(self) -> None:
+        self._sequences = load_sequences(self.path)
+
+    def sequence_for(self, campaign_id: Optional[str]) -> FollowUpSequence:
+        sequences = self.sequences
+        return sequences.get(campaign_id) or sequences.get('default') or DEFAULT_SEQUENCE
+
+    def first_delay_days(self, campaign_id: Optional[str]) -> Optional[float]:
+        """Days from the initial email to the first follow-up, None without follow-ups"""
+        delay = self.sequence_for(campaign_id).delay_before(0)
+        return delay.total_seconds() / 86400 if delay is not None else None
+
+    @staticmethod
+    def stage_of(row: Dict) -> int:
+        return row.get('followup_stage') or 0
+
+    def is_finished(self, row: Dict) -> bool:
+        return self.sequence_for(row.get('campaign_id')).delay_before(self.stage_of(row)) is None
+
+    def render(self, row: Dict) -> Tuple[str, str]:
+        """Subject and body of the row's next follow-up"""
+        stage = self.sequence_for(row.get('campaign_id')).stages[self.stage_of(row)]
+        clean_subject = re.sub(r'^(Re:\s*|Fwd:\s*)*', '', row.get('subject') or '', flags=re.IGNORECASE)
+        # Templates were checked against these fields when the sequence was loaded
+        values = dict(
+            recipient_name=name_from_address(row.get('recipient')) or 'there',
+            sender_name=name_from_address(row.get('sender'), full=True) or '',
+            recipient=row.get('recipient') or '',
+            sender=row.get('sender') or '',
+            subject=clean_subject,
+        )
+        subject = stage.subject.format_map(values) if stage.subject else f"Re: {clean_subject}"
+        return subject, stage.template.format_map(values)
+
+    def advance(self, rows: Iterable[Dict], now: Optional[datetime] = None) -> int:
+        """
+        Move rows whose follow-up was just sent to their next stage, with one
+        update per (campaign, stage) group. Returns the number of rows updated.
+        """
+        now = now or datetime.now(pytz.UTC)
+        groups: Dict[Tuple[Optional[str], int], List] = {}
+        for row in rows:
+            groups.setdefault((row.get('campaign_id'), self.stage_of(row) + 1), []).append(row['id'])
+
+        updated = 0
+        for (campaign_id, next_stage), ids in groups.items():
+            delay = self.sequence_for(campaign_id).delay_before(next_stage)
+            due_at = (now + delay).isoformat() if delay is not None else None
+            updated += update_followup_due(
+                ids, due_at, {'followup_stage': next_stage, 'followup_send': True, 'followup_attempts': 0}
+            )
+        return updated
+
+    def retry(self, rows: Iterable[Dict], retry_delay: timedelta, max_attempts: int,
+              now: Optional[datetime] = None) -> int:
+        """
+        Make rows whose follow-up failed to send due again after `retry_delay`,
+        with one update per attempt count. Rows that failed `max_attempts`
+        times stop with STOP_SEND_FAILED. Returns the number of rows stopped.
+        """
+        retry_at = ((now or datetime.now(pytz.UTC)) + retry_delay).isoformat()
+        groups: Dict[int, List] = {}
+        for row in rows:
+            groups.setdefault((row.get('followup_attempts') or 0) + 1, []).append(row['id'])
+
+        stopped = 0
+        for attempts, ids in groups.items():
+            if attempts >= max_attempts:
+                stopped += update_followup_due(
+                    ids, None, {'followup_attempts': attempts, 'followup_stop_reason': STOP_SEND_FAILED}
+                )
+                logger.warning(f"Stopped {len(ids)} follow-up sequences after {attempts} failed attempts")
+            else:
+                update_followup_due(ids, retry_at, {'followup_attempts': attempts})
+        return stopped
+
+    def finish(self, rows: Iterable[Dict]) -> int:
+        """End the sequences of rows that have no stage left, e.g. after a config change"""
+        ids = [row['id'] for row in rows]
+        return update_followup_due(ids, None, {'followup_send': True}) if ids else 0
+
+    def handle_incoming(self, emails: Iterable[Dict], chunk_size: int = 50) -> int:
+        """
+        Stop the sequences of every conversation with a new incoming email,
+        when the campaign's stop_on includes the email's stop reason.
+        Returns the number of sequences that were stopped.
+        """
+        reasons: Dict[str, str] = {}
+        for email in emails:
+            conversation_id = email.get('conversation_id')
+            if not conversation_id or email.get('record_type', 'received') != 'received':
+                continue
+            reason = stop_reason(email)
+            current = reasons.get(conversation_id)
+            if current is None or STOP_PRIORITY.index(reason) < STOP_PRIORITY.index(current):
+                reasons[conversation_id] = reason
+
+        ids_by_reason: Dict[str, List] = {}
+        conversation_ids = sorted(reasons)
+        for i in range(0, len(conversation_ids), chunk_size):
+            rows = supabase_client.client.from_('received_email') \
+                .select('id, campaign_id, conversational_id') \
+                .in_('conversational_id', conversation_ids[i:i + chunk_size]) \
+                .eq('email_type', 'initial') \
+                .not_.is_('followup_due_at', 'null') \
+                .execute().data or []
+            for row in rows:
+                reason = reasons[row['conversational_id']]
+                if reason in self.sequence_for(row.get('campaign_id')).stop_on:
+                    ids_by_reason.setdefault(reason, []).append(row['id'])
+
+        stopped = 0
+        for reason, ids in ids_by_reason.items():
+            stopped += update_followup_due(ids, None, {'followup_stop_reason': reason})
+            logger.info(f"Stopped {len(ids)} follow-up sequences on {reason}")
+        return stopped
+
+
+sequence_engine = SequenceEngine()
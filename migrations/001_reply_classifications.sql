@@ -0,0 +1,13 @@
+-- Reply classifications written by store_reply_classifications
+-- (src/lib/supabase_client.py): the relatedness flag next to
+-- level_of_interest, and one drafted reply per received email.
+
+ALTER TABLE received_email
+    ADD COLUMN IF NOT EXISTS is_related boolean;
+
+CREATE TABLE IF NOT EXISTS reply_drafts (
+    email_id text PRIMARY KEY,
+    subject text,
+    body text NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
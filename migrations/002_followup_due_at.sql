@@ -0,0 +1,16 @@
+-- Due time of the next follow-up, set when an initial email is stored
+-- (normalize_email_record) and cleared once a reply arrives or the sequence
+-- ends. FollowUpManager.iter_followup_candidates reads due rows with
+-- followup_due_at <= now() and next_followup_due the earliest one, the
+-- partial index keeps both to the pending rows only.
+--
+-- Initial emails stored before this column existed get their due time from
+-- their campaign's first stage with a one-off run of
+-- FollowUpManager().backfill_followup_due().
+
+ALTER TABLE received_email
+    ADD COLUMN IF NOT EXISTS followup_due_at timestamptz;
+
+CREATE INDEX IF NOT EXISTS received_email_followup_due_at
+    ON received_email (followup_due_at)
+    WHERE followup_due_at IS NOT NULL;
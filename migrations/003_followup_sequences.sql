@@ -0,0 +1,9 @@
+-- Follow-up sequence state on the initial received_email row, written by
+-- SequenceEngine (follow_up/sequence_engine.py): the number of stages sent,
+-- failed sends of the current stage, and why the sequence stopped early
+-- (reply, bounce, unsubscribe, auto_reply or send_failed).
+
+ALTER TABLE received_email
+    ADD COLUMN IF NOT EXISTS followup_stage integer NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS followup_attempts integer NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS followup_stop_reason text;
@@ -1,24 +1,37 @@
 import os
 import json
+import logging
 from datetime import datetime, timezone, timedelta, date
 from dotenv import load_dotenv
-from src.email_management.src.lib.imap_tools_based_functions import EmailManager
+from src.email_management.src.lib.imap_tools_based_functions import EmailManager, save_delta_tokens
 from src.email_management.src.lib.anthropic_agent import AnthropicAgent
 from src.email_management.src.lib.prompts import system_prompt
 from rich.console import Console
 from pydantic import BaseModel, Field
 from src.email_management.src.lib.gpt_agent import get_beta_generation
-from src.email_management.src.lib.supabase_client import post, update, get_one, supabase_client, post_email
+from src.email_management.src.lib.supabase_client import (
+    post, update, get_one, supabase_client, post_email, EmailRecordBuffer, mark_conversations_replied
+)
 from src.email_management.sender import clean_subject
+from src.email_management.src.lib.thread_matcher import thread_matcher
+from src.email_management.src.lib.auto_reply_classifier import classify_auto_reply
+from src.email_management.src.lib.html_extract import extract_first_message
+from src.email_management.src.lib.sender_registry import sender_registry
+from src.email_management.follow_up.sequence_engine import sequence_engine
+from src.email_management.src.lib.log_utils import configure_logging, get_logger, log_sampled, Lazy, payload_capture
+from src.email_management.src.lib.classification_pipeline import (
+    Reply, ProccessedEmailAnalysis, classify_replies
+)
 import traceback
 import re
 import uuid
 import base64
 from pathlib import Path
-from typing import Dict
-from bs4 import BeautifulSoup
+from typing import Dict, List, Optional, Tuple, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 console = Console()
+logger = get_logger(__name__)
 
 COMPANY_DOMAINS = [
     'veloxforce.de',
@@ -28,114 +41,117 @@ COMPANY_DOMAINS = [
     'toveloxforce.com'
 ]
 
-class Reply(BaseModel):
-    subject: str = Field(..., description="The subject of the reply email")
-    body: str = Field(..., description="The body of the reply email")
-
-class ProccessedEmailAnalysis(BaseModel): ##
-    level_of_interest: str = Field(..., description="The level of interest of the user that sent the reply (e.g., 'high', 'medium', 'low', 'not_intrested','rude')")
-    is_related: bool = Field(..., description="True if the reply is related to the email of the campaign, False if unrelated.")
-    reply: Reply = Field(..., description="Based on the level of interest, generate an appropriate response. If the level of interest is low and the behavior is rude, generate a polite apology, else generate a tailored response.")
-
-
 LAST_RUN_FILE = 'last_run.json'
+# 'delta' keeps a per-mailbox Graph delta token instead of re-listing by time
+INBOX_SYNC_MODE = os.getenv('INBOX_SYNC_MODE', 'window')
+POLL_CONCURRENCY = int(os.getenv('POLL_CONCURRENCY', 8))
+POLL_ACCOUNT_TIMEOUT = float(os.getenv('POLL_ACCOUNT_TIMEOUT', 60))  # seconds per Graph request
 PROCESSED_EMAILS_FILE = 'processed_emails.json'
+EMAIL_WRITE_BATCH_SIZE = int(os.getenv('EMAIL_WRITE_BATCH_SIZE', 100))
+# Classify inbound replies with the LLM after they are stored
+CLASSIFY_REPLIES = os.getenv('CLASSIFY_REPLIES', 'false').lower() == 'true'
 
 
-def load_last_run_time(): ###
+def _read_last_run_file() -> Dict:
     if os.path.exists(LAST_RUN_FILE):
         with open(LAST_RUN_FILE, 'r') as f:
-            data = json.load(f)
-        return datetime.fromisoformat(data['last_run'])
-    return datetime.now(timezone.utc) - timedelta(days=7)  # Default to 7 days ago if no last run
-
-
-def save_last_run_time(): ###
-    with open(LAST_RUN_FILE, 'w') as f:
-        json.dump({'last_run': datetime.now(timezone.utc).isoformat()}, f)
+            return json.load(f)
+    return {}
 
 
+def load_last_run_time(mailbox: Optional[str] = None) -> datetime: ###
+    """Get the poll cursor of a mailbox, falling back to the old shared cursor"""
+    data = _read_last_run_file()
+    last_run = data.get('mailboxes', {}).get(mailbox) or data.get('last_run')
+    if last_run:
+        return datetime.fromisoformat(last_run)
+    return datetime.now(timezone.utc) - timedelta(days=7)  # Default to 7 days ago if no last run
 
 
+def save_last_run_times(cursors: Dict[str, datetime]) -> None: ###
+    """Advance the poll cursors of the given mailboxes, leaving the others untouched"""
+    data = _read_last_run_file()
+    mailboxes = data.setdefault('mailboxes', {})
+    for mailbox, last_run in cursors.items():
+        mailboxes[mailbox] = last_run.isoformat()
+    tmp_path = f"{LAST_RUN_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, LAST_RUN_FILE)
+
+
+def get_worker_accounts() -> List[Dict]:
+    """Worker mailbox credentials from the shared sender registry"""
+    return sender_registry.accounts()
+
+
+def fetch_mailbox(account: Dict, size: int, timeout: float) -> Tuple[datetime, List[Dict], Dict[str, str]]:
+    """Fetch new raw emails of one mailbox, returns (poll start time, emails, new delta links)"""
+    # Take the cursor before fetching so mail arriving meanwhile is seen next poll
+    started_at = datetime.now(timezone.utc)
+    email_manager = EmailManager(
+        client_id=account['client_id'],
+        client_secret=account['client_secret'],
+        tenant_id=account['tenant_id'],
+        username=account['email'],
+        timeout=timeout
+    )
+
+    # Fetch raw emails, either incrementally via delta sync or by time window
+    since = load_last_run_time(account['email'])
+    if INBOX_SYNC_MODE == 'delta':
+        # `since` only bounds a folder's first sync, later ones follow the delta token
+        raw_emails, delta_links = email_manager.sync_emails(since, strict=True)
+    else:
+        raw_emails, delta_links = email_manager.fetch_recent_emails(since, size, strict=True), {}
+    return started_at, raw_emails, delta_links
+
+
+def poll_mailboxes(accounts: List[Dict], size: int, max_concurrency: int = POLL_CONCURRENCY,
+                   timeout: float = POLL_ACCOUNT_TIMEOUT) -> Iterator[Tuple[Dict, datetime, List[Dict], Dict[str, str]]]:
+    """
+    Fetch all mailboxes concurrently, yielding (account, started_at, raw_emails,
+    delta_links) as each one finishes. Failed or timed-out mailboxes are logged
+    and skipped.
+    """
+    if not accounts:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(accounts)))) as executor:
+        futures = {
+            executor.submit(fetch_mailbox, account, size, timeout): account
+            for account in accounts
+        }
+        for future in as_completed(futures):
+            account = futures[future]
+            try:
+                started_at, raw_emails, delta_links = future.result()
+            except Exception:
+                logger.exception("Failed to fetch %s", account['email'])
+                continue
+            yield account, started_at, raw_emails, delta_links
 
 
 
 
 def find_parent_email(email_data):
     """Find the original outbound email that this is a reply to"""
-    print("\n=== Email Matching Debug ===")
-    print(f"Incoming email from: {email_data['sender'].lower()}")
-    print(f"Incoming email to: {email_data['recipient'].lower()}")
-    print(f"Original subject: {email_data['subject']}")
-    
-    # Clean the subject
-    cleaned_subject = clean_subject(email_data['subject'])
-    print(f"Cleaned subject: {cleaned_subject}")
-    
-    # Try to find by subject first
-    result = supabase_client.client.from_("outbound_email") \
-        .select("*") \
-        .or_(f"subject.eq.{cleaned_subject},conversation_topic.eq.{cleaned_subject}") \
-        .execute()
-    
-    print(f"\nQuery returned {len(result.data)} potential matches")
-    
-    matching_emails = []
-    for email in result.data:
-        print(f"\nChecking potential match:")
-        print(f"DB Email ID: {email['email_id']}")
-        print(f"DB Sender: {email['sender']}")
-        print(f"DB Recipient: {email['recipient']}")
-        print(f"DB Subject: {email['subject']}")
-        print(f"DB Conv Topic: {email.get('conversation_topic', '')}")
-        
-        # Compare email addresses case-insensitively
-        sender_matches = email['recipient'].lower() == email_data['sender'].lower()
-        recipient_matches = email['sender'].lower() == email_data['recipient'].lower()
-        
-        print(f"Sender match result: {sender_matches}")
-        print(f"Recipient match result: {recipient_matches}")
-        
-        if sender_matches and recipient_matches:
-            matching_emails.append(email)
-            print(f"MATCH FOUND!")
-            print(f"ID: {email['email_id']}")
-            print(f"Subject: {email['subject']}")
-            print(f"Created at: {email['created_at']}")
-            print(f"Convo ID: {email['convo_id']}")
-    
-    if matching_emails:
-        # Return the most recent matching email
-        print("\nFound multiple matches, using most recent")
-        return sorted(matching_emails, key=lambda x: x['created_at'])[-1]
-    
-    print("\nNo matching email found")
-    return None
-
-
-def extract_first_message(html_content):
-    # Parse HTML
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Find the first div with class 'elementToProof'
-    first_message = soup.find('div', class_='elementToProof')
-    
-    # Return the text if found, otherwise return None
-    return first_message.text.strip() if first_message else None
-
-# Usage example:
-html_content = """your HTML content here"""
-main_message = extract_first_message(html_content)
+    parent = thread_matcher.find_parent(email_data)
+    if parent:
+        logger.debug("Matched reply %s to outbound email %s", email_data.get('email_id'), parent['email_id'])
+    else:
+        logger.debug("No matching email found for %s", email_data.get('email_id'))
+    return parent
 
 
-def process_raw_email(raw_email: Dict) -> Dict:
-    """Extract relevant fields from raw email data and store in database"""
+def process_raw_email(raw_email: Dict, buffer: Optional[EmailRecordBuffer] = None) -> Dict:
+    """
+    Extract relevant fields from raw email data and store in database.
+    When a buffer is given the record is queued for a batched write instead.
+    """
     # Extract headers from internetMessageHeaders if available
     headers = {}
-    #dump raw email in json file in current directory
-    current_directory = os.path.dirname(os.path.abspath(__file__))
-    with open(os.path.join(current_directory, 'raw_email.json'), 'w') as f:
-        json.dump(raw_email, f)
+    # Keeps a reference only, nothing is serialized unless the capture is dumped
+    payload_capture.capture('raw_email', raw_email)
         
     if 'internetMessageHeaders' in raw_email:
         headers = {
@@ -143,8 +159,7 @@ def process_raw_email(raw_email: Dict) -> Dict:
             for header in raw_email['internetMessageHeaders']
         }
     
-    print("\n=== Processing Raw Email ===")
-    print(f"Raw email ID: {raw_email}")
+    log_sampled(logger, logging.DEBUG, "Raw email: %s", Lazy(json.dumps, raw_email))
     
     # Extract sender and recipient with better error handling
     sender = None
@@ -213,98 +228,111 @@ def process_raw_email(raw_email: Dict) -> Dict:
         'last_modified_datetime': raw_email.get('lastModifiedDateTime')
     }
 
+    # Auto-replies and bounces are settled here and never reach the LLM stage
+    auto_label = classify_auto_reply(headers, sender, processed_email['subject'], body)
+    if auto_label:
+        processed_email['auto_classification'] = auto_label
+        processed_email['level_of_interest'] = auto_label
+
     # Debug logging
-    print("\n=== Extracted Email Data ===")
-    print(f"Email ID: {processed_email['email_id']}")
-    print(f"Sender: {processed_email['sender']}")
-    print(f"Recipient: {processed_email['recipient']}")
-    print(f"Subject: {processed_email['subject']}")
-    print(f"Created at: {processed_email['created_at']}")
-    
-    print(f"Message ID: {processed_email['message_id']}")
-    print(f"Conversation ID: {processed_email['conversation_id']}")
+    logger.debug(
+        "Extracted email %s from %s to %s, subject %r, created %s, message id %s, conversation %s",
+        processed_email['email_id'], processed_email['sender'], processed_email['recipient'],
+        processed_email['subject'], processed_email['created_at'],
+        processed_email['message_id'], processed_email['conversation_id']
+    )
 
 
-    if processed_email['conversation_id']:
-        # Query for matching conversation_id but different email_id
-        result = supabase_client.client.from_("received_email") \
-            .select("*") \
-            .eq("conversational_id", processed_email['conversation_id']) \
-            .neq("email_id", processed_email['email_id'])  \
-            .execute()
-        
-        print(f"Found {len(result.data)} matching conversations")
-        
-        # Update status for all emails in same conversation but different email_id
-        if result.data:
-            for row in result.data:
-                if not row.get('replied'):
-                    update_result = supabase_client.client.from_("received_email") \
-                        .update({"replied": True}) \
-                        .eq("email_id", row['email_id']) \
-                        .execute()
-                    print(f"Updated replied status for email_id: {row['email_id']}")
+    # In batch mode the caller propagates replies for the whole batch at once
+    if processed_email['conversation_id'] and buffer is None:
+        updated = mark_conversations_replied(
+            [(processed_email['conversation_id'], processed_email['email_id'])]
+        )
+        logger.debug("Updated replied status for %d emails", updated)
 
     # Extract direction from headers
     # Extract direction from headers
     email_direction = headers.get('x-ms-exchange-organization-messagedirectionality', '').lower()
-    print(f"Email direction: {email_direction}")
+    logger.debug("Email direction: %s", email_direction)
     # Determine if email is incoming or outgoing
     if email_direction == 'incoming':
         body = extract_first_message(processed_email['body'])
-        print(f"body: {body}")
+        log_sampled(logger, logging.DEBUG, "Extracted body: %s", body)
 
         processed_email['body'] = body
     
-        post_email(processed_email, email_type='received')
+        email_type = 'received'
     else:
         # If not explicitly incoming, treat as outgoing
-        print('go into processing outcound reply')
-        post_email(processed_email, email_type='reply_outbound')
+        logger.debug("Processing outbound reply %s", processed_email['email_id'])
+        email_type = 'reply_outbound'
+
+    if buffer is not None:
+        buffer.add(processed_email, email_type)
+    else:
+        post_email(processed_email, email_type=email_type)
 
     
     # Remove None values for cleaner output
     processed_email = {k: v for k, v in processed_email.items() if v is not None}
+    processed_email['record_type'] = email_type
+
+    if buffer is None:
+        sequence_engine.handle_incoming([processed_email])
     
     return processed_email
 
 
 def main(size: int = 10):
+    configure_logging()
     try:
         print('\n=== Starting New Email Processing Session ===')
         
-        WORKER_EMAILS_COUNT = int(os.getenv('WORKER_EMAILS_COUNT', 0))
-        print(f'Found {WORKER_EMAILS_COUNT} worker email accounts')
+        accounts = get_worker_accounts()
+        print(f'Found {len(accounts)} worker email accounts')
         
-        last_run_time = load_last_run_time()
-        print(f"Checking for emails since: {last_run_time}")
         processed_emails = []
-
-        for i in range(WORKER_EMAILS_COUNT):
-            current_account = i + 1
-            worker_email = os.getenv(f'MS365_EMAIL_{current_account}')
-            print(f"\n=== Checking Account {current_account}: {worker_email} ===")
-            
-            email_manager = EmailManager(
-                client_id=os.getenv(f'CLIENT_ID_{current_account}'),
-                client_secret=os.getenv(f'CLIENT_SECRET_{current_account}'),
-                tenant_id=os.getenv(f'TENANT_ID_{current_account}'),
-                username=worker_email
-            )
-            
-            # Fetch raw emails with size limit
-            raw_emails = email_manager.fetch_recent_emails(last_run_time, size)
-            print(f"raw_emailszzzz: {len(raw_emails)}")
-            # Process each email
+        cursors = {}
+        delta_links = {}
+        # Strict, so a failed write stops the run before any cursor moves
+        buffer = EmailRecordBuffer(batch_size=EMAIL_WRITE_BATCH_SIZE, strict=True)
+
+        # Mailboxes are fetched concurrently, processing stays in this thread
+        for account, started_at, raw_emails, mailbox_delta_links in poll_mailboxes(accounts, size):
+            worker_email = account['email']
+            print(f"\n=== Processing {len(raw_emails)} emails from {worker_email} ===")
             for raw_email in raw_emails:
-                processed_email = process_raw_email(raw_email)
-                print(f"processed email: {processed_email}")
+                processed_email = process_raw_email(raw_email, buffer)
+                log_sampled(logger, logging.DEBUG, "Processed email: %s", processed_email)
                 processed_emails.append(processed_email)
-            
                 
             print(f"Processed {len(raw_emails)} emails from {worker_email}")
-
-        save_last_run_time()
+            cursors[worker_email] = started_at
+            delta_links[worker_email] = mailbox_delta_links
+
+        # Mark earlier emails of every touched conversation as replied in one go
+        replied_count = mark_conversations_replied(
+            [(email.get('conversation_id'), email.get('email_id')) for email in processed_emails]
+        )
+        print(f"Marked {replied_count} emails as replied across {len(processed_emails)} incoming emails")
+        # Replies, bounces and unsubscribes end the follow-up sequences of their conversations
+        sequence_engine.handle_incoming(processed_emails)
+
+        # Store everything before advancing the cursors and delta tokens, a
+        # failed write raises and leaves them so the next poll fetches these again
+        buffer.flush()
+        save_last_run_times(cursors)
+        for mailbox, links in delta_links.items():
+            if links:
+                save_delta_tokens(mailbox, links)
+
+        if CLASSIFY_REPLIES:
+            replies = [
+                email for email in processed_emails
+                if email.get('record_type') == 'received' and not email.get('auto_classification')
+            ]
+            if replies:
+                classify_replies(replies)
         return processed_emails[:size]  # Limit total results to requested size
 
     except Exception as e:
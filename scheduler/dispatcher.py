@@ -0,0 +1,140 @@
+# filename: dispatcher.py
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str, Dict], Awaitable[None]]
+IdleCallback = Callable[[], Awaitable[None]]
+
+
+class SendDispatcher:
+    """
+    Dispatches queued emails in scheduled-time order.
+
+    Pending queue entries sit in a min-heap keyed by their scheduled time,
+    parsed once when they are added. The run loop sleeps until the next entry
+    is due and wakes early when add() pushes an earlier one, so new campaigns
+    can be fed into a running dispatcher. It returns once the heap is empty.
+
+    A dispatched entry stays pending in its tracker queue until the send
+    completes, so it is held as in flight until done() is called for it and
+    load() skips it meanwhile.
+    """
+
+    def __init__(self, idle_threshold: float = 5.0):
+        # Gaps shorter than this don't count as idle time
+        self.idle_threshold = idle_threshold
+        self._heap: List[Tuple[float, int, str, Dict]] = []
+        self._counter = itertools.count()
+        self._keys = set()
+        self._in_flight = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self.running = False
+        self.dispatched = 0
+        self.max_lateness = 0.0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @staticmethod
+    def _key(entry: Dict):
+        queue_id = entry.get("queue_id")
+        return ("queue_id", queue_id) if queue_id is not None else ("object", id(entry))
+
+    def add(self, sender_email: str, entry: Dict) -> bool:
+        """Queue an entry for dispatch, returns False if it is already queued or in flight"""
+        key = self._key(entry)
+        if key in self._keys or key in self._in_flight:
+            return False
+        due = datetime.fromisoformat(entry["scheduled_time"]).timestamp()
+        heapq.heappush(self._heap, (due, next(self._counter), sender_email, entry))
+        self._keys.add(key)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    def load(self, tracker: Dict) -> int:
+        """Queue every pending entry of the tracker, returns how many were added"""
+        added = 0
+        for sender_email, sender_data in tracker["sending_accounts"].items():
+            for entry in sender_data["email_queue"]:
+                if entry.get("status", "pending") == "pending" and self.add(sender_email, entry):
+                    added += 1
+        return added
+
+    def next_due(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[Tuple[str, Dict]]:
+        """Remove and return all entries due at `now`, earliest first"""
+        now = time.time() if now is None else now
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_at, _, sender_email, entry = heapq.heappop(self._heap)
+            key = self._key(entry)
+            self._keys.discard(key)
+            self._in_flight.add(key)
+            self.max_lateness = max(self.max_lateness, now - due_at)
+            due.append((sender_email, entry))
+        return due
+
+    def done(self, entry: Dict) -> None:
+        """
+        Release a dispatched entry once its send has finished, after it left
+        the tracker queue. An entry still pending there can be loaded again.
+        """
+        self._in_flight.discard(self._key(entry))
+
+    async def run(self, handler: Handler, on_idle: Optional[IdleCallback] = None) -> None:
+        """
+        Call `handler(sender_email, entry)` for each entry once it is due.
+        `on_idle` is awaited before sleeping through a gap of at least
+        `idle_threshold` seconds and once more before returning.
+        """
+        self._wakeup = asyncio.Event()
+        self.running = True
+        try:
+            while self._heap:
+                for sender_email, entry in self.pop_due():
+                    await handler(sender_email, entry)
+                    self.dispatched += 1
+
+                next_due = self.next_due()
+                if next_due is None:
+                    break
+                delay = next_due - time.time()
+                if delay <= 0:
+                    continue
+
+                if on_idle is not None and delay >= self.idle_threshold:
+                    await on_idle()
+                # Re-check after the idle work, add() may have pushed an earlier entry
+                delay = self.next_due() - time.time()
+                if delay <= 0:
+                    continue
+                logger.info(f"Next email due in {delay:.0f}s, {len(self._heap)} queued")
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.running = False
+            self._wakeup = None
+            if on_idle is not None:
+                await on_idle()
+
+    def stats(self) -> Dict:
+        return {
+            "queued": len(self._heap),
+            "dispatched": self.dispatched,
+            "in_flight": len(self._in_flight),
+            "max_lateness_seconds": round(self.max_lateness, 3),
+        }
@@ -1,12 +1,21 @@
 # filename: email_distributor.py
 
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional
 import pytz
 from .models.email_schedule import EmailData, SenderSchedule
+from .models.sending_rules import SendingRules, default_rules
 from .utils.time_utils import calculate_next_valid_time
 
 class EmailDistributor:
+    def __init__(self, rules: Optional[SendingRules] = None):
+        self._rules = rules
+
+    @property
+    def rules(self) -> SendingRules:
+        # Without explicit rules follow the rules file, edits apply without a restart
+        return self._rules or default_rules()
+
     def distribute_emails(
         self,
         emails: List[Dict],
@@ -56,8 +65,9 @@ class EmailDistributor:
                 
             # Calculate next valid send time
             current_time = calculate_next_valid_time(
-                current_time + timedelta(minutes=20),
-                email_data.get('timezone', 'Europe/Amsterdam')
+                current_time + timedelta(minutes=self.rules.min_gap_minutes),
+                email_data.get('timezone', 'Europe/Amsterdam'),
+                self.rules
             )
             
             # Create EmailData object
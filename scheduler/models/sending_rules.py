@@ -0,0 +1,210 @@
+# filename: sending_rules.py
+
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import pytz
+
+from ..utils.business_calendar import BusinessCalendar, get_calendar
+from ..utils.validation import validate_sending_rules
+
+logger = logging.getLogger(__name__)
+
+# {"default": {...rules...}, "campaigns": {"<campaign_id>": {...overrides...}}}
+SENDING_RULES_FILE = os.getenv('SENDING_RULES_FILE', 'src/email_management/scheduler/sending_rules.json')
+# Seconds between two checks of the rules file's mtime
+SENDING_RULES_CHECK_INTERVAL = float(os.getenv('SENDING_RULES_CHECK_INTERVAL', 5))
+
+DEFAULT_RULES = {
+    "allowed_hours": {"start": "07:00", "end": "18:00"},
+    "excluded_days": ["Sunday"],
+    "min_time_between_emails": 20,
+    "daily_limit_per_sender": 30,
+    # ISO country code or timezone name -> ISO dates without sending
+    "holidays": {},
+    # Sender address -> daily limit, beats the account's own limit
+    "sender_limits": {}
+}
+
+# Timezone -> ISO country code, for the per-country holidays
+TIMEZONE_COUNTRIES = {
+    tz_name: country
+    for country, tz_names in pytz.country_timezones.items()
+    for tz_name in tz_names
+}
+
+
+def _merge(base: Dict, overrides: Dict) -> Dict:
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = {**merged[key], **value}
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+@dataclass(frozen=True)
+class SendingRules:
+    """
+    Validated sending rules: recipient business hours, excluded days,
+    holidays per country, spacing and per-sender daily limits.
+
+    Business hours are answered from shared per-timezone BusinessCalendars,
+    resolved once per timezone and then looked up in O(1).
+    """
+    rules: Dict = field(default_factory=lambda: copy.deepcopy(DEFAULT_RULES))
+    _calendars: Dict[str, BusinessCalendar] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if not validate_sending_rules(self.rules):
+            raise ValueError(f"Invalid sending rules: {self.rules}")
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict] = None) -> 'SendingRules':
+        """Rules from a possibly partial dict, missing settings keep their defaults"""
+        return cls(_merge(DEFAULT_RULES, data or {}))
+
+    def merged(self, overrides: Optional[Dict]) -> 'SendingRules':
+        """These rules with a campaign's overrides applied"""
+        return SendingRules(_merge(self.rules, overrides)) if overrides else self
+
+    def to_dict(self) -> Dict:
+        return copy.deepcopy(self.rules)
+
+    @property
+    def start(self) -> str:
+        return self.rules['allowed_hours']['start']
+
+    @property
+    def end(self) -> str:
+        return self.rules['allowed_hours']['end']
+
+    @property
+    def excluded_days(self) -> Tuple[str, ...]:
+        return tuple(sorted(set(self.rules['excluded_days'])))
+
+    @property
+    def min_gap_minutes(self) -> int:
+        return self.rules['min_time_between_emails']
+
+    @property
+    def daily_limit_per_sender(self) -> int:
+        return self.rules['daily_limit_per_sender']
+
+    def daily_limit_for(self, sender_email: str, account_limit: Optional[int] = None) -> int:
+        """Rule override for the sender, else the account's own limit, else the default"""
+        return self.rules['sender_limits'].get(sender_email) or account_limit or self.daily_limit_per_sender
+
+    def holidays_for(self, tz_name: str) -> Tuple[str, ...]:
+        holidays = self.rules['holidays']
+        dates = set(holidays.get(tz_name, ()))
+        country = TIMEZONE_COUNTRIES.get(tz_name)
+        if country:
+            dates.update(holidays.get(country, ()))
+        return tuple(sorted(dates))
+
+    def calendar(self, tz_name: str) -> BusinessCalendar:
+        calendar = self._calendars.get(tz_name)
+        if calendar is None:
+            calendar = get_calendar(tz_name, self.start, self.end, self.excluded_days, self.holidays_for(tz_name))
+            self._calendars[tz_name] = calendar
+        return calendar
+
+    def is_open(self, tz_name: str, moment: datetime) -> bool:
+        return self.calendar(tz_name).is_open_at(moment)
+
+    def next_open(self, tz_name: str, moment: datetime) -> datetime:
+        return self.calendar(tz_name).next_open_time(moment)
+
+
+def load_sending_rules(path: str = SENDING_RULES_FILE) -> Tuple[SendingRules, Dict[str, Dict]]:
+    """Default rules and the per-campaign overrides from the rules file"""
+    if not os.path.exists(path):
+        return SendingRules(), {}
+    with open(path) as f:
+        data = json.load(f)
+    return SendingRules.from_dict(data.get('default')), data.get('campaigns', {})
+
+
+class RulesFile:
+    """
+    The sending rules file, re-read when it changes.
+
+    The file's mtime is checked at most every `check_interval` seconds, so
+    the scheduling paths can ask for the current rules on every call. An
+    edit that doesn't parse or validate is logged and the previous rules
+    stay in effect; only the first load raises.
+    """
+
+    def __init__(self, path: str = SENDING_RULES_FILE, check_interval: float = SENDING_RULES_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._rules: Tuple[SendingRules, Dict[str, Dict]] = (SendingRules(), {})
+        self._mtime: Optional[float] = None
+        self._loaded = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def current(self) -> Tuple[SendingRules, Dict[str, Dict]]:
+        """Default rules and per-campaign overrides as the file has them now"""
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.check_interval:
+            return self._rules
+        with self._lock:
+            self._checked_at = now
+            mtime = self._file_mtime()
+            if self._loaded and mtime == self._mtime:
+                return self._rules
+            try:
+                self._rules = load_sending_rules(self.path)
+            except (OSError, ValueError) as e:
+                if not self._loaded:
+                    raise
+                logger.error(f"Keeping the previous sending rules, {self.path} is invalid: {str(e)}")
+            else:
+                if self._loaded:
+                    logger.info(f"Reloaded sending rules from {self.path}")
+            self._mtime = mtime
+            self._loaded = True
+            return self._rules
+
+
+rules_file = RulesFile()
+
+
+def default_rules() -> SendingRules:
+    """The rules file's defaults, picking up edits to the file"""
+    return rules_file.current()[0]
+
+
+def rules_for_campaign(campaign_id: Optional[str] = None, overrides: Optional[Dict] = None) -> SendingRules:
+    """
+    Rules of a campaign: the file's defaults, then its campaign section,
+    then `overrides` passed in by the caller. Raises ValueError if invalid.
+    """
+    base, campaigns = rules_file.current()
+    return base.merged(campaigns.get(campaign_id)).merged(overrides)
+
+
+def __getattr__(name: str):
+    # base_rules / campaign_rules used to be loaded once at import, keep them
+    # readable as module attributes but always current
+    if name == 'base_rules':
+        return default_rules()
+    if name == 'campaign_rules':
+        return rules_file.current()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
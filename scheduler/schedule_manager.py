@@ -13,24 +13,32 @@ import logging
 from .models.email_schedule import EmailData, SenderSchedule, CampaignTracker, EmailTracker
 from .utils.time_utils import is_valid_send_time, calculate_next_valid_time
 from .email_distributor import EmailDistributor
+from .utils.tracker_store import TrackerStore, tracker_store
+from .utils.tracker_utils import TRACKER_FILE, load_tracker
+from .models.sending_rules import SendingRules, default_rules
 
 logger = logging.getLogger(__name__)
 
 class ScheduleManager:
-    def __init__(self, tracker_file_path: str = 'src/email_management/trackers/sending_tracker.json'):
-        self.tracker_file_path = tracker_file_path
+    def __init__(self, tracker_file_path: str = TRACKER_FILE, store: Optional[TrackerStore] = None,
+                 rules: Optional[SendingRules] = None):
+        self.tracker_file_path = tracker_file_path  # Legacy JSON tracker, migrated on load
+        self.store = store or tracker_store
+        self._rules = rules
         self.tracker = self._load_or_create_tracker()
-        
+
+    @property
+    def rules(self) -> SendingRules:
+        # Without explicit rules follow the rules file, edits apply without a restart
+        return self._rules or default_rules()
+
     def _load_or_create_tracker(self) -> Dict:
         """Load existing tracker or create new one"""
-        if os.path.exists(self.tracker_file_path):
-            try:
-                with open(self.tracker_file_path, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Error loading tracker: {str(e)}")
-                return self._create_new_tracker()
-        return self._create_new_tracker()
+        try:
+            return load_tracker(self.tracker_file_path, self.store)
+        except Exception as e:
+            logger.error(f"Error loading tracker: {str(e)}")
+            return self._create_new_tracker()
         
     def _create_new_tracker(self) -> Dict:
         """Create new tracker with default structure"""
@@ -44,10 +52,9 @@ class ScheduleManager:
         }
         
     def _save_tracker(self):
-        """Save current tracker state to file"""
+        """Save current tracker state to the tracker store"""
         try:
-            with open(self.tracker_file_path, 'w') as f:
-                json.dump(self.tracker, f, indent=2)
+            self.store.save(self.tracker)
         except Exception as e:
             logger.error(f"Error saving tracker: {str(e)}")
             
@@ -58,28 +65,34 @@ class ScheduleManager:
             account.get("last_scheduled_time", 
             datetime.now(pytz.UTC).isoformat())
         )
-        return last_time + timedelta(minutes=20)
+        return last_time + timedelta(minutes=self.rules.min_gap_minutes)
         
     def update_sender_schedule(self, sender_email: str, scheduled_time: datetime,
                              email_data: Dict, campaign_id: str):
         """Add new email to sender's queue"""
         if sender_email not in self.tracker["sending_accounts"]:
             self.tracker["sending_accounts"][sender_email] = {
-                "daily_limit": 30,  # Default value
-                "time_between_emails": 20,
+                "daily_limit": self.rules.daily_limit_for(sender_email),
+                "time_between_emails": self.rules.min_gap_minutes,
                 "emails_sent_today": 0,
                 "last_reset_date": datetime.now(pytz.UTC).strftime("%Y-%m-%d"),
                 "last_scheduled_time": scheduled_time.isoformat(),
                 "email_queue": []
             }
+            self.store.save_account(sender_email, self.tracker["sending_accounts"][sender_email])
             
-        self.tracker["sending_accounts"][sender_email]["email_queue"].append({
+        entry = {
             "campaign_id": campaign_id,
             "scheduled_time": scheduled_time.isoformat(),
             "status": "pending",
             "attempt_count": 0,
             "last_attempt": None,
             "email_data": email_data
-        })
+        }
+        self.tracker["sending_accounts"][sender_email]["email_queue"].append(entry)
         
-        self._save_tracker()
\ No newline at end of file
+        # Single row insert instead of rewriting the whole tracker
+        try:
+            self.store.add_queued(sender_email, entry)
+        except Exception as e:
+            logger.error(f"Error saving queued email: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,86 @@
+# filename: send_workers.py
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from .utils.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SendFunction = Callable[[str, Dict], bool]
+
+
+class SenderWorkers:
+    """
+    One asyncio worker per sending account.
+
+    Every account has its own queue and TokenBucket, so a slow SMTP
+    handshake or a rate limit only holds up that account. The blocking send
+    itself runs on a bounded thread pool shared by all workers.
+    """
+
+    def __init__(self, send: SendFunction, limiter_factory: Callable[[str], TokenBucket],
+                 max_threads: int = 8):
+        self.send = send
+        self.limiter_factory = limiter_factory
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="email-send")
+        self.limiters: Dict[str, TokenBucket] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.sent: Dict[str, int] = {}
+        self.failed: Dict[str, int] = {}
+
+    def submit(self, sender_email: str, entry: Dict) -> None:
+        """Queue an entry on its account's worker, starting the worker if needed"""
+        queue = self._queues.get(sender_email)
+        if queue is None:
+            queue = self._queues[sender_email] = asyncio.Queue()
+            self.limiters[sender_email] = self.limiter_factory(sender_email)
+            self._tasks[sender_email] = asyncio.create_task(self._worker(sender_email, queue))
+        queue.put_nowait(entry)
+
+    async def _worker(self, sender_email: str, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        limiter = self.limiters[sender_email]
+        while True:
+            entry = await queue.get()
+            try:
+                await limiter.acquire()
+                success = await loop.run_in_executor(self.executor, self.send, sender_email, entry)
+                counts = self.sent if success else self.failed
+                counts[sender_email] = counts.get(sender_email, 0) + 1
+            except Exception as e:
+                logger.error(f"Send worker for {sender_email} failed: {str(e)}")
+                self.failed[sender_email] = self.failed.get(sender_email, 0) + 1
+            finally:
+                queue.task_done()
+
+    def pending(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    async def join(self) -> None:
+        """Wait until every queued entry has been handled"""
+        await asyncio.gather(*(queue.join() for queue in self._queues.values()))
+
+    async def close(self) -> None:
+        """Drain the queues, stop the workers and release the threads"""
+        await self.join()
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._queues.clear()
+        self._tasks.clear()
+        self.executor.shutdown(wait=True)
+
+    def stats(self) -> Dict:
+        return {
+            sender_email: {
+                "sent": self.sent.get(sender_email, 0),
+                "failed": self.failed.get(sender_email, 0),
+                "queued": self._queues[sender_email].qsize() if sender_email in self._queues else 0,
+                **limiter.stats(),
+            }
+            for sender_email, limiter in self.limiters.items()
+        }
@@ -7,6 +7,13 @@ from .time_utils import (
     parse_datetime
 )
 
+from .business_calendar import (
+    BusinessCalendar,
+    get_calendar,
+    calendar_for,
+    next_valid_times
+)
+
 from .validation import (
     validate_email_data,
     validate_sender_config,
@@ -18,6 +25,10 @@ __all__ = [
     'calculate_next_valid_time',
     'format_datetime',
     'parse_datetime',
+    'BusinessCalendar',
+    'get_calendar',
+    'calendar_for',
+    'next_valid_times',
     'validate_email_data',
     'validate_sender_config',
     'validate_sending_rules'
@@ -0,0 +1,198 @@
+# filename: business_calendar.py
+
+import math
+import threading
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Tuple, Union
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytz
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+# Days added whenever a query falls outside the precomputed range
+HORIZON_DAYS = 400
+# Days past a covered instant that must be precomputed to find the next window,
+# a week always has an open day and holidays rarely span more than a few days
+_LOOKAHEAD_DAYS = 21
+
+Timestamps = Union[float, Sequence[float], np.ndarray]
+
+
+def parse_hhmm(value: str) -> time:
+    """'07:00' -> time(7, 0)"""
+    hour, _, minute = value.partition(':')
+    return time(int(hour), int(minute or 0))
+
+
+class BusinessCalendar:
+    """
+    Business hours of one timezone as sorted UTC open/close instants.
+
+    Windows are built day by day from the zone's local opening hours with
+    zoneinfo, so DST changes shift them correctly, and the arrays are
+    extended on demand. Batch queries are a searchsorted over those arrays
+    for whole batches of epoch timestamps, the datetime helpers bisect the
+    same instants for single lookups.
+    """
+
+    def __init__(self, tz_name: str, start: time, end: time, excluded_weekdays: FrozenSet[int] = frozenset(),
+                 holidays: FrozenSet[date] = frozenset()):
+        if start >= end:
+            raise ValueError(f"Business hours must start before they end, got {start}-{end}")
+        if len(excluded_weekdays) >= 7:
+            raise ValueError("At least one weekday has to be a sending day")
+        self.tz_name = tz_name
+        self.zone = ZoneInfo(tz_name)
+        self.start = start
+        self.end = end
+        self.excluded_weekdays = excluded_weekdays
+        self.holidays = holidays
+        self._first_day: Union[date, None] = None
+        self._last_day: Union[date, None] = None
+        self._valid_from = np.inf
+        self._valid_until = -np.inf
+        self._windows = (np.empty(0), np.empty(0))
+        self._lists: Tuple[List[float], List[float]] = ([], [])
+        self._lock = threading.Lock()
+
+    def _midnight(self, day: date) -> float:
+        return datetime.combine(day, time(0), self.zone).timestamp()
+
+    def _build(self, first_day: date, last_day: date) -> None:
+        opens, closes = [], []
+        day = first_day
+        while day <= last_day:
+            if day.weekday() not in self.excluded_weekdays and day not in self.holidays:
+                opens.append(datetime.combine(day, self.start, self.zone).timestamp())
+                closes.append(datetime.combine(day, self.end, self.zone).timestamp())
+            day += timedelta(days=1)
+        self._first_day, self._last_day = first_day, last_day
+        self._windows = (np.array(opens), np.array(closes))
+        self._lists = (opens, closes)
+        self._valid_from = self._midnight(first_day + timedelta(days=1))
+        self._valid_until = self._midnight(last_day - timedelta(days=_LOOKAHEAD_DAYS))
+
+    def _extend(self, lo: float, hi: float) -> None:
+        with self._lock:
+            if self._valid_from <= lo and hi <= self._valid_until:
+                return
+            first_day = datetime.fromtimestamp(lo, self.zone).date() - timedelta(days=1)
+            last_day = datetime.fromtimestamp(hi, self.zone).date() + timedelta(days=HORIZON_DAYS)
+            if self._first_day is not None:
+                first_day = min(first_day, self._first_day)
+                last_day = max(last_day, self._last_day)
+            self._build(first_day, last_day)
+
+    def _cover(self, lo: float, hi: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Windows covering [lo, hi], extending the precomputed range if needed"""
+        if not (self._valid_from <= lo and hi <= self._valid_until):
+            self._extend(lo, hi)
+        return self._windows
+
+    def _window_index(self, timestamp: float) -> Tuple[int, List[float], List[float]]:
+        """Index of the first window still open at a single timestamp"""
+        if not (self._valid_from <= timestamp <= self._valid_until):
+            self._extend(timestamp, timestamp)
+        opens, closes = self._lists
+        return bisect_right(closes, timestamp), opens, closes
+
+    def _prepare(self, timestamps: Timestamps) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        ts = np.asarray(timestamps, dtype=np.float64)
+        if not ts.size:
+            return ts, np.empty(0), np.empty(0)
+        opens, closes = self._cover(float(ts.min()), float(ts.max()))
+        return ts, opens, closes
+
+    def is_open(self, timestamps: Timestamps) -> np.ndarray:
+        """Whether each timestamp falls inside business hours"""
+        ts, opens, closes = self._prepare(timestamps)
+        if not ts.size:
+            return np.zeros(ts.shape, dtype=bool)
+        i = np.searchsorted(opens, ts, side='right') - 1
+        return (i >= 0) & (ts < closes[np.maximum(i, 0)])
+
+    def next_open(self, timestamps: Timestamps) -> np.ndarray:
+        """Each timestamp itself when open, otherwise the start of the next window"""
+        ts, opens, closes = self._prepare(timestamps)
+        if not ts.size:
+            return ts
+        return np.maximum(ts, opens[np.searchsorted(closes, ts, side='right')])
+
+    def window_at_or_after(self, timestamps: Timestamps) -> Tuple[np.ndarray, np.ndarray]:
+        """Open and close of the first window that has not closed yet at each timestamp"""
+        ts, opens, closes = self._prepare(timestamps)
+        if not ts.size:
+            return ts, ts
+        i = np.searchsorted(closes, ts, side='right')
+        return opens[i], closes[i]
+
+    def is_open_at(self, moment: datetime) -> bool:
+        timestamp = moment.timestamp()
+        i, opens, _ = self._window_index(timestamp)
+        return opens[i] <= timestamp
+
+    def next_open_time(self, moment: datetime) -> datetime:
+        """Earliest time at or after `moment` inside business hours, in UTC"""
+        timestamp = moment.timestamp()
+        i, opens, _ = self._window_index(timestamp)
+        if opens[i] <= timestamp:
+            return moment.astimezone(pytz.UTC)
+        return datetime.fromtimestamp(opens[i], pytz.UTC)
+
+    def window_for(self, moment: datetime) -> Tuple[datetime, datetime]:
+        """Current or next business window at `moment`, in the zone's local time"""
+        i, opens, closes = self._window_index(moment.timestamp())
+        return (datetime.fromtimestamp(opens[i], self.zone),
+                datetime.fromtimestamp(closes[i], self.zone))
+
+    def days_to_cover(self, moment: datetime, open_days: int) -> int:
+        """Calendar days from `moment` until `open_days` business windows have closed"""
+        if open_days <= 0:
+            return 0
+        timestamp = moment.timestamp()
+        # Every week has an open day, so 7 calendar days per open day always suffice
+        self._extend(timestamp, timestamp + 7 * open_days * 86400)
+        i, _, closes = self._window_index(timestamp)
+        return math.ceil((closes[min(i + open_days, len(closes)) - 1] - timestamp) / 86400)
+
+
+@lru_cache(maxsize=1024)
+def get_calendar(tz_name: str, start: str = '07:00', end: str = '18:00',
+                 excluded_days: Tuple[str, ...] = (), holidays: Tuple[str, ...] = ()) -> BusinessCalendar:
+    """Shared calendar per (timezone, hours, excluded day names, ISO holiday dates)"""
+    excluded = frozenset(WEEKDAYS.index(day) for day in excluded_days)
+    closed = frozenset(date.fromisoformat(day) for day in holidays)
+    return BusinessCalendar(tz_name, parse_hhmm(start), parse_hhmm(end), excluded, closed)
+
+
+def calendar_for(tz_name: str, sending_rules: Dict) -> BusinessCalendar:
+    """Calendar of a sending_rules dict (allowed_hours, excluded_days)"""
+    hours = sending_rules['allowed_hours']
+    return get_calendar(tz_name, hours['start'], hours['end'], tuple(sorted(sending_rules.get('excluded_days', ()))))
+
+
+def next_valid_times(timestamps: Timestamps, timezones: Iterable[str], sending_rules) -> np.ndarray:
+    """
+    Next valid send time for a whole batch of recipients, as epoch seconds.
+    `timezones` gives each recipient's zone, every zone is answered with a
+    single searchsorted over its calendar. `sending_rules` is a SendingRules
+    or a sending_rules dict.
+    """
+    ts = np.asarray(timestamps, dtype=np.float64)
+    zones = np.asarray(list(timezones))
+    result = np.empty_like(ts)
+    if not ts.size:
+        return result
+    names, inverse = np.unique(zones, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.cumsum(np.bincount(inverse, minlength=len(names)))[:-1]
+    for name, indices in zip(names, np.split(order, bounds)):
+        if hasattr(sending_rules, 'calendar'):
+            calendar = sending_rules.calendar(str(name))
+        else:
+            calendar = calendar_for(str(name), sending_rules)
+        result[indices] = calendar.next_open(ts[indices])
+    return result
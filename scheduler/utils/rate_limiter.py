@@ -0,0 +1,72 @@
+# filename: rate_limiter.py
+
+import asyncio
+import time
+from typing import Callable, Dict, Optional
+
+from .slot_allocator import SECONDS_PER_DAY, schedule_day_number, SCHEDULE_DAY_OFFSET
+
+
+class TokenBucket:
+    """
+    Token bucket for a single sending account.
+
+    One token is added every `interval` seconds up to `capacity`, so with the
+    default capacity of 1 consecutive sends are at least `interval` apart.
+    `daily_limit` caps the sends per schedule day (7AM to 7AM UTC, the same
+    days the SlotAllocator counts). `sent_today` seeds the count of the
+    current day, e.g. with the sends made before a restart.
+    """
+
+    def __init__(self, interval: float, daily_limit: Optional[int] = None, capacity: float = 1,
+                 clock: Callable[[], float] = time.time, sent_today: int = 0):
+        self.interval = interval
+        self.daily_limit = daily_limit
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self._updated = clock()
+        self._day = schedule_day_number(self._updated)
+        self.sent_today = sent_today
+
+    def _refill(self, now: float) -> None:
+        if self.interval > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) / self.interval)
+        else:
+            self.tokens = self.capacity
+        self._updated = now
+        day = schedule_day_number(now)
+        if day != self._day:
+            self._day = day
+            self.sent_today = 0
+
+    def delay(self, now: Optional[float] = None) -> float:
+        """Seconds until a send is allowed, 0 if one is allowed now"""
+        now = self.clock() if now is None else now
+        self._refill(now)
+        if self.daily_limit is not None and self.sent_today >= self.daily_limit:
+            next_day = (self._day + 1) * SECONDS_PER_DAY + SCHEDULE_DAY_OFFSET
+            return max(next_day - now, 0.001)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * self.interval
+
+    def try_acquire(self, now: Optional[float] = None) -> bool:
+        now = self.clock() if now is None else now
+        if self.delay(now) > 0:
+            return False
+        self.tokens -= 1
+        self.sent_today += 1
+        return True
+
+    async def acquire(self) -> None:
+        """Wait until a send is allowed and take the token"""
+        while not self.try_acquire():
+            await asyncio.sleep(self.delay())
+
+    def stats(self) -> Dict:
+        return {
+            "tokens": round(self.tokens, 3),
+            "sent_today": self.sent_today,
+            "daily_limit": self.daily_limit,
+        }
@@ -0,0 +1,128 @@
+# filename: slot_allocator.py
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+import math
+import numpy as np
+import pytz
+from typing import Dict, List, Optional, Tuple
+
+from ..models.sending_rules import SendingRules, default_rules
+
+SECONDS_PER_DAY = 86400
+# Schedule days run from 7AM to 7AM next day UTC
+SCHEDULE_DAY_OFFSET = 7 * 3600
+
+
+def schedule_day_number(timestamp: float) -> int:
+    """Index of the schedule day a UTC timestamp falls into"""
+    return math.floor((timestamp - SCHEDULE_DAY_OFFSET) / SECONDS_PER_DAY)
+
+
+def schedule_day_key(day_number: int) -> str:
+    """Tracker key (YYYY-MM-DD) of a schedule day index"""
+    return (datetime(1970, 1, 1) + timedelta(days=day_number)).strftime("%Y-%m-%d")
+
+
+class SlotAllocator:
+    """
+    Finds free send slots on a fixed grid (every min_time_between_emails of
+    the sending rules, from the start of the scheduling window) without
+    rescanning the window per email.
+
+    - Business-hour masks are computed once per recipient timezone as a sorted
+      list of open grid indices, from the rules' calendar in one pass.
+    - Every sender keeps a sorted array of occupied send times, so the spacing
+      and rolling 24h checks are bisect lookups.
+    - A per (sender, timezone) day cursor skips days that can no longer take
+      an email, since days only ever fill up.
+    """
+
+    def __init__(self, start_time: datetime, end_time: datetime, tracker: Dict,
+                 rules: Optional[SendingRules] = None):
+        self.tracker = tracker
+        self.rules = rules or default_rules()
+        self.step = self.rules.min_gap_minutes * 60
+        self.min_gap = self.rules.min_gap_minutes * 60
+        self.origin = start_time.timestamp()
+        self.n_slots = max(0, math.ceil((end_time.timestamp() - self.origin) / self.step))
+        self._tz_slots: Dict[str, List[int]] = {}
+        self._occupied: Dict[str, List[float]] = {}
+        self._day_cursor: Dict[Tuple[str, str], int] = {}
+
+    def _slot_time(self, index: int) -> float:
+        return self.origin + index * self.step
+
+    def _first_index_at_or_after(self, timestamp: float) -> int:
+        return max(0, math.ceil((timestamp - self.origin) / self.step))
+
+    def business_slots(self, recipient_tz: str) -> List[int]:
+        """Sorted grid indices that fall inside business hours in `recipient_tz`"""
+        slots = self._tz_slots.get(recipient_tz)
+        if slots is None:
+            calendar = self.rules.calendar(recipient_tz)
+            grid = self.origin + np.arange(self.n_slots) * self.step
+            slots = np.flatnonzero(calendar.is_open(grid)).tolist()
+            self._tz_slots[recipient_tz] = slots
+        return slots
+
+    def occupied(self, sender_email: str) -> List[float]:
+        """Sorted send times already queued for a sender"""
+        times = self._occupied.get(sender_email)
+        if times is None:
+            queue = self.tracker["sending_accounts"][sender_email]["email_queue"]
+            times = sorted(
+                datetime.fromisoformat(email['scheduled_time']).timestamp() for email in queue
+            )
+            self._occupied[sender_email] = times
+        return times
+
+    def daily_limit(self, sender_email: str) -> int:
+        """The sender's daily limit under these rules"""
+        account = self.tracker["sending_accounts"][sender_email]
+        return self.rules.daily_limit_for(sender_email, account.get("daily_limit"))
+
+    def _is_free(self, times: List[float], timestamp: float) -> bool:
+        i = bisect_left(times, timestamp)
+        if i < len(times) and times[i] - timestamp < self.min_gap:
+            return False
+        if i > 0 and timestamp - times[i - 1] < self.min_gap:
+            return False
+        return True
+
+    def _sent_in_last_day(self, times: List[float], timestamp: float) -> int:
+        return bisect_right(times, timestamp) - bisect_left(times, timestamp - SECONDS_PER_DAY)
+
+    def find_slot(self, sender_email: str, recipient_tz: str,
+                  not_before: Optional[datetime] = None) -> Optional[datetime]:
+        """Earliest free slot for this sender inside the recipient's business hours"""
+        if not self.n_slots:
+            return None
+        open_slots = self.business_slots(recipient_tz)
+        times = self.occupied(sender_email)
+        daily_counts = self.tracker["sending_accounts"][sender_email]["daily_schedule_count"]
+        daily_limit = self.daily_limit(sender_email)
+
+        start = self.origin if not_before is None else max(self.origin, not_before.timestamp())
+        cursor_key = (sender_email, recipient_tz)
+        day = max(schedule_day_number(start), self._day_cursor.get(cursor_key, -math.inf))
+        last_day = schedule_day_number(self._slot_time(self.n_slots - 1))
+
+        while day <= last_day:
+            if daily_counts.get(schedule_day_key(day), 0) < daily_limit:
+                day_start = day * SECONDS_PER_DAY + SCHEDULE_DAY_OFFSET
+                lo = bisect_left(open_slots, self._first_index_at_or_after(max(day_start, start)))
+                hi = bisect_left(open_slots, self._first_index_at_or_after(day_start + SECONDS_PER_DAY))
+                for index in open_slots[lo:hi]:
+                    timestamp = self._slot_time(index)
+                    if (self._is_free(times, timestamp)
+                            and self._sent_in_last_day(times, timestamp) < daily_limit):
+                        return datetime.fromtimestamp(timestamp, pytz.UTC)
+            day += 1
+            if not_before is None:
+                self._day_cursor[cursor_key] = day
+        return None
+
+    def reserve(self, sender_email: str, slot: datetime) -> None:
+        """Mark a slot as taken by a sender"""
+        insort(self.occupied(sender_email), slot.timestamp())
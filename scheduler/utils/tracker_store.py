@@ -0,0 +1,313 @@
+# filename: tracker_store.py
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import pytz
+
+from .slot_allocator import schedule_day_key, schedule_day_number
+
+logger = logging.getLogger(__name__)
+
+TRACKER_DB = 'src/email_management/trackers/sending_tracker.db'
+
+# Campaign counters that get single-row increments while sending
+CAMPAIGN_COUNTERS = ("total_emails", "emails_scheduled", "emails_sent", "emails_failed", "emails_unplaced")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    sender_email TEXT PRIMARY KEY,
+    daily_limit INTEGER,
+    last_scheduled_time TEXT,
+    data TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS queue (
+    queue_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sender_email TEXT NOT NULL,
+    campaign_id TEXT,
+    scheduled_time TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS queue_sender_time ON queue (sender_email, scheduled_time);
+CREATE INDEX IF NOT EXISTS queue_status_time ON queue (status, scheduled_time);
+CREATE INDEX IF NOT EXISTS queue_campaign ON queue (campaign_id);
+CREATE TABLE IF NOT EXISTS daily_counts (
+    sender_email TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (sender_email, day)
+);
+CREATE TABLE IF NOT EXISTS sent_counts (
+    sender_email TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (sender_email, day)
+);
+CREATE TABLE IF NOT EXISTS campaigns (
+    campaign_id TEXT PRIMARY KEY,
+    status TEXT,
+    created_at TEXT,
+    total_emails INTEGER NOT NULL DEFAULT 0,
+    emails_scheduled INTEGER NOT NULL DEFAULT 0,
+    emails_sent INTEGER NOT NULL DEFAULT 0,
+    emails_failed INTEGER NOT NULL DEFAULT 0,
+    emails_unplaced INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class TrackerStore:
+    """
+    SQLite (WAL) backend for the sending tracker.
+
+    The scheduler keeps working on the familiar tracker dict from load();
+    every state change is written as a single-row statement instead of
+    rewriting the whole tracker. Queue entries carry the "queue_id" of their row.
+    """
+
+    def __init__(self, path: str = TRACKER_DB):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module doesn't create the database
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT (SELECT COUNT(*) FROM accounts) + (SELECT COUNT(*) FROM campaigns)"
+            ).fetchone()
+            return row[0] == 0
+
+    # Reads
+
+    def load(self) -> Dict:
+        """Build the tracker dict from the database"""
+        with self._lock:
+            conn = self.conn
+            tracker = {"sending_accounts": {}, "campaigns": {}, "meta": {}}
+
+            for row in conn.execute("SELECT * FROM accounts"):
+                account = json.loads(row["data"])
+                account.update({
+                    "daily_limit": row["daily_limit"],
+                    "last_scheduled_time": row["last_scheduled_time"],
+                    "daily_schedule_count": {},
+                    "email_queue": []
+                })
+                tracker["sending_accounts"][row["sender_email"]] = account
+
+            for row in conn.execute("SELECT * FROM daily_counts ORDER BY day"):
+                account = tracker["sending_accounts"].get(row["sender_email"])
+                if account is not None:
+                    account["daily_schedule_count"][row["day"]] = row["count"]
+
+            for row in conn.execute("SELECT * FROM queue ORDER BY sender_email, scheduled_time, queue_id"):
+                account = tracker["sending_accounts"].get(row["sender_email"])
+                if account is not None:
+                    entry = json.loads(row["entry"])
+                    entry.update({
+                        "queue_id": row["queue_id"],
+                        "campaign_id": row["campaign_id"],
+                        "scheduled_time": row["scheduled_time"],
+                        "status": row["status"]
+                    })
+                    account["email_queue"].append(entry)
+
+            for row in conn.execute("SELECT * FROM campaigns"):
+                campaign = json.loads(row["data"])
+                campaign.update({key: row[key] for key in ("status", "created_at") + CAMPAIGN_COUNTERS})
+                tracker["campaigns"][row["campaign_id"]] = campaign
+
+            for row in conn.execute("SELECT key, value FROM meta"):
+                tracker["meta"][row["key"]] = json.loads(row["value"])
+
+            return tracker
+
+    # Single-row writes
+
+    def _save_account(self, conn: sqlite3.Connection, sender_email: str, account: Dict) -> None:
+        data = {k: v for k, v in account.items()
+                if k not in ("daily_limit", "last_scheduled_time", "daily_schedule_count", "email_queue")}
+        conn.execute(
+            "INSERT INTO accounts (sender_email, daily_limit, last_scheduled_time, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(sender_email) DO UPDATE SET daily_limit = excluded.daily_limit, "
+            "last_scheduled_time = excluded.last_scheduled_time, data = excluded.data",
+            (sender_email, account.get("daily_limit"), account.get("last_scheduled_time"), json.dumps(data, default=str))
+        )
+
+    def _add_queued(self, conn: sqlite3.Connection, sender_email: str, entry: Dict) -> int:
+        data = {k: v for k, v in entry.items()
+                if k not in ("queue_id", "campaign_id", "scheduled_time", "status")}
+        cursor = conn.execute(
+            "INSERT INTO queue (sender_email, campaign_id, scheduled_time, status, entry) VALUES (?, ?, ?, ?, ?)",
+            (sender_email, entry.get("campaign_id"), entry["scheduled_time"],
+             entry.get("status", "pending"), json.dumps(data, default=str))
+        )
+        entry["queue_id"] = cursor.lastrowid
+        return cursor.lastrowid
+
+    def _save_campaign(self, conn: sqlite3.Connection, campaign_id: str, campaign: Dict) -> None:
+        columns = ("status", "created_at") + CAMPAIGN_COUNTERS
+        data = {k: v for k, v in campaign.items() if k not in columns}
+        values = [campaign.get("status"), campaign.get("created_at")] + \
+                 [campaign.get(counter, 0) for counter in CAMPAIGN_COUNTERS]
+        assignments = ", ".join(f"{column} = excluded.{column}" for column in columns + ("data",))
+        conn.execute(
+            f"INSERT INTO campaigns (campaign_id, {', '.join(columns)}, data) "
+            f"VALUES ({', '.join('?' * (len(columns) + 2))}) "
+            f"ON CONFLICT(campaign_id) DO UPDATE SET {assignments}",
+            [campaign_id] + values + [json.dumps(data, default=str)]
+        )
+
+    def _set_daily_count(self, conn: sqlite3.Connection, sender_email: str, day: str, count: int) -> None:
+        conn.execute(
+            "INSERT INTO daily_counts (sender_email, day, count) VALUES (?, ?, ?) "
+            "ON CONFLICT(sender_email, day) DO UPDATE SET count = excluded.count",
+            (sender_email, day, count)
+        )
+
+    def save_account(self, sender_email: str, account: Dict) -> None:
+        with self._lock, self.conn as conn:
+            self._save_account(conn, sender_email, account)
+
+    def add_queued(self, sender_email: str, entry: Dict) -> int:
+        """Insert a queue entry, sets and returns its queue_id"""
+        with self._lock, self.conn as conn:
+            return self._add_queued(conn, sender_email, entry)
+
+    def remove_queued(self, queue_id: int) -> None:
+        with self._lock, self.conn as conn:
+            conn.execute("DELETE FROM queue WHERE queue_id = ?", (queue_id,))
+
+    def save_campaign(self, campaign_id: str, campaign: Dict) -> None:
+        with self._lock, self.conn as conn:
+            self._save_campaign(conn, campaign_id, campaign)
+
+    def increment_campaign(self, campaign_id: str, counter: str, amount: int = 1) -> None:
+        if counter not in CAMPAIGN_COUNTERS:
+            raise ValueError(f"Unknown campaign counter: {counter}")
+        with self._lock, self.conn as conn:
+            conn.execute(
+                f"UPDATE campaigns SET {counter} = {counter} + ? WHERE campaign_id = ?",
+                (amount, campaign_id)
+            )
+
+    def set_daily_count(self, sender_email: str, day: str, count: int) -> None:
+        with self._lock, self.conn as conn:
+            self._set_daily_count(conn, sender_email, day, count)
+
+    def record_send(self, queue_id: Optional[int], campaign_id: str, counter: str,
+                    sender_email: Optional[str] = None) -> None:
+        """
+        Drop a processed queue entry and bump its campaign counter in one
+        transaction. With `sender_email` the attempt also counts towards that
+        account's sends of the current schedule day.
+        """
+        if counter not in CAMPAIGN_COUNTERS:
+            raise ValueError(f"Unknown campaign counter: {counter}")
+        with self._lock, self.conn as conn:
+            if queue_id is not None:
+                conn.execute("DELETE FROM queue WHERE queue_id = ?", (queue_id,))
+            conn.execute(
+                f"UPDATE campaigns SET {counter} = {counter} + 1 WHERE campaign_id = ?",
+                (campaign_id,)
+            )
+            if sender_email is not None:
+                conn.execute(
+                    "INSERT INTO sent_counts (sender_email, day, count) VALUES (?, ?, 1) "
+                    "ON CONFLICT(sender_email, day) DO UPDATE SET count = count + 1",
+                    (sender_email, schedule_day_key(schedule_day_number(time.time())))
+                )
+
+    def sent_today(self, sender_email: str) -> int:
+        """Sends recorded for the account in the current schedule day"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT count FROM sent_counts WHERE sender_email = ? AND day = ?",
+                (sender_email, schedule_day_key(schedule_day_number(time.time())))
+            ).fetchone()
+        return row[0] if row else 0
+
+    # Bulk writes
+
+    def save(self, tracker: Dict) -> None:
+        """
+        Write accounts, daily counts and campaigns, and insert queue entries
+        that have no queue_id yet, all in one transaction. Entries that were
+        removed from a queue are deleted through remove_queued/record_send.
+        """
+        with self._lock, self.conn as conn:
+            for sender_email, account in tracker.get("sending_accounts", {}).items():
+                self._save_account(conn, sender_email, account)
+                for day, count in account.get("daily_schedule_count", {}).items():
+                    self._set_daily_count(conn, sender_email, day, count)
+                for entry in account.get("email_queue", []):
+                    if entry.get("queue_id") is None:
+                        self._add_queued(conn, sender_email, entry)
+            for campaign_id, campaign in tracker.get("campaigns", {}).items():
+                self._save_campaign(conn, campaign_id, campaign)
+            meta = dict(tracker.get("meta", {}), last_updated=datetime.now(pytz.UTC).isoformat())
+            conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                [(key, json.dumps(value, default=str)) for key, value in meta.items()]
+            )
+
+    def migrate_json(self, json_path: str) -> bool:
+        """
+        Import a legacy sending_tracker.json into an empty store.
+        The JSON file is renamed to *.migrated afterwards, or to *.corrupt
+        when it can't be parsed, so it is never overwritten.
+        """
+        if not os.path.exists(json_path) or not self.is_empty():
+            return False
+        try:
+            with open(json_path, 'r') as f:
+                tracker = json.load(f)
+        except json.JSONDecodeError as e:
+            corrupt_path = f"{json_path}.corrupt"
+            os.replace(json_path, corrupt_path)
+            logger.error(f"Tracker file {json_path} is corrupted ({str(e)}), kept as {corrupt_path}")
+            return False
+
+        for account in tracker.get("sending_accounts", {}).values():
+            for entry in account.get("email_queue", []):
+                entry.pop("queue_id", None)
+        self.save(tracker)
+        os.replace(json_path, f"{json_path}.migrated")
+        logger.info(f"Migrated tracker {json_path} into {self.path}")
+        return True
+
+
+tracker_store = TrackerStore()
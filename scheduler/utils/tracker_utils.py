@@ -4,42 +4,30 @@ from datetime import datetime
 import pytz
 from typing import Dict, Optional
 import os
+from .tracker_store import TrackerStore, tracker_store
 logger = logging.getLogger(__name__)
 
 TRACKER_FILE = 'src/email_management/trackers/sending_tracker.json'
 
-def load_tracker() -> Dict:
+def load_tracker(json_path: str = TRACKER_FILE, store: Optional[TrackerStore] = None) -> Dict:
     """
-    Load or create tracker file with proper error handling
+    Load the tracker from the SQLite store, migrating a legacy JSON
+    tracker file into it on first use
     """
-    tracker_path = 'src/email_management/trackers/sending_tracker.json'
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(tracker_path), exist_ok=True)
+    store = store or tracker_store
     
     try:
-        # Try to load existing tracker
-        with open(tracker_path, 'r') as f:
-            tracker = json.load(f)
-            logger.info("Loaded existing tracker file")
-            return tracker
-    except FileNotFoundError:
-        logger.info("No tracker file found, creating new one")
-        tracker = create_new_tracker()
-    except json.JSONDecodeError:
-        logger.warning("Tracker file corrupted, creating new one")
-        tracker = create_new_tracker()
+        store.migrate_json(json_path)
     except Exception as e:
-        logger.error(f"Error loading tracker: {str(e)}")
-        tracker = create_new_tracker()
+        logger.error(f"Error migrating tracker file: {str(e)}")
     
-    # Save new tracker
-    try:
-        with open(tracker_path, 'w') as f:
-            json.dump(tracker, f, indent=2)
-        logger.info("Created new tracker file")
-    except Exception as e:
-        logger.error(f"Error saving new tracker: {str(e)}")
+    tracker = store.load()
+    if not tracker["sending_accounts"] and not tracker["campaigns"]:
+        logger.info("No tracker found, creating new one")
+        tracker = create_new_tracker()
+        store.save(tracker)
+    else:
+        logger.info("Loaded existing tracker")
     
     return tracker
 
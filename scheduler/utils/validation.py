@@ -2,7 +2,9 @@
 
 from typing import Dict, List
 import pytz
-from datetime import datetime
+from datetime import date, datetime
+
+from .business_calendar import WEEKDAYS, parse_hhmm
 
 def validate_email_data(email_data: Dict) -> bool:
     """
@@ -53,6 +55,9 @@ def validate_sender_config(sender_config: Dict) -> bool:
         
     return True
 
+def _is_positive_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
 def validate_sending_rules(rules: Dict) -> bool:
     """
     Validate sending rules configuration
@@ -68,17 +73,44 @@ def validate_sending_rules(rules: Dict) -> bool:
         if field not in rules:
             return False
     
-    # Validate allowed hours
+    # Validate allowed hours, "HH:MM" with the start before the end
     hours = rules['allowed_hours']
     if not isinstance(hours, dict) or 'start' not in hours or 'end' not in hours:
         return False
+    try:
+        if parse_hhmm(hours['start']) >= parse_hhmm(hours['end']):
+            return False
+    except (AttributeError, TypeError, ValueError):
+        return False
         
-    # Validate excluded days
+    # Validate excluded days, at least one day has to stay open
     if not isinstance(rules['excluded_days'], list):
         return False
+    if any(day not in WEEKDAYS for day in rules['excluded_days']) or len(set(rules['excluded_days'])) >= 7:
+        return False
         
     # Validate time between emails
     if not isinstance(rules['min_time_between_emails'], (int, float)) or rules['min_time_between_emails'] <= 0:
         return False
+
+    # Validate daily limits
+    if not _is_positive_int(rules['daily_limit_per_sender']):
+        return False
+    sender_limits = rules.get('sender_limits', {})
+    if not isinstance(sender_limits, dict) or not all(_is_positive_int(v) for v in sender_limits.values()):
+        return False
+
+    # Validate holidays, ISO dates per country code or timezone
+    holidays = rules.get('holidays', {})
+    if not isinstance(holidays, dict):
+        return False
+    try:
+        for dates in holidays.values():
+            if not isinstance(dates, list):
+                return False
+            for day in dates:
+                date.fromisoformat(day)
+    except (TypeError, ValueError):
+        return False
         
-    return True
\ No newline at end of file
+    return True
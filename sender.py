@@ -6,8 +6,19 @@ import logging
 from rich.console import Console
 from dotenv import load_dotenv
 from src.email_management.src.lib.smtp_based_funcions import EmailSender
+from src.email_management.src.lib.sender_registry import sender_registry
+from src.email_management.follow_up.sequence_engine import sequence_engine
+from src.email_management.src.lib.smtp_pool import smtp_pool
+from src.email_management.src.lib.log_utils import configure_logging
+from src.email_management.src.lib.outbound_log import outbound_log
 from src.email_management.scheduler.utils.tracker_utils import load_tracker
+from src.email_management.scheduler.utils.tracker_store import tracker_store
 from src.email_management.scheduler.utils.scheduling_utils import calculate_schedule_time, group_by_timezone
+from src.email_management.scheduler.utils.slot_allocator import SlotAllocator
+from src.email_management.scheduler.models.sending_rules import SendingRules, default_rules, rules_for_campaign
+from src.email_management.scheduler.dispatcher import SendDispatcher
+from src.email_management.scheduler.send_workers import SenderWorkers
+from src.email_management.scheduler.utils.rate_limiter import TokenBucket
 import time
 import datetime
 # Add imports if not already present at top of sender.py
@@ -19,17 +30,35 @@ import time
 from typing import Dict, Any, Tuple, List, Optional
 import random
 import math
+import heapq
 import pandas as pd
-from src.email_management.src.lib.supabase_client import post, get_one, get_all, update, delete, post_email
+from src.email_management.src.lib.supabase_client import post, get_one, get_all, update, delete, post_email, EmailRecordBuffer
 import uuid 
 from src.email_management.src.lib.supabase_client import supabase_client
 import traceback
 import base64
 import asyncio  # Add this import at the top
+import threading
  
 console = Console()
 logger = logging.getLogger(__name__)
 
+OUTBOUND_WRITE_BATCH_SIZE = int(os.getenv('OUTBOUND_WRITE_BATCH_SIZE', 25))
+# Threads available for blocking sends, shared by all sender workers
+SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', 8))
+# Furthest a campaign is planned ahead when senders are busy with other campaigns
+MAX_PLANNING_DAYS = int(os.getenv('MAX_PLANNING_DAYS', 365))
+
+# Shared by every campaign, a running dispatcher picks up newly scheduled campaigns
+dispatcher = SendDispatcher()
+# Tracker owned by the running process_scheduled_emails, if any. Set for the
+# whole run, including draining the workers, new campaigns join that run.
+active_tracker: Optional[Dict] = None
+# Sends run on several threads and remove their entries from the queues.
+# Every other read or write of the queues (planning, saving, loading them
+# into the dispatcher) holds it too.
+_tracker_lock = threading.Lock()
+
 
 
 
@@ -56,23 +85,24 @@ class TimeWindow:
         self.end_time = end_time
         self.scheduled_emails = []
     
-    def get_available_slots(self, recipient_tz: str) -> List[datetime]:
-        """Find all available 20-min slots in window that respect recipient hours"""
+    def get_available_slots(self, recipient_tz: str, rules: Optional[SendingRules] = None) -> List[datetime]:
+        """Find all available slots in window that respect the recipient's sending rules"""
+        rules = rules or default_rules()
+        calendar = rules.calendar(recipient_tz)
+        gap = timedelta(minutes=rules.min_gap_minutes)
         slots = []
         current = self.start_time
         
         while current < self.end_time:
-            recipient_time = current.astimezone(pytz.timezone(recipient_tz))
-            if 7 <= recipient_time.hour < 18:
-                if self._is_valid_slot(current):
-                    slots.append(current)
-            current += timedelta(minutes=20)
+            if calendar.is_open_at(current) and self._is_valid_slot(current, gap):
+                slots.append(current)
+            current += gap
         
         return slots
     
-    def _is_valid_slot(self, time: datetime) -> bool:
+    def _is_valid_slot(self, time: datetime, gap: timedelta = timedelta(minutes=20)) -> bool:
         for scheduled in self.scheduled_emails:
-            if abs((time - scheduled).total_seconds()) < 1200:
+            if abs(time - scheduled) < gap:
                 return False
         return True
 
@@ -307,9 +337,28 @@ def process_email(email_data: Dict) -> Dict:
 
 
 
-def calculate_total_capacity(days: int, sender_count: int) -> int: ####
+def daily_capacity(senders: Dict, rules: SendingRules) -> int:
+    """Emails all senders may send per day under the sending rules"""
+    return sum(rules.daily_limit_for(email, sender.daily_limit) for email, sender in senders.items())
+
+
+def planning_days(start: datetime, emails: List[Dict], senders: Dict, rules: SendingRules) -> int:
+    """
+    Calendar days from `start` holding enough open business days, in every
+    recipient timezone of `emails`, for the senders' daily capacity to cover
+    them. 0 when there is nothing to plan or no sender may send.
+    """
+    capacity = daily_capacity(senders, rules)
+    if not emails or not capacity:
+        return 0
+    open_days = math.ceil(len(emails) / capacity)
+    time_zones = {email['time_zone'] for email in emails}
+    return max(rules.calendar(time_zone).days_to_cover(start, open_days) for time_zone in time_zones)
+
+
+def calculate_total_capacity(days: int, senders: Dict, rules: SendingRules) -> int: ####
     """Calculate total email capacity for given days and senders"""
-    return days * sender_count * 30
+    return days * daily_capacity(senders, rules)
 
 
 def initialize_scheduling_windows(current_time: datetime, days: int = 10) -> List[TimeWindow]: ####
@@ -336,43 +385,6 @@ def extend_scheduling_windows(windows: List[TimeWindow], additional_days: int =
 
 
 
-def find_next_available_day(tracker: Dict, sender_email: str, current_day: str) -> str:
-    """Find next day with available capacity, creating new days as needed"""
-    current_date = datetime.strptime(current_day, "%Y-%m-%d")
-    
-    while True:
-        day_str = current_date.strftime("%Y-%m-%d")
-        sender_data = tracker['sending_accounts'][sender_email]
-        
-        # If day doesn't exist in daily_schedule_count, create it
-        if day_str not in sender_data['daily_schedule_count']:
-            sender_data['daily_schedule_count'][day_str] = 0
-            logger.info(f"Created new day {day_str} for {sender_email}")
-            return day_str
-        
-        # If day exists but not full, use it
-        daily_count = sender_data['daily_schedule_count'][day_str]
-        if daily_count < 30:
-            return day_str
-        
-        # If day is full, move to next day
-        current_date += timedelta(days=1)
-        logger.info(f"Day {day_str} full for {sender_email}, checking {current_date.strftime('%Y-%m-%d')}")
-
-
-def check_time_interval(sender_queue: List[Dict], proposed_time: datetime) -> bool:
-    """Check if proposed time maintains 20-min interval with existing emails"""
-    for email in sender_queue:
-        scheduled_time = datetime.fromisoformat(email['scheduled_time'])
-        time_diff = abs((proposed_time - scheduled_time).total_seconds())
-        if time_diff < 1200:  # 20 minutes in seconds
-            return False
-    return True
-
-
-
-
-
 def get_schedule_day(time: datetime) -> str: #####
     """
     Get the schedule day for a given time.
@@ -390,61 +402,6 @@ def get_schedule_day(time: datetime) -> str: #####
 
 
 
-def find_optimal_slot(email: Dict, windows: List[TimeWindow], sender_queue: List[Dict], 
-                     tracker: Dict, sender_email: str) -> Optional[datetime]:
-    current_time = datetime.now(pytz.UTC)
-    current_day = get_schedule_day(current_time)
-    days_tried = set()
-    
-    while len(days_tried) < 10:  # Try up to 10 days
-        # Get next available day
-        target_day = find_next_available_day(tracker, sender_email, current_day)
-        if target_day in days_tried:
-            current_day = (datetime.strptime(target_day, "%Y-%m-%d") + 
-                         timedelta(days=1)).strftime("%Y-%m-%d")
-            continue
-            
-        days_tried.add(target_day)
-        
-        # Get slots for this day
-        all_slots = []
-        for window in windows:
-            slots = get_available_slots_for_day(window, email['time_zone'], target_day)
-            all_slots.extend(slots)
-        
-        # Check each slot
-        for slot in sorted(all_slots):
-            if check_time_interval(sender_queue, slot):
-                emails_in_window = len([
-                    e for e in sender_queue
-                    if slot - timedelta(hours=24) <= datetime.fromisoformat(e['scheduled_time']) <= slot
-                ])
-                if emails_in_window < 30:
-                    return slot
-        
-        # Move to next day if no slots found
-        current_day = (datetime.strptime(target_day, "%Y-%m-%d") + 
-                      timedelta(days=1)).strftime("%Y-%m-%d")
-    
-    return None
-
-
-def get_available_slots_for_day(window: TimeWindow, recipient_tz: str, target_day: str) -> List[datetime]:
-    """Get available slots specifically for target day"""
-    slots = []
-    current = window.start_time
-    
-    while current < window.end_time:
-        slot_day = get_schedule_day(current)
-        if slot_day == target_day:
-            recipient_time = current.astimezone(pytz.timezone(recipient_tz))
-            if 7 <= recipient_time.hour < 18:
-                if window._is_valid_slot(current):
-                    slots.append(current)
-        current += timedelta(minutes=20)
-    
-    return slots
-
 def update_daily_schedule_count(tracker: Dict, sender_email: str, schedule_time: datetime) -> None: ####
     """Update the daily schedule count for a sender"""
     schedule_day = get_schedule_day(schedule_time)
@@ -454,7 +411,7 @@ def update_daily_schedule_count(tracker: Dict, sender_email: str, schedule_time:
     if schedule_day not in sender_data['daily_schedule_count']:
         # Get all days between current and scheduled
         current_date = datetime.now(pytz.UTC).date()
-        scheduled_date = datetime.fromisoformat(schedule_time).date()
+        scheduled_date = schedule_time.date()
         
         # Add any missing days in between
         while current_date <= scheduled_date:
@@ -470,17 +427,22 @@ def update_daily_schedule_count(tracker: Dict, sender_email: str, schedule_time:
 
 
 
-def initialize_sender_in_tracker(tracker: Dict, sender_email: str, daily_limit: int) -> None:
-    """Initialize a new sender in the tracker with default values"""
+def initialize_sender_in_tracker(tracker: Dict, sender_email: str, daily_limit: int,
+                                time_between_emails: int = 20) -> None:
+    """Initialize a new sender in the tracker, or apply the current limits to a known one"""
     if 'sending_accounts' not in tracker:
         tracker['sending_accounts'] = {}
-        
-    if sender_email not in tracker['sending_accounts']:
+
+    account = tracker['sending_accounts'].get(sender_email)
+    if account is not None:
+        account["daily_limit"] = daily_limit
+        account["time_between_emails"] = time_between_emails
+    else:
         current_date = datetime.now(pytz.UTC).date()
         
         tracker['sending_accounts'][sender_email] = {
             "daily_limit": daily_limit,
-            "time_between_emails": 20,
+            "time_between_emails": time_between_emails,
             "emails_sent_today": 0,
             "last_reset_date": current_date.strftime("%Y-%m-%d"),
             "last_scheduled_time": datetime.now(pytz.UTC).isoformat(),
@@ -500,120 +462,111 @@ def initialize_sender_in_tracker(tracker: Dict, sender_email: str, daily_limit:
 
 
 
-def schedule_emails_optimized(email_data: List[Dict], senders: Dict, tracker: Dict, campaign_id: str): ###
-    """Schedule emails optimizing for window utilization with balanced distribution"""
+def schedule_emails_optimized(email_data: List[Dict], senders: Dict, tracker: Dict, campaign_id: str,
+                              rules: Optional[SendingRules] = None): ###
+    """
+    Schedule emails optimizing for window utilization with balanced distribution.
+    Returns the emails that could not be placed in the scheduling window.
+    """
     logger.info("Starting optimized email scheduling")
     print(f"emaildata: {email_data} ")
+    rules = rules or default_rules()
     # Initialize tracker for all senders first
     for sender_email, sender in senders.items():
-        initialize_sender_in_tracker(tracker, sender_email, sender.daily_limit)
+        initialize_sender_in_tracker(
+            tracker, sender_email, rules.daily_limit_for(sender_email, sender.daily_limit), rules.min_gap_minutes
+        )
     
     current_time = datetime.now(pytz.UTC)
-    
-    # Calculate if we need more than initial 10 days
-    total_emails = len(email_data)
-    initial_days = 10
-    total_capacity = calculate_total_capacity(initial_days, len(senders))
-    
-    # Create initial windows
-    windows = initialize_scheduling_windows(current_time, initial_days)
-    
-    # If emails exceed capacity, create additional windows
-    if total_emails > total_capacity:
-        additional_days_needed = math.ceil(total_emails / (len(senders) * 30)) - initial_days
-        if additional_days_needed > 0:
-            windows = extend_scheduling_windows(windows, additional_days_needed)
-            logger.info(f"Extended scheduling windows by {additional_days_needed} days")
-    
     emails_scheduled = 0
-    email_data = list(email_data)
-    random.shuffle(email_data)
+    unplaced = email_data
+    days = 0
     
-    for email in email_data:
-        slot = None
-        sender_email = None
-        attempts = 0
-        max_attempts = len(senders) * 3  # Try each sender multiple times
-        
-        # Keep trying until we find a slot or run out of attempts
-        while slot is None and attempts < max_attempts:
-            # Randomly select a sender
-            potential_sender = random.choice(list(senders.keys()))
-            sender_queue = tracker["sending_accounts"][potential_sender]["email_queue"]
-            sender_data = tracker["sending_accounts"][potential_sender]
-            
-            # Get current day
-            current_day = get_schedule_day(current_time)
-            
-            # Try to find a slot
-            potential_slot = find_optimal_slot(
-                email, windows, sender_queue, tracker, potential_sender
-            )
-            
-            if potential_slot:
-                schedule_day = get_schedule_day(potential_slot)
-                # Check if this day exists and create if not
-                if schedule_day not in sender_data['daily_schedule_count']:
-                    sender_data['daily_schedule_count'][schedule_day] = 0
-                    
-                # Verify day isn't full
-                if sender_data['daily_schedule_count'][schedule_day] < 30:
-                    slot = potential_slot
-                    sender_email = potential_sender
-                    break
-            
-            attempts += 1
-            if attempts % len(senders) == 0:
-                # After trying all senders, move to next day
-                current_time += timedelta(days=1)
-                logger.info(f"Tried all senders, moving to next day: {get_schedule_day(current_time)}")
-        
-        if slot:
-            # Convert slot to recipient timezone for salutation
-            recipient_time = slot.astimezone(
-                pytz.timezone(email['time_zone'])
-            ).isoformat()
+    # Plan over as many calendar days as the emails need open business days
+    # in their timezones. Queued emails of other campaigns can take slots, so
+    # whatever is left is planned again over a window extended by the days
+    # it needs, until all are placed, no sender has capacity or the window
+    # reaches MAX_PLANNING_DAYS.
+    while unplaced and days < MAX_PLANNING_DAYS:
+        needed_days = planning_days(current_time, unplaced, senders, rules)
+        if not needed_days:
+            break
+        days = min(MAX_PLANNING_DAYS, days + needed_days)
+        logger.info(f"Planning {len(unplaced)} emails over {days} days")
+        # Free-slot lookups over the whole window, built once per pass
+        allocator = SlotAllocator(current_time, current_time + timedelta(days=days), tracker, rules)
+        pending, unplaced = unplaced, []
+        
+        # Plan one timezone group at a time. For each group a min-heap holds every
+        # sender's earliest free slot, so each email goes to the sender that can
+        # send it soonest; ties fall back to the sender address, keeping the plan
+        # deterministic and spread evenly across senders.
+        for time_zone, tz_emails in group_by_timezone(pending).items():
+            availability = []
+            for sender_email in senders:
+                slot = allocator.find_slot(sender_email, time_zone)
+                if slot:
+                    availability.append((slot, sender_email))
+            heapq.heapify(availability)
             
-            # Create a temporary email data structure for salutation processing
-            temp_email_data = {
-                'recipient_time': recipient_time,
-                'email_data': {
-                    'email_content': email['email_content'],
-                    'language': email['language']  # Using the existing language field
+            for email in tz_emails:
+                if not availability:
+                    unplaced.append(email)
+                    continue
+                slot, sender_email = heapq.heappop(availability)
+                sender_data = tracker["sending_accounts"][sender_email]
+                
+                # Convert slot to recipient timezone for salutation
+                recipient_time = slot.astimezone(
+                    pytz.timezone(time_zone)
+                ).isoformat()
+                
+                # Create a temporary email data structure for salutation processing
+                temp_email_data = {
+                    'recipient_time': recipient_time,
+                    'email_data': {
+                        'email_content': email['email_content'],
+                        'language': email['language']  # Using the existing language field
+                    }
                 }
-            }
-            
-            # Process salutations
-            processed_email = process_email(temp_email_data)
-            
-            # Create email entry with processed content
-            email_entry = {
-                "campaign_id": campaign_id,
-                "scheduled_time": slot.isoformat(),
-                "recipient_time": recipient_time,
-                "status": "pending",
-                "attempt_count": 0,
-                "last_attempt": None,
-                "email_data": {
-                    **email,  # Original email data
-                    'email_content': processed_email['email_data']['email_content']  # Updated content
+                
+                # Process salutations
+                processed_email = process_email(temp_email_data)
+                
+                # Create email entry with processed content
+                email_entry = {
+                    "campaign_id": campaign_id,
+                    "scheduled_time": slot.isoformat(),
+                    "recipient_time": recipient_time,
+                    "status": "pending",
+                    "attempt_count": 0,
+                    "last_attempt": None,
+                    "email_data": {
+                        **email,  # Original email data
+                        'email_content': processed_email['email_data']['email_content']  # Updated content
+                    }
                 }
-            }
-            print(f"mail_entry: {email}")
-            # Add to queue and update tracking
-            tracker["sending_accounts"][sender_email]["email_queue"].append(email_entry)
-            tracker["sending_accounts"][sender_email]["last_scheduled_time"] = slot.isoformat()
-            update_daily_schedule_count(tracker, sender_email, slot)
-            
-            emails_scheduled += 1
-            
-            # Log scheduling info
-            schedule_day = get_schedule_day(slot)
-            daily_count = tracker["sending_accounts"][sender_email]["daily_schedule_count"][schedule_day]
-            logger.info(f"Scheduled email for {sender_email} on {schedule_day} (day count: {daily_count})")
-        else:
-            logger.warning(f"Failed to find slot for email after {attempts} attempts")
-            # Here we could potentially add to a failed_to_schedule list or handle differently
+                # Add to queue and update tracking
+                sender_data["email_queue"].append(email_entry)
+                allocator.reserve(sender_email, slot)
+                sender_data["last_scheduled_time"] = slot.isoformat()
+                schedule_day = get_schedule_day(slot)
+                sender_data['daily_schedule_count'].setdefault(schedule_day, 0)
+                update_daily_schedule_count(tracker, sender_email, slot)
+                
+                emails_scheduled += 1
+                logger.info(f"Scheduled email for {sender_email} on {schedule_day} "
+                            f"(day count: {sender_data['daily_schedule_count'][schedule_day]})")
+                
+                # Only this sender's availability changed
+                next_slot = allocator.find_slot(sender_email, time_zone)
+                if next_slot:
+                    heapq.heappush(availability, (next_slot, sender_email))
+    
+    if unplaced:
+        logger.warning(f"Could not place {len(unplaced)} emails within {days} days")
+        for email in unplaced:
+            logger.warning(f"Unplaced recipient: {email.get('email_recipient')} ({email.get('time_zone')})")
     
     # Log final distribution
     logger.info("Final email distribution:")
@@ -622,50 +575,29 @@ def schedule_emails_optimized(email_data: List[Dict], senders: Dict, tracker: Di
         logger.info(f"{sender_email}: {counts}")
     
     tracker["campaigns"][campaign_id]["emails_scheduled"] = emails_scheduled
+    tracker["campaigns"][campaign_id]["emails_unplaced"] = len(unplaced)
+    # Kept with the campaign so they can be rescheduled once capacity frees up
+    tracker["campaigns"][campaign_id]["unplaced_recipients"] = [
+        email.get('email_recipient') for email in unplaced
+    ]
     logger.info(f"Successfully scheduled {emails_scheduled} emails")
+    return unplaced
 
 
 
 
 def initialize_email_senders():
-    """Initialize email senders with enterprise configuration"""
-    senders = {}
-    worker_emails_count = int(os.getenv('WORKER_EMAILS_COUNT', 5))
-    logger.info(f"Initializing {worker_emails_count} email senders...")
-    
-    for i in range(1, worker_emails_count + 1):
-        email = os.getenv(f'MS365_EMAIL_{i}')
-        if email:
-            logger.info(f"Initializing sender for {email}")
-            try:
-                # Create sender with Graph API credentials
-                sender = EmailSender(
-                    email=email,
-                    app_password=os.getenv(f'MS365_APP_PASSWORD_{i}'),
-                    daily_limit=int(os.getenv(f'DAILY_LIMIT_{i}', 30)),
-                    region=os.getenv(f'REGION_{i}', 'global'),
-                    client_id=os.getenv(f'CLIENT_ID_{i}'),
-                    client_secret=os.getenv(f'CLIENT_SECRET_{i}'),
-                    tenant_id=os.getenv(f'TENANT_ID_{i}')
-                )
-                senders[email] = sender
-            except Exception as e:
-                logger.error(f"Failed to initialize {email}: {str(e)}")
-                
+    """Email senders from the shared registry, reloaded when .env changes"""
+    senders = sender_registry.senders()
+    logger.info(f"Using {len(senders)} email senders")
     return senders
 
 
 
 
 def log_outbound_email(email_data: dict, success: bool):
-    """Log outbound email details to JSON file"""
+    """Append outbound email details to the daily JSONL send log"""
     try:
-        # Create logs directory if it doesn't exist
-        os.makedirs('email_logs', exist_ok=True)
-        
-        # Generate log filename with current date
-        log_file = f'email_logs/initial_sendinglog_{datetime.now().strftime("%Y%m%d")}.json'
-        
         # Prepare log entry
         log_entry = {
             "timestamp": datetime.now(pytz.UTC).isoformat(),
@@ -675,6 +607,7 @@ def log_outbound_email(email_data: dict, success: bool):
                 "subject": email_data.get("subject"),
                 "sender": email_data.get("sender"),
                 "recipient": email_data.get("recipient"),
+                "campaign_id": email_data.get("campaign_id"),
                 "thread_id": email_data.get("thread_id"),
                 "conversation_index": email_data.get("conversation_index"),
                 "conversation_topic": email_data.get("conversation_topic"),
@@ -691,19 +624,7 @@ def log_outbound_email(email_data: dict, success: bool):
             }
         }
         
-        # Read existing logs or create new list
-        try:
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            logs = []
-            
-        # Append new log
-        logs.append(log_entry)
-        
-        # Write updated logs
-        with open(log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
+        outbound_log.write(log_entry)
             
     except Exception as e:
         logger.error(f"Error logging outbound email: {str(e)}")
@@ -712,87 +633,147 @@ def log_outbound_email(email_data: dict, success: bool):
 
 
 
-async def process_scheduled_emails(tracker: Dict, senders: Dict):
-    """Process scheduled emails efficiently"""
-    amsterdam_tz = pytz.timezone('Europe/Amsterdam')
+def send_scheduled_email(sender_email: str, email: Dict, tracker: Dict, senders: Dict,
+                         outbound_buffer: EmailRecordBuffer) -> bool:
+    """Send one queued email and record the outcome, returns whether it was sent"""
+    sender_data = tracker["sending_accounts"][sender_email]
+    success = False
+    try:
+        # Extract recipient (handling both single and list formats)
+        recipient_email = email["email_data"]["email_recipient"][0] if isinstance(
+            email["email_data"]["email_recipient"], list
+        ) else email["email_data"]["email_recipient"]
+        
+        # Minimal required headers
+        headers = {
+            'Thread-Topic': email["email_data"]["subjectline"],
+            'References': [],
+            'In-Reply-To': None
+        }
 
-    while True:
-        current_time = datetime.now(amsterdam_tz)
-        emails_remaining = False
-        
-        for sender_email, sender_data in tracker["sending_accounts"].items():
-            queue_copy = sender_data["email_queue"].copy()
+        # Execute email sending
+        success, sent_headers = senders[sender_email].send_email(
+            recipient=recipient_email,
+            subject=email["email_data"]["subjectline"],
+            body=email["email_data"]["email_content"],
+            time_zone=email["email_data"].get('time_zone', 'Europe/Amsterdam'),
+            headers=headers
+        )
+        
+        if success:
+            outbound_data = {
+                'sender': sender_email,
+                'recipient': recipient_email,
+                'subject': email["email_data"]["subjectline"],
+                'body': email["email_data"]["email_content"],
+                'created_at': datetime.now(pytz.UTC),
+                'direction': 'outbound',
+                'time_zone': email["email_data"].get('time_zone', 'Europe/Amsterdam'),
+                'thread_topic': email["email_data"]["subjectline"],
+                'message_id': sent_headers.get('message_id'),
+                'conversation_id': sent_headers.get('conversation_id'),
+                # Provisional key until the correlator stores the Graph id
+                'email_id': sent_headers.get('email_id') or sent_headers.get('message_id'),
+                'parent_folder_id': sent_headers.get('parent_folder_id'),
+                'campaign_id': email['campaign_id'],
+                'followup_delay_days': sequence_engine.first_delay_days(email['campaign_id'])
+            }
             
-            for email in queue_copy:
-                if email["status"] == "pending" and datetime.fromisoformat(email["scheduled_time"]) <= current_time:
-                    try:
-                        # Extract recipient (handling both single and list formats)
-                        recipient_email = email["email_data"]["email_recipient"][0] if isinstance(
-                            email["email_data"]["email_recipient"], list
-                        ) else email["email_data"]["email_recipient"]
-                        
-                        # Minimal required headers
-                        headers = {
-                            'Thread-Topic': email["email_data"]["subjectline"],
-                            'References': [],
-                            'In-Reply-To': None
-                        }
-  
-                        # Execute email sending
-                        success, sent_headers = senders[sender_email].send_email(
-                            recipient=recipient_email,
-                            subject=email["email_data"]["subjectline"],
-                            body=email["email_data"]["email_content"],
-                            time_zone=email["email_data"].get('time_zone', 'Europe/Amsterdam'),
-                            headers=headers
-                        )
-                        
-                        if success:
-                            outbound_data = {
-                                'sender': sender_email,
-                                'recipient': recipient_email,
-                                'subject': email["email_data"]["subjectline"],
-                                'body': email["email_data"]["email_content"],
-                                'created_at': datetime.now(pytz.UTC),
-                                'direction': 'outbound',
-                                'time_zone': email["email_data"].get('time_zone', 'Europe/Amsterdam'),
-                                'thread_topic': email["email_data"]["subjectline"],
-                                'message_id': sent_headers.get('message_id'),
-                                'conversation_id': sent_headers.get('conversation_id'),
-                                'email_id': sent_headers.get('email_id'),
-                                'parent_folder_id': sent_headers.get('parent_folder_id'),
-                                'campaign_id': email['campaign_id']
-                            }
-                            
-                            # Record keeping
-                            post_email(outbound_data, 'outbound')
-                            log_outbound_email(outbound_data, success)
-                            
-                            # Campaign management
-                            campaign_id = email['campaign_id']
-                            tracker["campaigns"][campaign_id]["emails_sent"] += 1
-                            emails_remaining = True
-                        else:
-                            print("no email campaign id!!!!!")
-                            tracker["campaigns"][email["campaign_id"]]["emails_failed"] += 1
-                            
-                        # Queue management
-                        sender_data["email_queue"].remove(email)
-                        
-                        # Tracker persistence
-                        with open('src/email_management/trackers/sending_tracker.json', 'w') as f:
-                            json.dump(tracker, f, indent=2)
-                            
-                    except Exception as e:
-                        logger.error(f"Email sending error: {str(e)}")
-                        sender_data["email_queue"].remove(email)
-                        tracker["campaigns"][email["campaign_id"]]["emails_failed"] += 1
-        
-        if not emails_remaining:
-            break
+            # Record keeping
+            outbound_buffer.add(outbound_data, 'outbound')
+            log_outbound_email(outbound_data, success)
+            counter = "emails_sent"
+        else:
+            print("no email campaign id!!!!!")
+            counter = "emails_failed"
             
-        # Use asyncio.sleep instead of time.sleep
-        await asyncio.sleep(1200)  # Rate limiting
+    except Exception as e:
+        logger.error(f"Email sending error: {str(e)}")
+        success = False
+        counter = "emails_failed"
+
+    with _tracker_lock:
+        # Campaign management
+        tracker["campaigns"][email["campaign_id"]][counter] += 1
+        # Queue management
+        try:
+            sender_data["email_queue"].remove(email)
+        except ValueError:
+            logger.warning(f"Email {email.get('queue_id')} was already removed from {sender_email}'s queue")
+    
+    # Tracker persistence, one row delete and one counter update
+    tracker_store.record_send(email.get("queue_id"), email["campaign_id"], counter, sender_email)
+    return success
+
+
+async def process_scheduled_emails(tracker: Dict, senders: Dict):
+    """
+    Send queued emails as they become due. Runs until every queue is empty,
+    entries added to the dispatcher meanwhile are picked up without a restart.
+    """
+    global active_tracker
+    outbound_buffer = EmailRecordBuffer(batch_size=OUTBOUND_WRITE_BATCH_SIZE)
+
+    def send(sender_email: str, email: Dict) -> bool:
+        try:
+            return send_scheduled_email(sender_email, email, tracker, senders, outbound_buffer)
+        finally:
+            # Off the queue now, or left pending after an error to be loaded again
+            dispatcher.done(email)
+
+    def campaign_rules_for(campaign_id: str) -> SendingRules:
+        # The rules a campaign was scheduled with, stored by entrypoint
+        stored = tracker["campaigns"].get(campaign_id, {}).get("sending_rules")
+        return SendingRules.from_dict(stored) if stored else rules_for_campaign(campaign_id)
+
+    def limiter_for(sender_email: str) -> TokenBucket:
+        # Enforces the account's spacing and daily cap on top of the schedule,
+        # the strictest of the campaigns queued on it. Sends recorded today
+        # count, so a restart doesn't grant a fresh daily quota.
+        sender_data = tracker["sending_accounts"][sender_email]
+        with _tracker_lock:
+            campaign_ids = {entry["campaign_id"] for entry in sender_data["email_queue"]}
+        rules = [campaign_rules_for(campaign_id) for campaign_id in campaign_ids] or [default_rules()]
+        return TokenBucket(
+            interval=sender_data.get("time_between_emails", max(r.min_gap_minutes for r in rules)) * 60,
+            daily_limit=min(r.daily_limit_for(sender_email, sender_data.get("daily_limit")) for r in rules),
+            sent_today=tracker_store.sent_today(sender_email)
+        )
+
+    # Every account sends on its own worker, so accounts don't wait on each other
+    workers = SenderWorkers(send, limiter_for, max_threads=SEND_CONCURRENCY)
+
+    async def dispatch(sender_email: str, email: Dict) -> None:
+        workers.submit(sender_email, email)
+
+    async def on_idle() -> None:
+        # Write the outbound rows sent so far before idling
+        outbound_buffer.flush()
+        outbound_log.flush()
+        # Close sessions past max_idle, recent ones stay for the next burst
+        smtp_pool.prune()
+
+    active_tracker = tracker
+    with _tracker_lock:
+        dispatcher.load(tracker)
+    try:
+        while True:
+            await dispatcher.run(dispatch, on_idle=on_idle)
+            # Draining can wait hours on a daily limit, campaigns added
+            # meanwhile are loaded into the dispatcher and get another pass
+            await workers.join()
+            if not len(dispatcher):
+                break
+        # Nothing awaited since the check, a later campaign starts a new run
+        if active_tracker is tracker:
+            active_tracker = None
+        await workers.close()
+        await on_idle()
+    finally:
+        if active_tracker is tracker:
+            active_tracker = None
+    logger.info(f"Dispatcher finished: {dispatcher.stats()}")
+    logger.info(f"Sender workers: {workers.stats()}")
 
 
 
@@ -808,10 +789,21 @@ async def process_scheduled_emails(tracker: Dict, senders: Dict):
 
 # In sender.py
 # Update the entrypoint function to use these
-async def entrypoint(email_data, campaign_id):
+async def entrypoint(email_data, campaign_id, sending_rules: Optional[Dict] = None):
+    """
+    Schedule and send a campaign. `sending_rules` overrides the configured
+    sending rules for this campaign only, e.g. {"allowed_hours": {"start": "08:00", "end": "16:00"}}
+    """
+    configure_logging()
     amsterdam_tz = pytz.timezone('Europe/Amsterdam')
     current_time = datetime.now(amsterdam_tz) 
 
+    try:
+        rules = rules_for_campaign(campaign_id, sending_rules)
+    except ValueError as e:
+        logger.error(f"Campaign {campaign_id} rejected: {str(e)}")
+        return False
+
     # Initialize senders
     senders = initialize_email_senders()
     if not senders:
@@ -820,37 +812,52 @@ async def entrypoint(email_data, campaign_id):
     logger.info(f"Initialized {len(senders)} email senders")
 
     try:
-        # Load tracker and ensure proper initialization
-        tracker = load_tracker()
+        # Load tracker and ensure proper initialization, sharing the one in use
+        # when emails are already being dispatched
+        tracker = active_tracker if active_tracker is not None else load_tracker()
         logger.info("Loaded email tracker")
         
-        # Initialize campaign
-        if 'campaigns' not in tracker:
-            tracker['campaigns'] = {}
+        # Worker threads of a running send loop remove entries from these
+        # queues, hold their lock while the campaign is planned, saved and
+        # handed over
+        with _tracker_lock:
+            # Initialize campaign
+            if 'campaigns' not in tracker:
+                tracker['campaigns'] = {}
+                
+            tracker["campaigns"][campaign_id] = {
+                "created_at": current_time.isoformat(),
+                "total_emails": len(email_data),
+                "emails_scheduled": 0,
+                "emails_sent": 0,
+                "emails_failed": 0,
+                "status": "new",
+                "sending_rules": rules.to_dict()
+            }
             
-        tracker["campaigns"][campaign_id] = {
-            "created_at": current_time.isoformat(),
-            "total_emails": len(email_data),
-            "emails_scheduled": 0,
-            "emails_sent": 0,
-            "emails_failed": 0,
-            "status": "new"
-        }
-        
-        # Ensure trackers directory exists
-        os.makedirs('src/email_management/trackers', exist_ok=True)
-        
-        # Schedule emails with initialized tracker
-        schedule_emails_optimized(email_data, senders, tracker, campaign_id)
-        
-        # Save updated tracker
-        with open('src/email_management/trackers/sending_tracker.json', 'w') as f:
-            json.dump(tracker, f, indent=2)
-
+            # Ensure trackers directory exists
+            os.makedirs('src/email_management/trackers', exist_ok=True)
+            
+            # Schedule emails with initialized tracker
+            unplaced = schedule_emails_optimized(email_data, senders, tracker, campaign_id, rules)
+            
+            # Save updated tracker, inserts the new queue entries in one transaction
+            tracker_store.save(tracker)
+            
+            # Hand the new entries to the running send loop
+            joined = tracker is active_tracker
+            if joined:
+                added = dispatcher.load(tracker)
+
+        if unplaced:
+            logger.warning(f"Campaign {campaign_id}: {len(unplaced)} recipients could not be scheduled, "
+                           f"see unplaced_recipients in the tracker")
         logger.info(f"Campaign {campaign_id} initialized with {tracker['campaigns'][campaign_id]['emails_scheduled']} emails")
         
-        # Start processing
-        await process_scheduled_emails(tracker, senders)
+        if joined:
+            logger.info(f"Added {added} emails to the running dispatcher")
+        else:
+            await process_scheduled_emails(tracker, senders)
         
         return True
         
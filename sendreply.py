@@ -14,6 +14,7 @@ from rich.console import Console
 from dotenv import load_dotenv
 
 from src.email_management.src.lib.smtp_based_funcions import EmailSender
+from src.email_management.src.lib.sender_registry import sender_registry
 from src.email_management.src.lib.supabase_client import (
     post_email, update, supabase_client
 )
@@ -58,24 +59,11 @@ def update_original_email_status(original_email: Dict) -> None:
         logger.error(f"Failed to update original email status: {e}")
 
 def init_sender(email: str) -> Optional[EmailSender]:
-    """Initialize email sender"""
-    if not load_root_env():
-        return None
-
-    try:
-        worker_count = int(os.getenv('EMAILS_COUNT', 0))
-        for i in range(worker_count):
-            current = i + 1
-            if email == os.getenv(f'MS365_EMAIL_{current}'):
-                return EmailSender(
-                    email=email,
-                    app_password=os.getenv(f'MS365_APP_PASSWORD_{current}'),
-                    daily_limit=int(os.getenv(f'DAILY_LIMIT_{current}', 30)),
-                    region=os.getenv(f'REGION_{current}', "global")
-                )
-    except Exception as e:
-        logger.error(f"Failed to initialize sender {email}: {e}")
-    return None
+    """Sender for `email` from the shared registry, reusing its connections"""
+    sender = sender_registry.get(email)
+    if sender is None:
+        logger.error(f"No sender account configured for {email}")
+    return sender
 
 def send_reply(
     sender: str,
@@ -83,9 +71,15 @@ def send_reply(
     subject: str,
     body: str,
     original_email_id: str,
-    time_zone: Optional[str] = None
+    time_zone: Optional[str] = None,
+    original_email: Optional[Dict] = None,
+    update_original: bool = True
 ) -> Tuple[bool, str]:
-    """Send a reply email with proper threading"""
+    """
+    Send a reply email with proper threading. Callers that already hold the
+    original received_email row pass it as `original_email` to skip the
+    lookup, and `update_original=False` when they update its status themselves.
+    """
     try:
         print("\n=== Starting Reply Process ===")
         print(f"1. Initial parameters:")
@@ -95,15 +89,17 @@ def send_reply(
         print(f"- Original Email ID: {original_email_id}")
 
         # Get the original email data
-        original_email = supabase_client.client.from_("received_email") \
-            .select("*") \
-            .eq("email_id", original_email_id) \
-            .execute()
+        original_email_data = original_email
+        if original_email_data is None:
+            result = supabase_client.client.from_("received_email") \
+                .select("*") \
+                .eq("email_id", original_email_id) \
+                .execute()
 
-        if not original_email.data:
-            return False, "Original email not found"
+            if not result.data:
+                return False, "Original email not found"
 
-        original_email_data = original_email.data[0]
+            original_email_data = result.data[0]
         
         # Extract threading information
         email_data = {
@@ -128,7 +124,7 @@ def send_reply(
 
         # Send the email with threading information as headers
         print(f"the following email is going to be send in the send_reply funciotn: {body[:100]}")
-        success = email_sender.send_email(
+        success, _ = email_sender.send_email(
             recipient=recipient,
             subject=email_data["subject"],
             body=body,
@@ -148,7 +144,8 @@ def send_reply(
             # Store the reply in the database with email_type as separate argument
             # post_email(email_data, "reply_outbound")
             # Update the original email's status
-            update_original_email_status(original_email_data)
+            if update_original:
+                update_original_email_status(original_email_data)
             return True, "Reply sent successfully"
         
         return False, "Failed to send reply"
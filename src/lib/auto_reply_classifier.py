@@ -0,0 +1,121 @@
+import re
+from typing import Dict, Optional
+
+AUTO_REPLY = 'auto_reply'
+BOUNCE = 'bounce'
+
+# Only the start of the body is checked, notices put their wording up front
+BODY_SCAN_CHARS = 600
+
+BOUNCE_SENDER = re.compile(
+    r'^(?:mailer-daemon|postmaster|mail-daemon|mailerdaemon|microsoftexchange[0-9a-f]*|bounces?)(?:[+@]|$)',
+    re.IGNORECASE
+)
+NOREPLY_SENDER = re.compile(r'^(?:no-?reply|do-?not-?reply|auto-?reply|autoresponder)(?:[+@]|$)', re.IGNORECASE)
+
+# en / de / nl / es, the languages we send in
+BOUNCE_SUBJECT = re.compile(
+    r'undeliverable|undelivered mail|delivery status notification|delivery (?:has )?failed|'
+    r'mail delivery (?:failed|failure|subsystem)|returned mail|failure notice|'
+    r'unzustellbar|nicht zustellbar|zustellung fehlgeschlagen|'
+    r'onbestelbaar|kan niet worden bezorgd|bezorging mislukt|'
+    r'no se puede entregar|no entregado|error de entrega',
+    re.IGNORECASE
+)
+AUTO_REPLY_SUBJECT = re.compile(
+    r'automatic reply|auto[- ]?reply|auto[- ]?response|out of (?:the )?office|away from (?:the )?office|'
+    r'automatische antwort|abwesenheit|nicht im b(?:ü|ue)ro|'
+    r'automatisch antwoord|afwezig|niet aanwezig|buiten kantoor|'
+    r'respuesta autom(?:á|a)tica|fuera de la oficina|ausente',
+    re.IGNORECASE
+)
+# Body wording alone is weak evidence, people write "I'm away next week" or
+# "my email wasn't delivered" in real replies. A notice is either stated as
+# automatic, or it combines an absence with the notice's usual boilerplate.
+AUTOMATIC_NOTICE = re.compile(
+    r"this is an? (?:automatic|automated|auto-generated) (?:reply|response|message|notification)|"
+    r"dies ist eine automatische? (?:antwort|nachricht|benachrichtigung)|"
+    r"dit is een automatisch (?:antwoord|bericht|gegenereerd bericht)|"
+    r"esta es una respuesta autom(?:á|a)tica|este es un mensaje autom(?:á|a)tico",
+    re.IGNORECASE
+)
+ABSENCE = re.compile(
+    r"(?:i am|i'm|i will be) (?:currently )?(?:out of (?:the )?office|away|on (?:annual |parental )?leave|"
+    r"on vacation|on holiday)|"
+    r"(?:ich bin|bin ich) (?:derzeit |momentan |bis [^.]{0,40})?(?:nicht im b(?:ü|ue)ro|abwesend|im urlaub|au(?:ß|ss)er haus)|"
+    r"ik ben (?:momenteel |tot [^.]{0,40})?(?:afwezig|niet aanwezig|met vakantie|niet op kantoor)|"
+    r"(?:estoy|estar(?:é|e)) (?:actualmente )?(?:fuera de la oficina|ausente|de vacaciones)",
+    re.IGNORECASE
+)
+ABSENCE_BOILERPLATE = re.compile(
+    r"(?:with|have|had) (?:limited|no) access to (?:my )?e-?mail|"
+    r"(?:in urgent cases|for urgent (?:matters|requests|inquiries)|if (?:your matter is|it is) urgent)|"
+    r"(?:upon|after|on) my return|will (?:respond|reply|get back to you|answer)[^.]{0,40}(?:return|when i(?:'m| am) back)|"
+    r"eingeschr(?:ä|ae)nkte?n? zugriff|in dringenden f(?:ä|ae)llen|nach meiner r(?:ü|ue)ckkehr|"
+    r"beperkte? toegang|in dringende gevallen|na mijn (?:terugkomst|terugkeer)|"
+    r"acceso limitado|en caso de urgencia|para asuntos urgentes|a mi regreso",
+    re.IGNORECASE
+)
+# Delivery failures stated by a mail server: NDR boilerplate and SMTP status codes
+DELIVERY_REPORT = re.compile(
+    r"delivery has failed to these recipients|mail delivery subsystem|delivery status notification|"
+    r"recipient address rejected|user unknown|mailbox (?:unavailable|not found|does not exist)|"
+    r"address (?:not found|couldn't be found|could not be found)|"
+    r"\b[45]\d\d[ -][45]\.\d{1,3}\.\d{1,3}\b|"
+    r"die folgenden empf(?:ä|ae)nger|empf(?:ä|ae)ngeradresse (?:abgelehnt|unbekannt)|"
+    r"adres (?:niet gevonden|onbekend)|direcci(?:ó|o)n no encontrada",
+    re.IGNORECASE
+)
+# "couldn't be delivered" wording, a bounce only from an automatic sender
+UNDELIVERED = re.compile(
+    r"(?:couldn't|could not|wasn't|was not) (?:be )?delivered|delivery (?:has )?failed|"
+    r"konnte nicht zugestellt werden|kon niet worden bezorgd|no se pudo entregar",
+    re.IGNORECASE
+)
+PRECEDENCE_AUTO = re.compile(r'^\s*(?:auto_reply|bulk|junk)\s*$', re.IGNORECASE)
+HTML_TAG = re.compile(r'<[^>]*>')
+
+
+def _body_start(body: Optional[str]) -> str:
+    text = (body or '')[:BODY_SCAN_CHARS * 4]
+    if '<' in text:
+        text = HTML_TAG.sub(' ', text)
+    return ' '.join(text.split())[:BODY_SCAN_CHARS]
+
+
+def classify_auto_reply(headers: Dict[str, str], sender: Optional[str] = None,
+                        subject: Optional[str] = None, body: Optional[str] = None) -> Optional[str]:
+    """
+    Recognize bounces and automatic replies without a model.
+    `headers` maps lowercased header names to values, as process_raw_email builds them.
+    Returns BOUNCE, AUTO_REPLY or None when the message needs a real classification.
+    """
+    local_part = (sender or '').strip().lower()
+    subject = subject or ''
+
+    # Bounces: delivery reports, daemon senders, NDR subjects
+    content_type = headers.get('content-type', '')
+    if ('report-type=delivery-status' in content_type.lower()
+            or 'x-failed-recipients' in headers
+            or BOUNCE_SENDER.match(local_part)
+            or BOUNCE_SUBJECT.search(subject)):
+        return BOUNCE
+
+    # Automatic replies: RFC 3834 and vendor headers first, then wording
+    auto_submitted = headers.get('auto-submitted', '').strip().lower()
+    if auto_submitted and auto_submitted != 'no':
+        # Some servers mark their delivery failures auto-generated instead of sending a DSN
+        return BOUNCE if UNDELIVERED.search(_body_start(body)) else AUTO_REPLY
+    if ('x-auto-response-suppress' in headers or 'x-autoreply' in headers
+            or 'x-autorespond' in headers or 'x-autoresponder' in headers
+            or PRECEDENCE_AUTO.match(headers.get('precedence', ''))):
+        return AUTO_REPLY
+    if NOREPLY_SENDER.match(local_part) or AUTO_REPLY_SUBJECT.search(subject):
+        return AUTO_REPLY
+
+    text = _body_start(body)
+    if DELIVERY_REPORT.search(text):
+        return BOUNCE
+    if AUTOMATIC_NOTICE.search(text) or (ABSENCE.search(text) and ABSENCE_BOILERPLATE.search(text)):
+        return AUTO_REPLY
+    return None
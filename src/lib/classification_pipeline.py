@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from .gpt_agent import get_beta_generation
+from .llm_cache import LLMCache, llm_cache, make_key
+from .prompts import system_prompt
+from .supabase_client import store_reply_classifications
+
+logger = logging.getLogger(__name__)
+
+CLASSIFY_MODEL = os.getenv('CLASSIFY_MODEL', 'gpt-4o-mini')
+CLASSIFY_CONCURRENCY = int(os.getenv('CLASSIFY_CONCURRENCY', 8))
+CLASSIFY_TIMEOUT = float(os.getenv('CLASSIFY_TIMEOUT', 60))  # seconds per LLM request
+
+
+class Reply(BaseModel):
+    subject: str = Field(..., description="The subject of the reply email")
+    body: str = Field(..., description="The body of the reply email")
+
+class ProccessedEmailAnalysis(BaseModel): ##
+    level_of_interest: str = Field(..., description="The level of interest of the user that sent the reply (e.g., 'high', 'medium', 'low', 'not_intrested','rude')")
+    is_related: bool = Field(..., description="True if the reply is related to the email of the campaign, False if unrelated.")
+    reply: Reply = Field(..., description="Based on the level of interest, generate an appropriate response. If the level of interest is low and the behavior is rude, generate a polite apology, else generate a tailored response.")
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, timeouts and server errors are worth another attempt"""
+    status = getattr(error, 'status_code', None)
+    if status == 429 or (status is not None and status >= 500):
+        return True
+    return type(error).__name__ in ('RateLimitError', 'APITimeoutError', 'APIConnectionError', 'InternalServerError')
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, if it said so"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+@dataclass
+class ClassificationResult:
+    email_id: str
+    analysis: Optional[ProccessedEmailAnalysis] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    latency: float = 0.0
+    cached: bool = False
+
+
+class ReplyClassifier:
+    """
+    Classifies inbound replies with system_prompt concurrently.
+
+    At most `max_in_flight` requests run at once, on their own thread pool.
+    Rate-limited and failed requests back off exponentially (with jitter,
+    or as long as retry-after says). Results are written back in batches of
+    `write_batch_size` through store_reply_classifications.
+
+    `generate(user_input)` can be swapped out, e.g. for a fake LLM in tests;
+    the default also honours OPENAI_BASE_URL for a local server.
+    Replies whose (model, prompt, normalized body) is in `cache` are answered
+    from it without a request, pass cache=None to always call the model.
+    """
+
+    def __init__(self, generate: Optional[Callable[[str], ProccessedEmailAnalysis]] = None,
+                 max_in_flight: int = CLASSIFY_CONCURRENCY, timeout: float = CLASSIFY_TIMEOUT,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0,
+                 write_batch_size: int = 25, model: str = CLASSIFY_MODEL,
+                 store: Callable[[List[Dict]], int] = store_reply_classifications,
+                 cache: Optional[LLMCache] = llm_cache):
+        self.generate = generate or self._generate
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.write_batch_size = write_batch_size
+        self.model = model
+        self.store = store
+        self.cache = cache
+        self.latencies: List[float] = []
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.elapsed = 0.0
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _generate(self, user_input: str) -> ProccessedEmailAnalysis:
+        return get_beta_generation(
+            system_prompt,
+            response_format=ProccessedEmailAnalysis,
+            model=self.model,
+            user_input=user_input,
+            timeout=self.timeout
+        )
+
+    async def classify(self, email: Dict, semaphore: asyncio.Semaphore,
+                       executor: ThreadPoolExecutor) -> ClassificationResult:
+        """Classify one reply, retrying retryable errors with backoff"""
+        loop = asyncio.get_running_loop()
+        result = ClassificationResult(email_id=email.get('email_id'))
+        key = make_key(self.model, system_prompt, email.get('body')) if self.cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                result.analysis = ProccessedEmailAnalysis.model_validate(cached)
+                result.cached = True
+                return result
+            # Identical bodies in the same run share one request
+            pending = self._in_flight.get(key)
+            if pending is not None:
+                analysis = await pending
+                if analysis is not None:
+                    result.analysis = analysis
+                    result.cached = True
+                    return result
+            else:
+                self._in_flight[key] = loop.create_future()
+        try:
+            return await self._classify_uncached(email, result, key, semaphore, executor)
+        finally:
+            if key and key in self._in_flight and not self._in_flight[key].done():
+                self._in_flight.pop(key).set_result(result.analysis)
+
+    async def _classify_uncached(self, email: Dict, result: ClassificationResult, key: Optional[str],
+                                 semaphore: asyncio.Semaphore, executor: ThreadPoolExecutor) -> ClassificationResult:
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            result.attempts = attempt + 1
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    result.analysis = await loop.run_in_executor(executor, self.generate, email.get('body') or '')
+                    result.latency = time.perf_counter() - started
+                    self.latencies.append(result.latency)
+                    if key:
+                        self.cache.put(key, result.analysis.model_dump(), result.latency)
+                    return result
+                except Exception as e:
+                    result.error = str(e)
+                    if not is_retryable(e) or attempt == self.max_retries:
+                        logger.error(f"Classification failed for {result.email_id}: {str(e)}")
+                        return result
+                    delay = retry_after(e) or min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+            # Back off outside the semaphore so other replies keep going
+            self.retries += 1
+            logger.warning(f"Retrying classification of {result.email_id} in {delay:.1f}s ({result.error})")
+            await asyncio.sleep(delay)
+        return result
+
+    async def _write(self, batch: List[ClassificationResult]) -> None:
+        rows = [{
+            'email_id': r.email_id,
+            'level_of_interest': r.analysis.level_of_interest,
+            'is_related': r.analysis.is_related,
+            'reply_subject': r.analysis.reply.subject,
+            'reply_body': r.analysis.reply.body,
+        } for r in batch]
+        try:
+            await asyncio.to_thread(self.store, rows)
+        except Exception as e:
+            logger.error(f"Error storing {len(rows)} classifications: {str(e)}")
+
+    async def run(self, emails: List[Dict]) -> List[ClassificationResult]:
+        """Classify all replies and store the results, in completion order"""
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        results, batch, writes = [], [], []
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="classify") as executor:
+            tasks = [asyncio.create_task(self.classify(email, semaphore, executor)) for email in emails]
+            for task in asyncio.as_completed(tasks):
+                result = await task
+                results.append(result)
+                if result.analysis is None:
+                    self.failed += 1
+                    continue
+                self.completed += 1
+                batch.append(result)
+                if len(batch) >= self.write_batch_size:
+                    writes.append(asyncio.create_task(self._write(batch)))
+                    batch = []
+            if batch:
+                writes.append(asyncio.create_task(self._write(batch)))
+            await asyncio.gather(*writes)
+        self.elapsed += time.perf_counter() - started
+        return results
+
+    def stats(self) -> Dict:
+        latencies = sorted(self.latencies)
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "p50_seconds": percentile(latencies, 50),
+            "p90_seconds": percentile(latencies, 90),
+            "p99_seconds": percentile(latencies, 99),
+            "throughput_per_second": self.completed / self.elapsed if self.elapsed else None,
+            "cache": self.cache.stats() if self.cache else None,
+        }
+
+
+def classify_replies(emails: List[Dict], **kwargs) -> List[ClassificationResult]:
+    """Run a ReplyClassifier over `emails` from synchronous code"""
+    classifier = ReplyClassifier(**kwargs)
+    results = asyncio.run(classifier.run(emails))
+    logger.info(f"Reply classification: {classifier.stats()}")
+    return results
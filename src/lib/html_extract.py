@@ -0,0 +1,147 @@
+import re
+from html.parser import HTMLParser
+from typing import List, Optional
+
+# Feed the parser in chunks so it can stop early on long quoted threads
+CHUNK_SIZE = 8192
+
+BLOCK_TAGS = {'p', 'div', 'br', 'tr', 'li', 'ul', 'ol', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre'}
+SKIP_TAGS = {'script', 'style', 'head', 'title'}
+VOID_TAGS = {'br', 'hr', 'img', 'meta', 'link', 'input', 'wbr', 'col', 'area', 'base', 'source'}
+
+# Where the quoted history starts in Outlook, Gmail and Apple Mail bodies
+QUOTE_IDS = {'appendonsend', 'divrplyfwdmsg', 'stopspelling', 'mail-editor-reference-message-container'}
+QUOTE_CLASSES = {'gmail_quote', 'gmail_attr', 'outlookmessageheader', 'yahoo_quoted', 'moz-cite-prefix'}
+
+# Plain-text quote headers of the languages we send in (en/de/nl/es)
+PLAIN_QUOTE_START = re.compile(
+    r'^\s*(?:'
+    r'on .{0,200}wrote:|am .{0,200}schrieb .{0,200}:|op .{0,200}schreef .{0,200}:|el .{0,200}escribi(?:ó|o):|'
+    r'-{2,}\s*(?:original message|urspr(?:ü|ue)ngliche nachricht|oorspronkelijk bericht|mensaje original)\s*-{2,}|'
+    r'_{5,}|'
+    r'(?:from|von|van|de):\s.+'
+    r')\s*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+HTML_HINT = re.compile(r'<(?:!doctype|html|head|body|div|p|br|span|table|font|blockquote)\b', re.IGNORECASE)
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class FirstReplyParser(HTMLParser):
+    """
+    Collects the text of the first div.elementToProof (Outlook) and stops
+    right after it closes. Until then it also collects the text in front of
+    the first quoted-history marker, used when there is no such div, and
+    stops at that marker since nothing after it belongs to the new message.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.proof_parts: List[str] = []
+        self.preamble_parts: List[str] = []
+        self.proof_done = False
+        self.quote_started = False
+        self._proof_depth = 0
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        attrs = dict(attrs)
+        classes = set((attrs.get('class') or '').lower().split())
+        element_id = (attrs.get('id') or '').lower()
+
+        if self._proof_depth:
+            if tag not in VOID_TAGS:
+                self._proof_depth += 1
+        elif tag == 'div' and 'elementtoproof' in classes:
+            self._proof_depth = 1
+        elif tag == 'blockquote' or element_id in QUOTE_IDS or classes & QUOTE_CLASSES:
+            self.quote_started = True
+            raise _StopParsing()
+
+        if tag in BLOCK_TAGS:
+            self._newline()
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/> and friends never open an element
+        if tag in BLOCK_TAGS:
+            self._newline()
+        elif tag == 'hr' and (dict(attrs).get('id') or '').lower() == 'stopspelling' and not self._proof_depth:
+            self.quote_started = True
+            raise _StopParsing()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if tag in BLOCK_TAGS:
+            self._newline()
+        if self._proof_depth and tag not in VOID_TAGS:
+            self._proof_depth -= 1
+            if not self._proof_depth:
+                self.proof_done = True
+                raise _StopParsing()
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._proof_depth:
+            self.proof_parts.append(data)
+        if not self.quote_started:
+            self.preamble_parts.append(data)
+
+    def _newline(self):
+        if self._proof_depth:
+            self.proof_parts.append('\n')
+        if not self.quote_started:
+            self.preamble_parts.append('\n')
+
+
+def _clean(parts: List[str]) -> str:
+    lines = (' '.join(line.split()) for line in ''.join(parts).splitlines())
+    return '\n'.join(line for line in lines if line).strip()
+
+
+def strip_plain_quotes(text: str) -> str:
+    """Cut plain text at the first quote header or '>' quoted line"""
+    match = PLAIN_QUOTE_START.search(text)
+    if match:
+        text = text[:match.start()]
+    kept = []
+    for line in text.splitlines():
+        if line.lstrip().startswith('>'):
+            break
+        kept.append(line)
+    return '\n'.join(kept).strip()
+
+
+def extract_first_message(html_content: Optional[str]) -> str:
+    """
+    Text of the newest message in an email body: the first Outlook
+    elementToProof block, otherwise everything before the quoted history,
+    for HTML and plain text bodies alike
+    """
+    if not html_content:
+        return ''
+    if not HTML_HINT.search(html_content):
+        return strip_plain_quotes(html_content)
+
+    parser = FirstReplyParser()
+    try:
+        for start in range(0, len(html_content), CHUNK_SIZE):
+            parser.feed(html_content[start:start + CHUNK_SIZE])
+        parser.close()
+    except _StopParsing:
+        pass
+
+    proof = _clean(parser.proof_parts)
+    if proof:
+        return proof
+    return strip_plain_quotes(_clean(parser.preamble_parts))
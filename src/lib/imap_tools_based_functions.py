@@ -1,14 +1,15 @@
-import msal
 import requests
 import time
-from datetime import datetime, timezone
+import threading
+from datetime import datetime, timedelta, timezone
 from rich.console import Console
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Tuple
 from dataclasses import dataclass
 from requests.adapters import HTTPAdapter
 from urllib3.util import Retry
 import traceback
 from src.email_management.src.lib.supabase_client import supabase_client
+from src.email_management.src.lib.token_cache import token_cache
 import os
 import json
 console = Console()
@@ -23,8 +24,62 @@ class EmailConfig:
 class ConnectionError(Exception):
     pass
 
+
+# Only the message fields process_raw_email reads
+MESSAGE_SELECT_FIELDS = ",".join([
+    "id", "subject", "body", "bodyPreview", "sender", "toRecipients",
+    "createdDateTime", "receivedDateTime", "sentDateTime", "lastModifiedDateTime",
+    "internetMessageId", "internetMessageHeaders", "conversationId", "parentFolderId",
+    "hasAttachments", "importance", "isRead", "isDraft", "webLink"
+])
+
+# Inbound replies land in the inbox, our own replies in sent items
+DELTA_SYNC_FOLDERS = ("inbox", "sentitems")
+DELTA_TOKENS_FILE = 'delta_tokens.json'
+# How far back a folder's first delta sync reaches when no start time is given
+INITIAL_SYNC_DAYS = int(os.getenv('INITIAL_SYNC_DAYS', 7))
+_delta_tokens_lock = threading.Lock()
+
+
+def _read_delta_tokens() -> Dict:
+    if os.path.exists(DELTA_TOKENS_FILE):
+        try:
+            with open(DELTA_TOKENS_FILE, 'r') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            console.log("[yellow]Delta token file corrupted, starting full sync[/yellow]")
+    return {}
+
+
+def load_delta_token(mailbox: str, folder: str) -> Optional[str]:
+    """Get the stored delta link for a mailbox folder"""
+    with _delta_tokens_lock:
+        return _read_delta_tokens().get(mailbox, {}).get(folder)
+
+
+def save_delta_tokens(mailbox: str, delta_links: Dict[str, Optional[str]]) -> None:
+    """Store (or clear, with None) the delta links of several folders of a mailbox in one write"""
+    with _delta_tokens_lock:
+        tokens = _read_delta_tokens()
+        folders = tokens.setdefault(mailbox, {})
+        for folder, delta_link in delta_links.items():
+            if delta_link:
+                folders[folder] = delta_link
+            else:
+                folders.pop(folder, None)
+        tmp_path = f"{DELTA_TOKENS_FILE}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(tokens, f)
+        os.replace(tmp_path, DELTA_TOKENS_FILE)
+
+
+def save_delta_token(mailbox: str, folder: str, delta_link: Optional[str]) -> None:
+    """Store (or clear) the delta link for a mailbox folder"""
+    save_delta_tokens(mailbox, {folder: delta_link})
+
 class EmailManager: ###
-    def __init__(self, client_id: str, client_secret: str, tenant_id: str, username: str):
+    def __init__(self, client_id: str, client_secret: str, tenant_id: str, username: str,
+                 timeout: Optional[float] = None):
         self.config = EmailConfig(
             client_id=client_id,
             client_secret=client_secret,
@@ -32,6 +87,7 @@ class EmailManager: ###
             username=username
         )
         self.access_token: Optional[str] = None
+        self.timeout = timeout  # Per-request timeout in seconds, None waits forever
         self._email_cache: Dict[str, bool] = {}
         self.session = self._create_session()
         self.graph_url = "https://graph.microsoft.com"  # Base Graph API URL
@@ -52,29 +108,23 @@ class EmailManager: ###
     def authenticate(self) -> bool:
         """Authenticate with Microsoft Graph API"""
         try:
-            app = msal.ConfidentialClientApplication(
+            access_token = token_cache.get_token(
+                self.config.tenant_id,
                 self.config.client_id,
-                authority=f"https://login.microsoftonline.com/{self.config.tenant_id}",
-                client_credential=self.config.client_secret,
+                self.config.client_secret
             )
 
-            result = app.acquire_token_for_client(
-                scopes=["https://graph.microsoft.com/.default"]
-            )
-
-            if "access_token" in result:
-                self.access_token = result["access_token"]
-                # Update session headers with the token
-                self.session.headers.update({
-                    'Authorization': f'Bearer {self.access_token}',
-                    'Content-Type': 'application/json'
-                })
-                console.log("[green]Authentication successful[/green]")
+            if access_token:
+                if access_token != self.access_token:
+                    self.access_token = access_token
+                    # Update session headers with the token
+                    self.session.headers.update({
+                        'Authorization': f'Bearer {self.access_token}',
+                        'Content-Type': 'application/json'
+                    })
                 return True
             else:
                 console.log("[red]Authentication failed[/red]")
-                console.log(f"Error: {result.get('error')}")
-                console.log(f"Error description: {result.get('error_description')}")
                 return False
 
         except Exception as e:
@@ -85,29 +135,124 @@ class EmailManager: ###
         """Test the connection to Microsoft Graph API"""
         return self.authenticate()
 
-    def fetch_recent_emails(self, since_time: datetime, size: int = 10) -> List[Dict]:
-        """Fetch emails received since the given time"""
+    def _get_paged(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None) -> Iterator[Dict]:
+        """Yield every page of a Graph collection, following @odata.nextLink"""
+        while url:
+            response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+            page = response.json()
+            yield page
+            url = page.get('@odata.nextLink')
+            params = None  # nextLink already carries the query
+
+    def fetch_recent_emails(self, since_time: datetime, size: int = 10,
+                            max_messages: Optional[int] = None, strict: bool = False) -> List[Dict]:
+        """
+        Fetch emails received since the given time, `size` messages per page.
+        With strict=True errors are raised instead of returning what was fetched so far.
+        """
         if not self.authenticate():
             raise ConnectionError("Failed to authenticate with Microsoft Graph API")
         
         endpoint = f"{self.graph_url}/v1.0/users/{self.config.username}/messages"
         
         params = {
-            "$select": "*",
-            "$expand": "attachments",  # Simplified for now
+            "$select": MESSAGE_SELECT_FIELDS,
             "$top": size,
             "$orderby": "receivedDateTime desc",
             "$filter": f"receivedDateTime ge {since_time.isoformat()}"
         }
         
+        emails = []
         try:
-            response = self.session.get(endpoint, params=params)
-            response.raise_for_status()
-            return response.json().get('value', [])
+            for page in self._get_paged(endpoint, params=params):
+                emails.extend(page.get('value', []))
+                if max_messages and len(emails) >= max_messages:
+                    return emails[:max_messages]
+            return emails
             
         except Exception as e:
             console.log(f"[red]Error fetching emails: {str(e)}[/red]")
-            return []
+            if strict:
+                raise
+            return emails
+
+    def sync_emails(self, since: Optional[datetime] = None, folders: Tuple[str, ...] = DELTA_SYNC_FOLDERS,
+                    page_size: int = 50, strict: bool = False) -> Tuple[List[Dict], Dict[str, str]]:
+        """
+        Incrementally sync mailbox folders with Graph delta queries.
+        The first run returns the messages received since `since` (default
+        INITIAL_SYNC_DAYS ago), later runs only the messages added or changed
+        since the stored delta token.
+
+        Returns (emails, new delta links by folder). The links are not stored
+        here: pass them to save_delta_tokens once the emails have been stored,
+        otherwise a crash in between would skip them for good.
+        """
+        if not self.authenticate():
+            raise ConnectionError("Failed to authenticate with Microsoft Graph API")
+
+        since = since or datetime.now(timezone.utc) - timedelta(days=INITIAL_SYNC_DAYS)
+        emails, delta_links = [], {}
+        for folder in folders:
+            folder_emails, delta_link = self._sync_folder(folder, page_size, since, strict)
+            emails.extend(folder_emails)
+            if delta_link:
+                delta_links[folder] = delta_link
+        return emails, delta_links
+
+    def _sync_folder(self, folder: str, page_size: int, since: datetime,
+                     strict: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        delta_link = load_delta_token(self.config.username, folder)
+        if delta_link:
+            url, params = delta_link, None
+        else:
+            url = f"{self.graph_url}/v1.0/users/{self.config.username}/mailFolders/{folder}/messages/delta"
+            # Without a token delta starts from the whole folder, bound it by time
+            params = {
+                "$select": MESSAGE_SELECT_FIELDS,
+                "$filter": f"receivedDateTime ge {since.isoformat()}"
+            }
+        headers = {"Prefer": f"odata.maxpagesize={page_size}"}
+
+        emails = []
+        try:
+            for page in self._get_paged(url, params=params, headers=headers):
+                # Deleted/moved messages come back as @removed stubs
+                emails.extend(m for m in page.get('value', []) if '@removed' not in m)
+                if '@odata.deltaLink' in page:
+                    return emails, page['@odata.deltaLink']
+            return emails, None
+
+        except requests.HTTPError as e:
+            if delta_link and e.response is not None and e.response.status_code == 410:
+                # Sync state expired on the server, start over from `since`
+                console.log(f"[yellow]Delta token expired for {self.config.username}/{folder}, resyncing[/yellow]")
+                save_delta_token(self.config.username, folder, None)
+                return self._sync_folder(folder, page_size, since, strict)
+            console.log(f"[red]Error syncing {folder}: {str(e)}[/red]")
+            if strict:
+                raise
+            return emails, None
+        except Exception as e:
+            console.log(f"[red]Error syncing {folder}: {str(e)}[/red]")
+            if strict:
+                raise
+            return emails, None
+
+    def fetch_attachments(self, message_id: str) -> List[Dict]:
+        """Fetch attachments of a single message, only called when they are needed"""
+        if not self.authenticate():
+            raise ConnectionError("Failed to authenticate with Microsoft Graph API")
+
+        endpoint = f"{self.graph_url}/v1.0/users/{self.config.username}/messages/{message_id}/attachments"
+        attachments = []
+        try:
+            for page in self._get_paged(endpoint):
+                attachments.extend(page.get('value', []))
+        except Exception as e:
+            console.log(f"[red]Error fetching attachments: {str(e)}[/red]")
+        return attachments
 
     def _extract_email_headers(self, message: Dict) -> Dict:
         """Extract relevant headers from the email message"""
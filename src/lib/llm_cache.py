@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_DB = os.getenv('LLM_CACHE_DB', 'llm_cache.db')
+LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', 30 * 24 * 3600))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 50000))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    latency REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used);
+"""
+
+
+def normalize_body(body: Optional[str]) -> str:
+    """Case and whitespace differences don't change the classification"""
+    return ' '.join((body or '').split()).lower()
+
+
+def prompt_version(prompt: str) -> str:
+    """Short hash identifying a system prompt, changes whenever the prompt does"""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+
+
+def make_key(model: str, prompt: str, body: Optional[str]) -> str:
+    payload = '\x1f'.join((model, prompt_version(prompt), normalize_body(body)))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent, content-addressed cache of LLM results in SQLite.
+
+    Entries expire after `ttl` seconds. Once more than `max_entries` are
+    stored the least recently used ones are evicted. Every entry remembers
+    how long the original call took, so hits add up to the latency saved.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_DB, ttl: float = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, evict_every: int = 100):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Opened lazily so importing the module doesn't create the database
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, latency, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[2] > self.ttl:
+                self.misses += 1
+                return None
+            with self.conn as conn:
+                conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            self.latency_saved += row[1]
+            return json.loads(row[0])
+
+    def put(self, key: str, value: Any, latency: float = 0.0) -> None:
+        now = time.time()
+        with self._lock, self.conn as conn:
+            conn.execute(
+                "INSERT INTO llm_cache (key, value, latency, created_at, last_used) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, latency = excluded.latency, "
+                "created_at = excluded.created_at, last_used = excluded.last_used",
+                (key, json.dumps(value, default=str), latency, now, now)
+            )
+            self._puts += 1
+            if self._puts % self.evict_every == 0:
+                self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        count = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def evict(self) -> None:
+        """Drop expired entries and trim to max_entries"""
+        with self._lock, self.conn as conn:
+            self._evict(conn, time.time())
+
+    def clear(self) -> None:
+        with self._lock, self.conn as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None,
+                "latency_saved_seconds": round(self.latency_saved, 3),
+            }
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# Share of sampled debug messages that are actually emitted
+DEBUG_SAMPLE_RATE = float(os.getenv('DEBUG_SAMPLE_RATE', 1.0))
+# Number of raw payloads kept for debugging, 0 turns capturing off
+RAW_PAYLOAD_CAPTURE = int(os.getenv('RAW_PAYLOAD_CAPTURE', 0))
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for `name`, handlers are left to the entrypoint (configure_logging)"""
+    return logging.getLogger(name)
+
+
+def configure_logging(level: str = LOG_LEVEL) -> None:
+    """
+    Send log records to stderr at `level`, for entrypoints that run as a
+    process of their own. Does nothing if the host application already
+    configured logging.
+    """
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=level, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+
+class Lazy:
+    """Defers building a log argument until the record is actually formatted"""
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func: Callable[..., Any], *args: Any):
+        self.func = func
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.func(*self.args))
+
+
+def log_sampled(logger: logging.Logger, level: int, msg: str, *args: Any,
+                rate: Optional[float] = None) -> None:
+    """Log only a `rate` share of the calls, cheap when the level is disabled"""
+    if not logger.isEnabledFor(level):
+        return
+    rate = DEBUG_SAMPLE_RATE if rate is None else rate
+    if rate >= 1 or random.random() < rate:
+        logger.log(level, msg, *args)
+
+
+class PayloadCapture:
+    """
+    Bounded ring buffer of recent raw payloads for debugging. Capturing only
+    keeps a reference, payloads are serialized when dump() is called.
+    """
+
+    def __init__(self, size: int = RAW_PAYLOAD_CAPTURE):
+        self.size = size
+        self._items: Deque[Tuple[float, str, Any]] = deque(maxlen=max(size, 1))
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def capture(self, label: str, payload: Any) -> None:
+        if not self.size:
+            return
+        with self._lock:
+            self._items.append((time.time(), label, payload))
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            items = list(self._items)
+        return [{'captured_at': at, 'label': label, 'payload': payload} for at, label, payload in items]
+
+    def dump(self, path: str) -> int:
+        """Write the captured payloads as JSON Lines, returns how many"""
+        items = self.snapshot()
+        with open(path, 'w') as f:
+            for item in items:
+                f.write(json.dumps(item, default=str) + '\n')
+        return len(items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+payload_capture = PayloadCapture()
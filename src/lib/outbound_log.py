@@ -0,0 +1,168 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, date
+from typing import Dict, Iterator, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+LOG_DIR = 'email_logs'
+LOG_PREFIX = 'initial_sendinglog_'
+
+
+class OutboundLogWriter:
+    """
+    Append-only JSON Lines send log, one file per day.
+
+    Entries are buffered and written every `buffer_size` entries, files are
+    fsynced at most every `fsync_interval` seconds. When the day changes the
+    finished file is closed and, with `archive=True`, gzipped.
+    """
+
+    def __init__(self, log_dir: str = LOG_DIR, prefix: str = LOG_PREFIX, buffer_size: int = 20,
+                 fsync_interval: float = 5.0, archive: bool = False):
+        self.log_dir = log_dir
+        self.prefix = prefix
+        self.buffer_size = buffer_size
+        self.fsync_interval = fsync_interval
+        self.archive = archive
+        self._buffer: List[str] = []
+        self._file: Optional[TextIO] = None
+        self._day: Optional[str] = None
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def path_for(self, day: str) -> str:
+        return os.path.join(self.log_dir, f"{self.prefix}{day}.jsonl")
+
+    def write(self, entry: Dict) -> None:
+        line = json.dumps(entry, default=str, ensure_ascii=False)
+        with self._lock:
+            day = datetime.now().strftime("%Y%m%d")
+            if day != self._day:
+                self._rotate(day)
+            self._buffer.append(line)
+            if len(self._buffer) >= self.buffer_size:
+                self._write_buffer()
+            if time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def flush(self) -> None:
+        """Write buffered entries and fsync the current file"""
+        with self._lock:
+            self._sync()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_file()
+
+    def _write_buffer(self) -> None:
+        if not self._buffer:
+            return
+        if self._file is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            self._file = open(self.path_for(self._day), 'a', encoding='utf-8')
+        self._file.write('\n'.join(self._buffer) + '\n')
+        self._buffer = []
+
+    def _sync(self) -> None:
+        self._write_buffer()
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+
+    def _close_file(self) -> None:
+        self._sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self, day: str) -> None:
+        finished = self._day
+        self._close_file()
+        self._day = day
+        if finished and self.archive:
+            try:
+                archive_day(self.path_for(finished))
+            except Exception as e:
+                logger.error(f"Error archiving send log {finished}: {str(e)}")
+
+
+def archive_day(path: str) -> Optional[str]:
+    """Gzip a finished day's log next to it and remove the plain file"""
+    if not os.path.exists(path):
+        return None
+    archive_path = f"{path}.gz"
+    with open(path, 'rb') as src, gzip.open(archive_path, 'wb') as dst:
+        while True:
+            chunk = src.read(1 << 20)
+            if not chunk:
+                break
+            dst.write(chunk)
+    os.remove(path)
+    return archive_path
+
+
+def _day_from_name(name: str, prefix: str) -> Optional[str]:
+    if not name.startswith(prefix):
+        return None
+    day = name[len(prefix):].split('.', 1)[0]
+    return day if len(day) == 8 and day.isdigit() else None
+
+
+def _json_forms(value: str) -> tuple:
+    """How a string value appears in a log line, with and without ASCII escaping"""
+    return tuple({json.dumps(value, ensure_ascii=False), json.dumps(value)})
+
+
+def read_outbound_log(log_dir: str = LOG_DIR, prefix: str = LOG_PREFIX,
+                      campaign_id: Optional[str] = None, sender: Optional[str] = None,
+                      start: Optional[date] = None, end: Optional[date] = None) -> Iterator[Dict]:
+    """
+    Stream send log entries day by day, plain and gzipped files alike,
+    optionally filtered by campaign, sender and an inclusive date range
+    """
+    if not os.path.isdir(log_dir):
+        return
+    # Compared against the raw lines, so as JSON encodes them (quotes,
+    # backslashes and non-ASCII characters may be escaped)
+    campaign_forms = _json_forms(campaign_id) if campaign_id else ()
+    sender_forms = _json_forms(sender) if sender else ()
+    files = []
+    for name in os.listdir(log_dir):
+        day = _day_from_name(name, prefix)
+        if day and (name.endswith('.jsonl') or name.endswith('.jsonl.gz')):
+            files.append((day, name))
+
+    for day, name in sorted(files):
+        if start and day < start.strftime("%Y%m%d"):
+            continue
+        if end and day > end.strftime("%Y%m%d"):
+            continue
+        path = os.path.join(log_dir, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                # Cheap substring pre-check before parsing the line
+                if campaign_forms and not any(form in line for form in campaign_forms):
+                    continue
+                if sender_forms and not any(form in line for form in sender_forms):
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a partial last line
+                    continue
+                email_data = entry.get("email_data", {})
+                if campaign_id and email_data.get("campaign_id") != campaign_id:
+                    continue
+                if sender and email_data.get("sender") != sender:
+                    continue
+                yield entry
+
+
+outbound_log = OutboundLogWriter(archive=os.getenv('OUTBOUND_LOG_ARCHIVE', 'false').lower() == 'true')
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .log_utils import get_logger
+from .smtp_based_funcions import EmailSender
+
+logger = get_logger(__name__)
+
+# How many MS365_EMAIL_<n> slots each caller sees, (count variable, default),
+# kept as they were before the callers shared one registry
+SENDER_SLOTS = ('WORKER_EMAILS_COUNT', 5)   # campaign sending
+MAILBOX_SLOTS = ('WORKER_EMAILS_COUNT', 0)  # inbox polling
+REPLY_SLOTS = ('EMAILS_COUNT', 0)           # sendreply
+
+
+@dataclass(frozen=True)
+class SenderConfig:
+    slot: int
+    email: str
+    app_password: Optional[str]
+    daily_limit: int
+    region: str
+    client_id: Optional[str]
+    client_secret: Optional[str]
+    tenant_id: Optional[str]
+
+
+def slot_count(slots: Tuple[str, int], env: Mapping[str, str] = os.environ) -> int:
+    name, default = slots
+    return int(env.get(name) or default)
+
+
+def read_sender_configs(env: Mapping[str, str] = os.environ) -> Dict[str, SenderConfig]:
+    """Sender accounts from the MS365_EMAIL_<n> slots any caller sees, indexed by lowercased address"""
+    count = max(slot_count(slots, env) for slots in (SENDER_SLOTS, MAILBOX_SLOTS, REPLY_SLOTS))
+    configs = {}
+    for i in range(1, count + 1):
+        email = env.get(f'MS365_EMAIL_{i}')
+        if not email:
+            continue
+        configs[email.lower()] = SenderConfig(
+            slot=i,
+            email=email,
+            app_password=env.get(f'MS365_APP_PASSWORD_{i}'),
+            daily_limit=int(env.get(f'DAILY_LIMIT_{i}', 30)),
+            region=env.get(f'REGION_{i}', 'global'),
+            client_id=env.get(f'CLIENT_ID_{i}'),
+            client_secret=env.get(f'CLIENT_SECRET_{i}'),
+            tenant_id=env.get(f'TENANT_ID_{i}')
+        )
+    return configs
+
+
+def _build_sender(config: SenderConfig) -> EmailSender:
+    return EmailSender(
+        email=config.email,
+        app_password=config.app_password,
+        daily_limit=config.daily_limit,
+        region=config.region,
+        client_id=config.client_id,
+        client_secret=config.client_secret,
+        tenant_id=config.tenant_id
+    )
+
+
+class SenderRegistry:
+    """
+    Process-wide sending accounts, loaded once from .env and the environment.
+
+    The .env file is checked at most every `check_interval` seconds and only
+    re-read when its mtime changed. EmailSender objects are kept across
+    reloads unless their account configuration changed, so their Graph
+    clients and counters survive.
+    """
+
+    def __init__(self, env_path: Optional[str] = None, check_interval: float = 5.0,
+                 sender_factory: Callable[[SenderConfig], EmailSender] = _build_sender):
+        self.env_path = env_path or os.path.join(os.getcwd(), '.env')
+        self.check_interval = check_interval
+        self.sender_factory = sender_factory
+        self._configs: Dict[str, SenderConfig] = {}
+        self._senders: Dict[str, EmailSender] = {}
+        self._mtime: Optional[float] = None
+        self._loaded = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _env_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.env_path).st_mtime
+        except OSError:
+            return None
+
+    def _refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and self._loaded and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            mtime = self._env_mtime()
+            if not force and self._loaded and mtime == self._mtime:
+                return
+            if mtime is not None:
+                load_dotenv(dotenv_path=self.env_path, override=True)
+            elif not self._loaded:
+                logger.warning(f"No .env file at {self.env_path}, using the process environment")
+            self._load(read_sender_configs(os.environ))
+            self._mtime = mtime
+            self._loaded = True
+
+    def _load(self, configs: Dict[str, SenderConfig]) -> None:
+        senders = {}
+        for key, config in configs.items():
+            existing = self._senders.get(key)
+            if existing is not None and self._configs.get(key) == config:
+                senders[key] = existing
+                continue
+            try:
+                senders[key] = self.sender_factory(config)
+            except Exception as e:
+                logger.error(f"Failed to initialize {config.email}: {str(e)}")
+        removed = set(self._senders) - set(senders)
+        if self._loaded:
+            logger.info(f"Reloaded sender accounts: {len(senders)} active, {len(removed)} removed")
+        self._configs = {key: configs[key] for key in senders}
+        self._senders = senders
+
+    def reload(self) -> None:
+        """Re-read the configuration now, regardless of the file's mtime"""
+        self._refresh(force=True)
+
+    def _configs_within(self, slots: Tuple[str, int]) -> Dict[str, SenderConfig]:
+        count = slot_count(slots)
+        return {key: config for key, config in self._configs.items() if config.slot <= count}
+
+    def get(self, email: str) -> Optional[EmailSender]:
+        """Sender for a reply, among the first EMAILS_COUNT slots"""
+        self._refresh()
+        key = (email or '').lower()
+        if key not in self._configs_within(REPLY_SLOTS):
+            return None
+        return self._senders.get(key)
+
+    def senders(self) -> Dict[str, EmailSender]:
+        """Campaign senders keyed by their configured address"""
+        self._refresh()
+        return {self._senders[key].email: self._senders[key] for key in self._configs_within(SENDER_SLOTS)}
+
+    def accounts(self) -> List[Dict]:
+        """Mailbox credentials of every account, as the receiver polls them"""
+        self._refresh()
+        return [
+            {
+                'email': config.email,
+                'client_id': config.client_id,
+                'client_secret': config.client_secret,
+                'tenant_id': config.tenant_id,
+            }
+            for config in self._configs_within(MAILBOX_SLOTS).values()
+        ]
+
+
+sender_registry = SenderRegistry()
@@ -0,0 +1,171 @@
+import threading
+import time
+import logging
+import traceback
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from .supabase_client import supabase_client
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingSend:
+    message_id: str
+    account: str
+    graph_client: object
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # Filled in once Graph has returned the sent item
+    graph_headers: Optional[Dict] = None
+
+
+class SentItemCorrelator:
+    """Background resolver that links sent emails to their Graph sent items.
+
+    ``EmailSender.send_email`` stamps every message with its own Message-ID and
+    enqueues it here instead of sleeping and polling SentItems. Every
+    ``interval`` seconds the worker thread looks up all outstanding Message-IDs
+    of an account with one ``internetMessageId`` filter query and writes
+    ``conversational_id``/``email_id`` onto the matching ``received_email`` row.
+    """
+
+    def __init__(self, interval: float = 5, batch_size: int = 20, max_age: float = 900,
+                 on_resolved: Optional[Callable[[str, Dict], bool]] = None):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.on_resolved = on_resolved or update_outbound_row
+        self._pending: Dict[str, PendingSend] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enqueue(self, graph_client, account: str, message_id: str) -> None:
+        """Queue a sent message for correlation and make sure the worker runs"""
+        with self._lock:
+            self._pending[message_id] = PendingSend(message_id, account, graph_client)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="sent-item-correlator", daemon=True
+                )
+                self._thread.start()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, timeout: float = 60) -> bool:
+        """Block until every queued message is resolved or dropped"""
+        deadline = time.monotonic() + timeout
+        while self.pending_count() and time.monotonic() < deadline:
+            self._wakeup.set()
+            time.sleep(0.1)
+        return self.pending_count() == 0
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.resolve_pending()
+            except Exception as e:
+                logger.error(f"Sent item correlation failed: {str(e)}")
+                logger.error(f"Full error: {traceback.format_exc()}")
+
+    def resolve_pending(self) -> int:
+        """Run one correlation pass, returns the number of rows resolved"""
+        with self._lock:
+            pending = list(self._pending.values())
+
+        by_account: Dict[str, List[PendingSend]] = {}
+        for item in pending:
+            if item.graph_headers is None:
+                by_account.setdefault(item.account, []).append(item)
+
+        for account, items in by_account.items():
+            for i in range(0, len(items), self.batch_size):
+                batch = items[i:i + self.batch_size]
+                try:
+                    found = batch[0].graph_client.get_sent_emails_by_message_ids(
+                        account, [item.message_id for item in batch]
+                    )
+                except Exception:
+                    # Left pending, looked up again next pass
+                    logger.exception(f"Looking up {len(batch)} sent emails of {account} failed")
+                    continue
+                for item in batch:
+                    if item.message_id in found:
+                        item.graph_headers = extract_graph_headers(found[item.message_id])
+
+        resolved = 0
+        now = time.monotonic()
+        for item in pending:
+            done = False
+            # The row may not be stored yet; keep the Graph data and retry next pass
+            if item.graph_headers is not None:
+                try:
+                    done = self.on_resolved(item.message_id, item.graph_headers)
+                except Exception:
+                    logger.exception(f"Storing the sent item of {item.message_id} failed, retrying next pass")
+            if done:
+                resolved += 1
+            elif now - item.enqueued_at > self.max_age:
+                logger.warning(f"Giving up on correlating sent email {item.message_id}")
+                done = True
+            if done:
+                with self._lock:
+                    self._pending.pop(item.message_id, None)
+
+        if resolved:
+            logger.info(f"Correlated {resolved} sent emails with Graph")
+        return resolved
+
+
+def extract_graph_headers(email_details: Dict) -> Dict:
+    """Map a Graph sent item onto the fields we store for outbound emails"""
+    graph_headers = {
+        'message_id': email_details.get('internetMessageId'),
+        'conversation_id': email_details.get('conversationId'),
+        'conversationIndex': email_details.get('conversationIndex'),
+        'parent_folder_id': email_details.get('parentFolderId'),
+        'email_id': email_details.get('id'),
+        'network_message_id': None,
+        'tenant_id': None,
+        'scl': None
+    }
+
+    # Extract additional headers from internetMessageHeaders
+    for header in email_details.get('internetMessageHeaders', []):
+        header_name = header.get('name', '').lower()
+        header_value = header.get('value')
+
+        if header_name == 'x-ms-exchange-organization-network-message-id':
+            graph_headers['network_message_id'] = header_value
+        elif header_name == 'x-ms-exchange-organization-scl':
+            graph_headers['scl'] = header_value
+        elif header_name == 'x-ms-exchange-crosstenant-id':
+            graph_headers['tenant_id'] = header_value
+
+    return graph_headers
+
+
+def update_outbound_row(message_id: str, graph_headers: Dict) -> bool:
+    """Write Graph identifiers onto the stored outbound email, False if no row matched yet"""
+    update_data = {
+        'conversational_id': graph_headers.get('conversation_id'),
+        'email_id': graph_headers.get('email_id'),
+        'parent_folder_id': graph_headers.get('parent_folder_id'),
+        'network_message_id': graph_headers.get('network_message_id'),
+        'tenant_id': graph_headers.get('tenant_id'),
+        'scl': graph_headers.get('scl'),
+    }
+    update_data = {k: v for k, v in update_data.items() if v is not None}
+
+    result = supabase_client.client.from_('received_email') \
+        .update(update_data) \
+        .eq('message_id', message_id) \
+        .execute()
+    return bool(result.data)
+
+
+sent_item_correlator = SentItemCorrelator()
@@ -13,13 +13,16 @@ import uuid
 import base64
 import time
 import requests
-from msal import ConfidentialClientApplication
 import requests
 from datetime import datetime, timedelta
 import os
 import logging
 import time
 import traceback
+from typing import Dict, List
+from .smtp_pool import smtp_pool
+from .token_cache import token_cache
+from .sent_item_correlator import sent_item_correlator
 
 
 logger = logging.getLogger(__name__)
@@ -31,81 +34,51 @@ class GraphAPIClient:
         self.client_id = client_id
         self.client_secret = client_secret
         self.tenant_id = tenant_id
-        self.app = ConfidentialClientApplication(
-            client_id=self.client_id,
-            client_credential=self.client_secret,
-            authority=f"https://login.microsoftonline.com/{self.tenant_id}"
-        )
     
     def get_access_token(self):
         """Get Microsoft Graph API access token"""
-        try:
-            result = self.app.acquire_token_for_client(
-                scopes=["https://graph.microsoft.com/.default"]
-            )
-            if "access_token" in result:
-                return result["access_token"]
-            else:
-                logger.error(f"Failed to get token: {result.get('error_description')}")
-                return None
-        except Exception as e:
-            logger.error(f"Error getting access token: {str(e)}")
-            return None
+        return token_cache.get_token(self.tenant_id, self.client_id, self.client_secret)
 
-    def get_sent_email(self, user_email: str, subject: str, sent_time: datetime):
-        """Fetch details of a recently sent email using Microsoft Graph API"""
+    def get_sent_emails_by_message_ids(self, user_email: str, message_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch sent items for many Message-IDs with a single Graph query"""
+        if not message_ids:
+            return {}
         try:
             access_token = self.get_access_token()
             if not access_token:
                 logger.error("Failed to get access token")
-                return None
+                return {}
 
             headers = {
                 "Authorization": f"Bearer {access_token}",
                 "Content-Type": "application/json"
             }
-            
-            # Simplify the time filter - look at messages from last 5 minutes
-            time_window = (sent_time - timedelta(minutes=5)).isoformat()
-            
-            # Query for sent messages
+            id_filter = " or ".join(
+                "internetMessageId eq '{}'".format(message_id.replace("'", "''"))
+                for message_id in message_ids
+            )
             url = f"https://graph.microsoft.com/v1.0/users/{user_email}/mailFolders/SentItems/messages"
             params = {
-                "$filter": f"sentDateTime gt {time_window}",
-                "$orderby": "sentDateTime desc",
-                "$top": 10,
-                "$select": "id,conversationId,internetMessageId,subject,conversationIndex,sender,toRecipients,internetMessageHeaders"
+                "$filter": id_filter,
+                "$top": len(message_ids),
+                "$select": "id,conversationId,internetMessageId,conversationIndex,parentFolderId,internetMessageHeaders"
             }
-            
+
             response = requests.get(url, headers=headers, params=params)
-            logger.info(f"Graph API Response: {response.status_code}")
-            
-            if response.status_code == 200:
-                emails = response.json().get('value', [])
-                # Find the matching email by subject
-                for email in emails:
-                    if email.get('subject') == subject:
-                        # Get full message details including headers
-                        message_id = email.get('id')
-                        detail_url = f"https://graph.microsoft.com/v1.0/users/{user_email}/messages/{message_id}"
-                        detail_response = requests.get(detail_url, headers=headers)
-                        
-                        if detail_response.status_code == 200:
-                            logger.info("Successfully retrieved email details from Graph API")
-                            return detail_response.json()
-                        else:
-                            logger.error(f"Failed to get message details: {detail_response.status_code}")
-                
-                logger.error(f"No matching email found for subject: {subject}")
-            else:
-                logger.error(f"Failed to fetch emails: {response.status_code} {response.text}")
-            
-            return None
+            if response.status_code != 200:
+                logger.error(f"Failed to fetch sent emails: {response.status_code} {response.text}")
+                return {}
+
+            return {
+                email['internetMessageId']: email
+                for email in response.json().get('value', [])
+                if email.get('internetMessageId')
+            }
 
         except Exception as e:
-            logger.error(f"Error fetching sent email details: {str(e)}")
+            logger.error(f"Error fetching sent emails by message id: {str(e)}")
             logger.error(f"Full error: {traceback.format_exc()}")
-            return None
+            return {}
 
 
 
@@ -153,11 +126,14 @@ class EmailSender:
             msg['To'] = recipient if isinstance(recipient, str) else recipient[0]
             msg['Subject'] = subject
             msg['Date'] = email.utils.formatdate(localtime=True)
+            # Our own Message-ID lets the sent item be found in Graph without polling
+            message_id = (headers or {}).get('Message-ID') or email.utils.make_msgid(domain=self.domain)
+            msg['Message-ID'] = message_id
             
             # Add custom headers if provided
             if headers:
                 for key, value in headers.items():
-                    if value:  # Only add if value exists
+                    if value and key != 'Message-ID':  # Only add if value exists
                         msg[key] = value
             
             # Add body
@@ -170,11 +146,8 @@ class EmailSender:
             
             sent_headers = {}
             
-            # Send email and capture response
-            with smtplib.SMTP('smtp.office365.com', 587) as server:
-                server.starttls()
-                server.login(self.email, self.app_password)
-                
+            # Send email over a pooled, already authenticated session
+            with smtp_pool.connection(self.email, self.app_password) as server:
                 # Send and get response
                 to_addrs = recipient if isinstance(recipient, list) else [recipient]
                 response = server.send_message(msg)
@@ -204,69 +177,12 @@ class EmailSender:
                 self.last_sent_time = datetime.now(pytz.UTC)
                 self.emails_sent_today += 1
                 
-                # If Graph API client exists, try to get additional details
+                # Graph assigns conversation_id/email_id once the message lands in
+                # SentItems; the correlator fills them in on the stored row later
+                sent_headers['message_id'] = message_id
                 if self.graph_client:
-                    time.sleep(3)
-                    email_details = self.graph_client.get_sent_email(
-                        user_email=self.email,
-                        subject=subject,
-                        sent_time=self.last_sent_time
-                    )
-                    print(f"email_details complete: {email_details}")
-                    if email_details:
-                        # Update headers with Graph API data
-                        graph_headers = {
-                            'message_id': email_details.get('internetMessageId'),
-                            'conversation_id': email_details.get('conversationId'),
-                            'conversationIndex': email_details.get('conversationIndex'),
-                            'parent_folder_id': email_details.get('parentFolderId'),
-                            'email_id': email_details.get('id'),
-                            'network_message_id': None,
-                            'tenant_id': None,
-                            'scl': None
-                        }
-                        
-                        # Extract additional headers from internetMessageHeaders
-                        headers_array = email_details.get('internetMessageHeaders', [])
-                        for header in headers_array:
-                            header_name = header.get('name', '').lower()
-                            header_value = header.get('value')
-                            
-                            if header_name == 'x-ms-exchange-organization-network-message-id':
-                                graph_headers['network_message_id'] = header_value
-                            elif header_name == 'x-ms-exchange-organization-scl':
-                                graph_headers['scl'] = header_value
-                            elif header_name == 'x-ms-exchange-crosstenant-id':
-                                graph_headers['tenant_id'] = header_value
-                        
-                        # Update sent_headers with Graph API data
-                        sent_headers.update(graph_headers)
-                        
-                        # # Prepare outbound email data for database
-                        # outbound_data = {
-                        #     'email_id': graph_headers['email_id'],
-                        #     'message_id': graph_headers['message_id'],
-                        #     'conversation_id': graph_headers['conversation_id'],
-                        #     'thread_index': graph_headers['conversationIndex'],
-                        #     'thread_topic': sent_headers['Thread-Topic'],
-                        #     'network_message_id': graph_headers['network_message_id'],
-                        #     'tenant_id': graph_headers['tenant_id'],
-                        #     'scl': graph_headers['scl'],
-                        #     'sender': self.email,
-                        #     'recipient': recipient,
-                        #     'subject': subject,
-                        #     'body': cleaned_body,
-                        #     'time_zone': time_zone,
-                        #     'direction': 'outbound',
-                        #     'email_type': headers.get('email_type', 'initial') if headers else 'initial',
-                        #     'created_at': self.last_sent_time.isoformat(),
-                        #     'in_reply_to': sent_headers.get('In-Reply-To'),
-                        #     'references': sent_headers.get('References'),
-                        # }
-                        
-                        # Post to database using the new function
+                    sent_item_correlator.enqueue(self.graph_client, self.email, message_id)
 
-                
                 return True, sent_headers
 
         except Exception as e:
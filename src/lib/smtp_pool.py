@@ -0,0 +1,142 @@
+import smtplib
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = 'smtp.office365.com'
+SMTP_PORT = 587
+
+
+class _PooledConnection:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class SMTPConnectionPool:
+    """Per-account pool of authenticated SMTP sessions.
+
+    Sessions are kept alive between sends, checked with NOOP before they are
+    handed out, replaced when the server has dropped them and closed once they
+    exceed ``max_lifetime`` seconds.
+    """
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT,
+                 max_per_account: int = 2, max_lifetime: float = 600,
+                 max_idle: float = 120, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.max_per_account = max_per_account
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle: Dict[str, List[_PooledConnection]] = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, username: str, password: str) -> _PooledConnection:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.starttls()
+            server.login(username, password)
+        except Exception:
+            self._close(server)
+            raise
+        logger.info(f"Opened SMTP session for {username}")
+        return _PooledConnection(server)
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _is_usable(self, conn: _PooledConnection) -> bool:
+        now = time.monotonic()
+        if now - conn.created_at > self.max_lifetime or now - conn.last_used > self.max_idle:
+            return False
+        # Sessions that were used a moment ago are still alive, skip the NOOP
+        if now - conn.last_used < 1:
+            return True
+        try:
+            return conn.server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self, username: str, password: str) -> _PooledConnection:
+        while True:
+            with self._lock:
+                idle = self._idle.get(username)
+                conn = idle.pop() if idle else None
+            if conn is None:
+                return self._connect(username, password)
+            if self._is_usable(conn):
+                return conn
+            self._close(conn.server)
+
+    def _checkin(self, username: str, conn: _PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        with self._lock:
+            idle = self._idle.setdefault(username, [])
+            if len(idle) < self.max_per_account:
+                idle.append(conn)
+                return
+        self._close(conn.server)
+
+    @contextmanager
+    def connection(self, username: str, password: str):
+        """Borrow an authenticated SMTP session for ``username``.
+
+        The session goes back to the pool when the block exits cleanly. If the
+        block raises, the session is discarded since its state is unknown.
+        """
+        conn = self._checkout(username, password)
+        try:
+            yield conn.server
+        except Exception:
+            self._close(conn.server)
+            raise
+        else:
+            self._checkin(username, conn)
+
+    def prune(self) -> int:
+        """Close idle sessions that are past their lifetime or idle timeout"""
+        now = time.monotonic()
+        expired: List[smtplib.SMTP] = []
+        with self._lock:
+            for username, idle in self._idle.items():
+                keep = []
+                for conn in idle:
+                    if (now - conn.created_at > self.max_lifetime
+                            or now - conn.last_used > self.max_idle):
+                        expired.append(conn.server)
+                    else:
+                        keep.append(conn)
+                self._idle[username] = keep
+        for server in expired:
+            self._close(server)
+        return len(expired)
+
+    def close_all(self) -> None:
+        """Close every pooled session"""
+        with self._lock:
+            servers = [conn.server for idle in self._idle.values() for conn in idle]
+            self._idle.clear()
+        for server in servers:
+            self._close(server)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {username: len(idle) for username, idle in self._idle.items()}
+
+
+# Shared pool used by every EmailSender in the process
+smtp_pool = SMTPConnectionPool()
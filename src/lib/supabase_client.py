@@ -3,13 +3,21 @@ from supabase import create_client, Client
 from pydantic import BaseModel, Field
 from typing import Dict, List, Any, Optional
 import json
-from datetime import datetime
-from typing import Optional, List, Dict
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Tuple
+import time
+import threading
 import traceback
 import uuid 
 import base64
 from pydantic import BaseModel, Field
 import pytz
+from .log_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Days after an initial email without a reply until its follow-up is due
+FOLLOWUP_DELAY_DAYS = int(os.getenv('FOLLOWUP_DELAY_DAYS', 5))
 
 # Models remain the same
 class sentEmail(BaseModel):
@@ -135,9 +143,152 @@ class SupabaseClient:
 supabase_client = SupabaseClient()
 
 
+def followup_due_at(created_at: Any = None, delay_days: Optional[float] = FOLLOWUP_DELAY_DAYS) -> Optional[str]:
+    """
+    ISO due time of the first follow-up for an initial email created at
+    `created_at`, None when its campaign sends no follow-ups
+    """
+    if delay_days is None:
+        return None
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        except ValueError:
+            created_at = None
+    if not isinstance(created_at, datetime):
+        created_at = datetime.now(pytz.UTC)
+    elif created_at.tzinfo is None:
+        created_at = pytz.UTC.localize(created_at)
+    return (created_at + timedelta(days=delay_days)).isoformat()
+
+
+def normalize_email_record(email_data: Dict[str, Any], email_type: str) -> Dict[str, Any]:
+    """Map email data onto received_email columns for the given email type"""
+    # Convert datetime objects to ISO format strings
+    if isinstance(email_data.get('created_at'), datetime):
+        email_data['created_at'] = email_data['created_at'].isoformat()
+    if isinstance(email_data.get('last_reply_at'), datetime):
+        email_data['last_reply_at'] = email_data['last_reply_at'].isoformat()
+    if isinstance(email_data.get('first_response_time'), datetime):
+        email_data['first_response_time'] = email_data['first_response_time'].isoformat()
+
+    logger.debug("Normalizing %s email %s", email_type, email_data.get('email_id'))
+    if email_type == 'outbound':
+        # Initial outbound email
+        cleaned_data = {
+            'email_id': email_data.get('email_id'),
+            'sender': email_data.get('sender'),
+            'recipient': email_data.get('recipient'),
+            'subject': email_data.get('subject'),
+            'body': email_data.get('body', ''),
+            'conversational_id': email_data.get('conversation_id'),
+            'message_id': email_data.get('message_id'),
+            'thread_topic': email_data.get('thread_topic'),
+            'thread_index': email_data.get('thread_index'),
+            'network_message_id': email_data.get('network_message_id'),
+            'tenant_id': email_data.get('tenant_id'),
+            'scl': email_data.get('scl'),
+            'in_reply_to': email_data.get('in_reply_to'),
+            'references': email_data.get('references'),
+            'created_at': email_data.get('created_at'),
+            'parent_folder_id': email_data.get('parent_folder_id'),
+            'replied': False,
+            'followup_send': False,
+            'followup_due_at': followup_due_at(
+                email_data.get('created_at'), email_data.get('followup_delay_days', FOLLOWUP_DELAY_DAYS)
+            ),
+            # Set email_type based on parameter
+            'email_type': 'initial',
+            'campaign_id': email_data.get('campaign_id')
+        
+
+        }
+    elif email_type == 'reply_outbound':
+        # Our replies to received emails
+        cleaned_data = {
+            'email_id': email_data.get('email_id'),
+            'sender': email_data.get('sender'),
+            'recipient': email_data.get('recipient'),
+            'subject': email_data.get('subject'),
+            'body': email_data.get('body', ''),
+            'conversational_id': email_data.get('conversation_id'),
+            'message_id': email_data.get('message_id'),
+            'thread_topic': email_data.get('threadTopic'),
+            'thread_index': email_data.get('threadIndex'),
+            'network_message_id': email_data.get('network_message_id'),
+            'tenant_id': email_data.get('tenant_id'),
+            'scl': email_data.get('scl'),
+            'in_reply_to': email_data.get('inReplyTo'),
+            'references': email_data.get('references'),
+            'created_at': email_data.get('created_at'),
+            'time_zone': email_data.get('time_zone'),
+            'replied': False,
+            'followup_send': True,
+
+            
+            # Set email_type based on parameter
+
+            'email_type': 'reply_outbound',
+            
+            # Additional fields that might be present in received emails
+            'return_path': email_data.get('return_path'),
+            'authentication_results': email_data.get('authentication_results'),
+            'dkim_signature': email_data.get('dkim_signature'),
+            'arc_authentication_results': email_data.get('arc_authentication_results'),
+            'ms_antispam': email_data.get('ms_antispam'),
+            'transport_latency': email_data.get('transport_latency'),
+            'traffic_type': email_data.get('traffic_type'),
+            'level_of_interest': None,
+            'parent_folder_id': email_data.get('parent_folder_id')
+        }
+
+    elif email_type == 'received':
+        # Common mapping for both outbound and received emails
+        cleaned_data = {
+            'email_id': email_data.get('email_id'),
+            'sender': email_data.get('sender'),
+            'recipient': email_data.get('recipient'),
+            'subject': email_data.get('subject'),
+            'body': email_data.get('body', ''),
+            'conversational_id': email_data.get('conversation_id'),
+            'message_id': email_data.get('message_id'),
+            'thread_topic': email_data.get('thread_topic'),
+            'thread_index': email_data.get('thread_index'),
+            'network_message_id': email_data.get('network_message_id'),
+            'tenant_id': email_data.get('tenant_id'),
+            'scl': email_data.get('scl'),
+            'in_reply_to': email_data.get('in_reply_to'),
+            'references': email_data.get('references'),
+            'created_at': email_data.get('created_at'),
+            'time_zone': email_data.get('time_zone'),
+            'replied': False,
+            'followup_send': True,
+            
+            # Set email_type based on parameter
+
+            'email_type': 'reply_inbound',
+            
+            # Additional fields that might be present in received emails
+            'return_path': email_data.get('return_path'),
+            'authentication_results': email_data.get('authentication_results'),
+            'dkim_signature': email_data.get('dkim_signature'),
+            'arc_authentication_results': email_data.get('arc_authentication_results'),
+            'ms_antispam': email_data.get('ms_antispam'),
+            'transport_latency': email_data.get('transport_latency'),
+            'traffic_type': email_data.get('traffic_type'),
+            'level_of_interest': email_data.get('level_of_interest'),
+            'parent_folder_id': email_data.get('parent_folder_id')
+        }
+    else:
+        raise ValueError(f"Invalid email type: {email_type}")
+
+    # Remove None values to prevent database errors
+    return {k: v for k, v in cleaned_data.items() if v is not None}
+
+
 def post_email(email_data: Dict[str, Any], email_type: str) -> Dict:
     """Post email to received_email table with proper type"""
-    print(f"Posting email with type: {email_type}")
+    logger.debug("Posting email %s with type %s", email_data.get('email_id'), email_type)
     try:
         # Check if email already exists in database
         email_id = email_data.get('email_id')
@@ -148,137 +299,19 @@ def post_email(email_data: Dict[str, Any], email_type: str) -> Dict:
                 .execute()
             
             if existing_email.data:
-                print(f"Email with ID {email_id} already exists in database. Skipping...")
+                logger.debug("Email with ID %s already exists in database. Skipping...", email_id)
                 return {}
 
         table = 'received_email'
-        
-        # Convert datetime objects to ISO format strings
-        if isinstance(email_data.get('created_at'), datetime):
-            email_data['created_at'] = email_data['created_at'].isoformat()
-        if isinstance(email_data.get('last_reply_at'), datetime):
-            email_data['last_reply_at'] = email_data['last_reply_at'].isoformat()
-        if isinstance(email_data.get('first_response_time'), datetime):
-            email_data['first_response_time'] = email_data['first_response_time'].isoformat()
-
-        print(f"email_data in supabase post_email: {email_data}")
-        if email_type == 'outbound':
-            # Initial outbound email
-            cleaned_data = {
-                'email_id': email_data.get('email_id'),
-                'sender': email_data.get('sender'),
-                'recipient': email_data.get('recipient'),
-                'subject': email_data.get('subject'),
-                'body': email_data.get('body', ''),
-                'conversational_id': email_data.get('conversation_id'),
-                'message_id': email_data.get('message_id'),
-                'thread_topic': email_data.get('thread_topic'),
-                'thread_index': email_data.get('thread_index'),
-                'network_message_id': email_data.get('network_message_id'),
-                'tenant_id': email_data.get('tenant_id'),
-                'scl': email_data.get('scl'),
-                'in_reply_to': email_data.get('in_reply_to'),
-                'references': email_data.get('references'),
-                'created_at': email_data.get('created_at'),
-                'parent_folder_id': email_data.get('parent_folder_id'),
-                'replied': False,
-                'followup_send': False,
-                # Set email_type based on parameter
-                'email_type': 'initial',
-                'campaign_id': email_data.get('campaign_id')
-            
-
-            }
-        elif email_type == 'reply_outbound':
-            # Our replies to received emails
-            cleaned_data = {
-                'email_id': email_data.get('email_id'),
-                'sender': email_data.get('sender'),
-                'recipient': email_data.get('recipient'),
-                'subject': email_data.get('subject'),
-                'body': email_data.get('body', ''),
-                'conversational_id': email_data.get('conversation_id'),
-                'message_id': email_data.get('message_id'),
-                'thread_topic': email_data.get('threadTopic'),
-                'thread_index': email_data.get('threadIndex'),
-                'network_message_id': email_data.get('network_message_id'),
-                'tenant_id': email_data.get('tenant_id'),
-                'scl': email_data.get('scl'),
-                'in_reply_to': email_data.get('inReplyTo'),
-                'references': email_data.get('references'),
-                'created_at': email_data.get('created_at'),
-                'time_zone': email_data.get('time_zone'),
-                'replied': False,
-                'followup_send': True,
-
-                
-                # Set email_type based on parameter
-
-                'email_type': 'reply_outbound',
-                
-                # Additional fields that might be present in received emails
-                'return_path': email_data.get('return_path'),
-                'authentication_results': email_data.get('authentication_results'),
-                'dkim_signature': email_data.get('dkim_signature'),
-                'arc_authentication_results': email_data.get('arc_authentication_results'),
-                'ms_antispam': email_data.get('ms_antispam'),
-                'transport_latency': email_data.get('transport_latency'),
-                'traffic_type': email_data.get('traffic_type'),
-                'level_of_interest': None,
-                'parent_folder_id': email_data.get('parent_folder_id')
-            }
-
-        elif email_type == 'received':
-            # Common mapping for both outbound and received emails
-            cleaned_data = {
-                'email_id': email_data.get('email_id'),
-                'sender': email_data.get('sender'),
-                'recipient': email_data.get('recipient'),
-                'subject': email_data.get('subject'),
-                'body': email_data.get('body', ''),
-                'conversational_id': email_data.get('conversation_id'),
-                'message_id': email_data.get('message_id'),
-                'thread_topic': email_data.get('thread_topic'),
-                'thread_index': email_data.get('thread_index'),
-                'network_message_id': email_data.get('network_message_id'),
-                'tenant_id': email_data.get('tenant_id'),
-                'scl': email_data.get('scl'),
-                'in_reply_to': email_data.get('in_reply_to'),
-                'references': email_data.get('references'),
-                'created_at': email_data.get('created_at'),
-                'time_zone': email_data.get('time_zone'),
-                'replied': False,
-                'followup_send': True,
-                
-                # Set email_type based on parameter
-
-                'email_type': 'reply_inbound',
-                
-                # Additional fields that might be present in received emails
-                'return_path': email_data.get('return_path'),
-                'authentication_results': email_data.get('authentication_results'),
-                'dkim_signature': email_data.get('dkim_signature'),
-                'arc_authentication_results': email_data.get('arc_authentication_results'),
-                'ms_antispam': email_data.get('ms_antispam'),
-                'transport_latency': email_data.get('transport_latency'),
-                'traffic_type': email_data.get('traffic_type'),
-                'level_of_interest': None,
-                'parent_folder_id': email_data.get('parent_folder_id')
-            }
-        else:
-            raise ValueError(f"Invalid email type: {email_type}")
-
-        # Remove None values to prevent database errors
-        cleaned_data = {k: v for k, v in cleaned_data.items() if v is not None}
-
+        cleaned_data = normalize_email_record(email_data, email_type)
         try:
             # Try to insert
             result = supabase_client.client.from_(table).insert(cleaned_data).execute()
-            print(f"Successfully stored email in {table}")
+            logger.debug("Stored email %s in %s", cleaned_data.get('email_id'), table)
             return result.data[0] if result.data else {}
         except Exception as e:
             if '23505' in str(e):  # Duplicate key error
-                print(f"Email already exists, updating: {cleaned_data.get('email_id')}")
+                logger.debug("Email already exists, updating: %s", cleaned_data.get('email_id'))
                 # Try to update instead
                 result = supabase_client.client.from_(table)\
                     .update(cleaned_data)\
@@ -295,6 +328,183 @@ def post_email(email_data: Dict[str, Any], email_type: str) -> Dict:
 
 
 
+def post_emails_bulk(records: List[Tuple[Dict[str, Any], str]], strict: bool = False) -> List[Dict]:
+    """
+    Store many (email_data, email_type) records in received_email with one
+    upsert per column set. Rows whose email_id already exists are left as they are.
+    With strict=True a failed upsert is raised after the remaining groups were written.
+    """
+    rows_by_email_id: Dict[Any, Dict[str, Any]] = {}
+    rows_without_id: List[Dict[str, Any]] = []
+    for email_data, email_type in records:
+        try:
+            row = normalize_email_record(email_data, email_type)
+        except ValueError as e:
+            logger.warning("Skipping email in bulk post: %s", e)
+            continue
+        if row.get('email_id'):
+            # Keep the first occurrence, like the single-row path does
+            rows_by_email_id.setdefault(row['email_id'], row)
+        else:
+            rows_without_id.append(row)
+
+    # PostgREST expects every row of a bulk request to share the same columns
+    groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+    for row in list(rows_by_email_id.values()) + rows_without_id:
+        groups.setdefault(frozenset(row), []).append(row)
+
+    stored = []
+    error = None
+    for rows in groups.values():
+        try:
+            result = supabase_client.client.from_('received_email') \
+                .upsert(rows, on_conflict='email_id', ignore_duplicates=True) \
+                .execute()
+            stored.extend(result.data or [])
+        except Exception as e:
+            logger.exception("Error bulk storing %d emails", len(rows))
+            error = e
+    logger.info("Bulk stored %d of %d emails", len(stored), len(records))
+    if strict and error is not None:
+        raise error
+    return stored
+
+
+def mark_conversations_replied(incoming: List[Tuple[str, str]], chunk_size: int = 50) -> int:
+    """
+    Set replied=True on the received_email rows of every conversation in
+    `incoming` ((conversation_id, email_id) pairs), except the incoming emails
+    themselves, with one conditional update per chunk of conversations.
+    Returns the number of rows that were updated.
+    """
+    email_ids_by_conversation: Dict[str, set] = {}
+    for conversation_id, email_id in incoming:
+        if conversation_id:
+            email_ids = email_ids_by_conversation.setdefault(conversation_id, set())
+            if email_id:
+                email_ids.add(email_id)
+
+    conversation_ids = sorted(email_ids_by_conversation)
+    updated = 0
+    for i in range(0, len(conversation_ids), chunk_size):
+        chunk = conversation_ids[i:i + chunk_size]
+        exclude_email_ids = sorted(set().union(*(email_ids_by_conversation[c] for c in chunk)))
+        query = supabase_client.client.from_('received_email') \
+            .update({'replied': True}) \
+            .in_('conversational_id', chunk) \
+            .eq('replied', False)
+        if exclude_email_ids:
+            query = query.not_.in_('email_id', exclude_email_ids)
+        result = query.execute()
+        updated += len(result.data or [])
+    return updated
+
+
+def store_reply_classifications(classifications: List[Dict[str, Any]], chunk_size: int = 100) -> int:
+    """
+    Write reply classifications back in bulk. Each item carries email_id,
+    level_of_interest, is_related and the drafted reply_subject/reply_body.
+    received_email gets one update per distinct (level_of_interest, is_related)
+    pair, the drafted replies go into reply_drafts with one insert per chunk.
+    Returns the number of received_email rows that were updated.
+    """
+    email_ids_by_label: Dict[Tuple[str, bool], List[str]] = {}
+    drafts = []
+    for item in classifications:
+        label = (item['level_of_interest'], item['is_related'])
+        email_ids_by_label.setdefault(label, []).append(item['email_id'])
+        if item.get('reply_body'):
+            drafts.append({
+                'email_id': item['email_id'],
+                'subject': item.get('reply_subject'),
+                'body': item['reply_body'],
+                'created_at': datetime.now().isoformat()
+            })
+
+    updated = 0
+    for (level_of_interest, is_related), email_ids in email_ids_by_label.items():
+        for i in range(0, len(email_ids), chunk_size):
+            result = supabase_client.client.from_('received_email') \
+                .update({'level_of_interest': level_of_interest, 'is_related': is_related}) \
+                .in_('email_id', email_ids[i:i + chunk_size]) \
+                .execute()
+            updated += len(result.data or [])
+
+    for i in range(0, len(drafts), chunk_size):
+        supabase_client.client.from_('reply_drafts') \
+            .upsert(drafts[i:i + chunk_size], on_conflict='email_id') \
+            .execute()
+    return updated
+
+
+def mark_followups_sent(row_ids: List[Any], chunk_size: int = 200) -> int:
+    """
+    Set followup_send=True and clear followup_due_at on the given
+    received_email rows with one update per chunk of ids.
+    Returns the number of rows that were updated.
+    """
+    return update_followup_due(row_ids, None, {'followup_send': True}, chunk_size)
+
+
+def update_followup_due(row_ids: List[Any], due_at: Optional[str],
+                        extra: Optional[Dict[str, Any]] = None, chunk_size: int = 200) -> int:
+    """Set followup_due_at (None clears it) on the given received_email rows"""
+    data = {'followup_due_at': due_at, **(extra or {})}
+    updated = 0
+    for i in range(0, len(row_ids), chunk_size):
+        result = supabase_client.client.from_('received_email') \
+            .update(data) \
+            .in_('id', row_ids[i:i + chunk_size]) \
+            .execute()
+        updated += len(result.data or [])
+    return updated
+
+
+class EmailRecordBuffer:
+    """
+    Collects email records and writes them with post_emails_bulk in batches.
+    With strict=True a failed write raises from add()/flush(), for callers
+    that must not move on (e.g. advance a sync cursor) past unstored records.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 30, strict: bool = False):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.strict = strict
+        self._records: List[Tuple[Dict[str, Any], str]] = []
+        self._first_added: Optional[float] = None
+        # Senders add from worker threads, the write itself happens outside the lock
+        self._lock = threading.Lock()
+
+    def add(self, email_data: Dict[str, Any], email_type: str) -> None:
+        with self._lock:
+            if not self._records:
+                self._first_added = time.monotonic()
+            self._records.append((email_data, email_type))
+            if (len(self._records) < self.batch_size
+                    and time.monotonic() - self._first_added < self.flush_interval):
+                return
+            records, self._records = self._records, []
+        post_emails_bulk(records, strict=self.strict)
+
+    def flush(self) -> List[Dict]:
+        with self._lock:
+            records, self._records = self._records, []
+        if not records:
+            return []
+        return post_emails_bulk(records, strict=self.strict)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+
 # Export the methods
 def post(table_name: str, data: Dict[str, Any]) -> Dict:
     return supabase_client.post(table_name, data)
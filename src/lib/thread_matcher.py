@@ -0,0 +1,143 @@
+import re
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+from .supabase_client import supabase_client
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_ID_PATTERN = re.compile(r'<[^<>\s]+>')
+# Reply prefixes of the languages we send in (en/de/nl/es)
+REPLY_PREFIX_PATTERN = re.compile(r'^(?:(?:re|aw|antw|sv|rv|fw|fwd|wg)\s*:\s*)+', re.IGNORECASE)
+
+
+def normalize_subject(subject: Optional[str]) -> str:
+    """Strip reply/forward prefixes and collapse whitespace"""
+    return ' '.join(REPLY_PREFIX_PATTERN.sub('', subject or '').split())
+
+
+def parse_message_ids(*header_values: Optional[str]) -> List[str]:
+    """Extract Message-IDs from In-Reply-To/References values, most recent first"""
+    message_ids: List[str] = []
+    for value in header_values:
+        if not value:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = ' '.join(value)
+        # References lists the thread oldest first, the direct parent is last
+        for message_id in reversed(MESSAGE_ID_PATTERN.findall(value)):
+            if message_id not in message_ids:
+                message_ids.append(message_id)
+    return message_ids
+
+
+def _quote(value: str) -> str:
+    """Quote a value for a PostgREST or_() filter"""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _like_literal(value: str) -> str:
+    """Escape LIKE wildcards so an ilike() filter matches the value itself"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class LRUIndex:
+    """Small thread-safe LRU map used to remember resolved parents"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._items: "OrderedDict[Hashable, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        with self._lock:
+            row = self._items.get(key)
+            if row is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return row
+
+    def put(self, key: Hashable, row: Dict) -> None:
+        with self._lock:
+            self._items[key] = row
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+class ThreadMatcher:
+    """
+    Resolves the outbound email an inbound reply belongs to.
+    Lookups go In-Reply-To/References Message-IDs first, then normalized
+    (sender, recipient, subject). The database filters and orders, so each
+    lookup transfers at most one row; resolved parents are kept in an LRU index.
+    """
+
+    def __init__(self, table: str = 'outbound_email', cache_size: int = 10000):
+        self.table = table
+        self.index = LRUIndex(cache_size)
+
+    def find_parent(self, email_data: Dict) -> Optional[Dict]:
+        message_ids = parse_message_ids(
+            email_data.get('in_reply_to'),
+            email_data.get('reference_list') or email_data.get('references')
+        )
+        for message_id in message_ids:
+            row = self.index.get(('message_id', message_id))
+            if row:
+                return row
+        if message_ids:
+            row = self._query_by_message_ids(message_ids)
+            if row:
+                self._remember(row, message_ids)
+                return row
+
+        # Our outbound email was sent by the reply's recipient to the reply's sender
+        our_address = (email_data.get('recipient') or '').lower()
+        their_address = (email_data.get('sender') or '').lower()
+        subject = normalize_subject(email_data.get('subject'))
+        if not (our_address and their_address and subject):
+            return None
+
+        key = ('thread', our_address, their_address, subject.lower())
+        row = self.index.get(key)
+        if row:
+            return row
+        row = self._query_by_thread(our_address, their_address, subject)
+        if row:
+            self.index.put(key, row)
+            self._remember(row, message_ids)
+        return row
+
+    def _remember(self, row: Dict, message_ids: List[str]) -> None:
+        for message_id in message_ids + [row.get('internet_message_id')]:
+            if message_id:
+                self.index.put(('message_id', message_id), row)
+
+    def _query_by_message_ids(self, message_ids: List[str]) -> Optional[Dict]:
+        result = supabase_client.client.from_(self.table) \
+            .select('*') \
+            .in_('internet_message_id', message_ids) \
+            .order('created_at', desc=True) \
+            .limit(1) \
+            .execute()
+        return result.data[0] if result.data else None
+
+    def _query_by_thread(self, our_address: str, their_address: str, subject: str) -> Optional[Dict]:
+        result = supabase_client.client.from_(self.table) \
+            .select('*') \
+            .ilike('sender', _like_literal(our_address)) \
+            .ilike('recipient', _like_literal(their_address)) \
+            .or_(f"subject.eq.{_quote(subject)},conversation_topic.eq.{_quote(subject)}") \
+            .order('created_at', desc=True) \
+            .limit(1) \
+            .execute()
+        return result.data[0] if result.data else None
+
+
+thread_matcher = ThreadMatcher()
@@ -0,0 +1,152 @@
+import threading
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from msal import ConfidentialClientApplication
+
+logger = logging.getLogger(__name__)
+
+GRAPH_SCOPES = ["https://graph.microsoft.com/.default"]
+
+
+@dataclass
+class _TokenEntry:
+    app: object
+    scopes: Tuple[str, ...]
+    access_token: Optional[str] = None
+    expires_at: float = 0.0
+    refreshing: bool = False
+    # Held while a token is fetched, so concurrent misses make one request
+    fetch_lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _default_app_factory(client_id: str, client_secret: str, tenant_id: str):
+    return ConfidentialClientApplication(
+        client_id=client_id,
+        client_credential=client_secret,
+        authority=f"https://login.microsoftonline.com/{tenant_id}"
+    )
+
+
+class TokenCache:
+    """Process-wide app-only token cache keyed by (tenant_id, client_id, scopes).
+
+    Tokens are served from memory until ``refresh_margin`` seconds before they
+    expire. Inside that margin the current token is still returned while a
+    background thread fetches the next one, so callers only wait on the token
+    endpoint the very first time or after a token has fully expired. Callers
+    that miss at the same time share a single token request.
+    """
+
+    def __init__(self, refresh_margin: float = 300,
+                 app_factory: Callable[[str, str, str], object] = _default_app_factory):
+        self.refresh_margin = refresh_margin
+        self.app_factory = app_factory
+        # One MSAL app per (tenant_id, client_id), rebuilt when the secret changes
+        self._apps: Dict[Tuple[str, str], Tuple[str, object]] = {}
+        self._entries: Dict[Tuple[str, str, Tuple[str, ...]], _TokenEntry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    def _entry(self, tenant_id: str, client_id: str, client_secret: str, scopes: List[str]) -> _TokenEntry:
+        scope_key = tuple(sorted(scopes))
+        key = (tenant_id, client_id, scope_key)
+        with self._lock:
+            secret, app = self._apps.get((tenant_id, client_id), (None, None))
+            if app is None or secret != client_secret:
+                app = self.app_factory(client_id, client_secret, tenant_id)
+                self._apps[(tenant_id, client_id)] = (client_secret, app)
+                # Tokens of the old credential must not outlive it
+                for old_key in [k for k in self._entries if k[:2] == (tenant_id, client_id)]:
+                    del self._entries[old_key]
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _TokenEntry(app=app, scopes=scope_key)
+                self._entries[key] = entry
+            return entry
+
+    def _acquire(self, entry: _TokenEntry) -> Optional[str]:
+        try:
+            result = entry.app.acquire_token_for_client(scopes=list(entry.scopes))
+        except Exception as e:
+            logger.error(f"Error getting access token: {str(e)}")
+            result = {}
+
+        if "access_token" not in result:
+            with self._lock:
+                self.failures += 1
+            logger.error(f"Failed to get token: {result.get('error_description')}")
+            return None
+
+        with self._lock:
+            entry.access_token = result["access_token"]
+            entry.expires_at = time.time() + int(result.get("expires_in", 3599))
+        return entry.access_token
+
+    def _refresh_in_background(self, entry: _TokenEntry) -> None:
+        def refresh():
+            try:
+                with entry.fetch_lock:
+                    self._acquire(entry)
+            finally:
+                with self._lock:
+                    entry.refreshing = False
+
+        threading.Thread(target=refresh, name="token-refresh", daemon=True).start()
+
+    def _valid_token(self, entry: _TokenEntry) -> Optional[str]:
+        return entry.access_token if time.time() < entry.expires_at else None
+
+    def get_token(self, tenant_id: str, client_id: str, client_secret: str,
+                  scopes: List[str] = GRAPH_SCOPES) -> Optional[str]:
+        """Return a valid access token, fetching one only when none is cached"""
+        entry = self._entry(tenant_id, client_id, client_secret, scopes)
+        now = time.time()
+
+        with self._lock:
+            token = self._valid_token(entry)
+            if token:
+                self.hits += 1
+                start_refresh = now >= entry.expires_at - self.refresh_margin and not entry.refreshing
+                if start_refresh:
+                    entry.refreshing = True
+                    self.refreshes += 1
+            else:
+                self.misses += 1
+
+        if token:
+            if start_refresh:
+                self._refresh_in_background(entry)
+            return token
+
+        with entry.fetch_lock:
+            # Another caller may have fetched it while we waited for the lock
+            with self._lock:
+                token = self._valid_token(entry)
+            return token or self._acquire(entry)
+
+    def invalidate(self, tenant_id: str, client_id: str) -> None:
+        """Drop the cached tokens of every scope set, e.g. after Graph rejected one with a 401"""
+        with self._lock:
+            for key, entry in self._entries.items():
+                if key[:2] == (tenant_id, client_id):
+                    entry.access_token = None
+                    entry.expires_at = 0.0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "cached_tokens": sum(1 for e in self._entries.values() if e.access_token),
+            }
+
+
+# Shared by GraphAPIClient and EmailManager
+token_cache = TokenCache()
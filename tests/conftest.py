@@ -0,0 +1,29 @@
+import os
+import sys
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Module-level clients refuse to start without credentials. Nothing in the
+# tests talks to Supabase or OpenAI, placeholders are enough for pytest to
+# import the checkout's top-level __init__ and the LLM helpers.
+os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+os.environ.setdefault('SUPABASE_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+# The project is deployed as src/email_management. Register that package path
+# without running the package __init__ files, so a module under test only
+# pulls in its own imports.
+PACKAGES = {
+    'src': ROOT.parent,
+    'src.email_management': ROOT,
+    'src.email_management.src': ROOT / 'src',
+    'src.email_management.src.lib': ROOT / 'src' / 'lib',
+}
+
+for name, path in PACKAGES.items():
+    if name not in sys.modules:
+        package = types.ModuleType(name)
+        package.__path__ = [str(path)]
+        sys.modules[name] = package
@@ -0,0 +1,29 @@
+import pytest
+
+from src.email_management.src.lib.auto_reply_classifier import AUTO_REPLY, BOUNCE, classify_auto_reply
+
+
+@pytest.mark.parametrize('body', [
+    "Hi, I'm away next week but happy to talk after. Does Tuesday work?",
+    "I think my earlier email wasn't delivered, resending the list below.",
+    "Ich bin im Urlaub, aber Ihr Angebot klingt interessant.",
+    "We built this in-house, it is an automated process already.",
+])
+def test_human_replies_are_not_notices(body):
+    assert classify_auto_reply({}, 'jane', 'Re: Quick question', body) is None
+
+
+@pytest.mark.parametrize('body', [
+    "Thank you for your email. I am currently out of the office with limited access to email.",
+    "Ich bin derzeit nicht im Büro. In dringenden Fällen wenden Sie sich an meine Kollegin.",
+    "This is an automatic reply, your message has been received.",
+])
+def test_out_of_office_wording(body):
+    assert classify_auto_reply({}, 'jane', 'Re: Quick question', body) == AUTO_REPLY
+
+
+def test_bounce_wording_needs_server_evidence():
+    body = "Your message to lead@example.com could not be delivered."
+    assert classify_auto_reply({}, 'jane', 'Re: Quick question', body) is None
+    assert classify_auto_reply({'auto-submitted': 'auto-generated'}, 'mail', 'Status', body) == BOUNCE
+    assert classify_auto_reply({}, 'mail', 'Returned', "Remote server returned '550 5.1.1 not found'") == BOUNCE
@@ -0,0 +1,104 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import pytest
+import pytz
+
+from src.email_management.scheduler.models.sending_rules import SendingRules
+from src.email_management.scheduler.utils.business_calendar import BusinessCalendar, next_valid_times
+from src.email_management.scheduler.utils.time_utils import is_valid_send_time
+
+UTC = pytz.UTC
+RULES = SendingRules.from_dict({
+    'allowed_hours': {'start': '07:00', 'end': '18:00'},
+    'excluded_days': ['Saturday'],
+    'holidays': {'NL': ['2026-10-26'], 'America/New_York': ['2026-10-27']},
+})
+ZONES = ['Europe/Amsterdam', 'America/New_York', 'Asia/Kolkata', 'Australia/Sydney']
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=UTC)
+
+
+def reference_is_open(moment, tz_name, rules=RULES):
+    """The rules applied to the recipient's wall clock, one datetime at a time"""
+    local = moment.astimezone(pytz.timezone(tz_name))
+    return (
+        local.strftime('%A') not in rules.excluded_days
+        and local.date().isoformat() not in rules.holidays_for(tz_name)
+        and time.fromisoformat(rules.start) <= local.time() < time.fromisoformat(rules.end)
+    )
+
+
+@pytest.mark.parametrize('day, opens_utc', [
+    # Last CET day, the switch to CEST (Sunday 29 March), first CEST day
+    (datetime(2026, 3, 28), utc(2026, 3, 28, 6)),
+    (datetime(2026, 3, 29), utc(2026, 3, 29, 5)),
+    (datetime(2026, 3, 30), utc(2026, 3, 30, 5)),
+    # Last CEST day, the switch back to CET (Sunday 25 October), first CET day
+    (datetime(2026, 10, 24), utc(2026, 10, 24, 5)),
+    (datetime(2026, 10, 25), utc(2026, 10, 25, 6)),
+    (datetime(2026, 10, 26), utc(2026, 10, 26, 6)),
+])
+def test_windows_follow_amsterdam_dst(day, opens_utc):
+    calendar = BusinessCalendar('Europe/Amsterdam', time(7), time(18))
+    zone = pytz.timezone('Europe/Amsterdam')
+
+    start, end = calendar.window_for(zone.localize(day))
+    assert start.astimezone(UTC) == opens_utc
+    # Always eleven hours of local time, even on the 23 and 25 hour days
+    assert end.astimezone(UTC) - start.astimezone(UTC) == timedelta(hours=11)
+    assert calendar.next_open_time(opens_utc - timedelta(hours=2)) == opens_utc
+    assert not calendar.is_open_at(opens_utc - timedelta(seconds=1))
+    assert calendar.is_open_at(opens_utc)
+
+
+def test_days_to_cover_across_the_dst_change():
+    calendar = BusinessCalendar('Europe/Amsterdam', time(7), time(18), excluded_weekdays=frozenset({5, 6}))
+    # Friday 23 October 17:00 CEST, the week after has the 25 hour Sunday
+    start = utc(2026, 10, 23, 15)
+    # Friday's window closes in an hour, the next two are Monday and Tuesday
+    assert calendar.days_to_cover(start, 1) == 1
+    assert calendar.days_to_cover(start, 3) == 5
+
+
+def test_next_valid_times_for_a_mixed_timezone_batch():
+    moments = [
+        utc(2026, 10, 24, 10),   # Amsterdam: Saturday, excluded
+        utc(2026, 10, 25, 12),   # New York: Sunday 08:00 EDT, open
+        utc(2026, 10, 27, 1),    # New York: Monday 21:00 EDT, next is Tuesday, a holiday
+        utc(2026, 10, 25, 0),    # Kolkata: Sunday 05:30 IST, opens at 07:00
+        utc(2026, 10, 25, 12),   # Amsterdam: Sunday 13:00 CET, open
+        utc(2026, 10, 26, 8),    # Amsterdam: Monday, NL holiday
+        utc(2026, 10, 24, 6),    # Sydney: Saturday 17:00 AEDT, excluded until Sunday
+    ]
+    zones = ['Europe/Amsterdam', 'America/New_York', 'America/New_York', 'Asia/Kolkata',
+             'Europe/Amsterdam', 'Europe/Amsterdam', 'Australia/Sydney']
+
+    result = next_valid_times([m.timestamp() for m in moments], zones, RULES)
+
+    assert [datetime.fromtimestamp(ts, UTC) for ts in result] == [
+        utc(2026, 10, 25, 6),    # Sunday 07:00 CET
+        utc(2026, 10, 25, 12),
+        utc(2026, 10, 28, 11),   # Wednesday 07:00 EDT
+        utc(2026, 10, 25, 1, 30),
+        utc(2026, 10, 25, 12),
+        utc(2026, 10, 27, 6),    # Tuesday 07:00 CET
+        utc(2026, 10, 24, 20),   # Sunday 07:00 AEDT
+    ]
+    # The plain dict form of the rules gives the same answers without holidays
+    assert next_valid_times([moments[0].timestamp()], zones[:1], RULES.to_dict())[0] == result[0]
+
+
+@pytest.mark.parametrize('tz_name', ZONES)
+def test_batch_and_single_lookups_agree_with_is_valid_send_time(tz_name):
+    # Every 10 minutes through the week of the European DST change and the
+    # US change a week later
+    grid = [utc(2026, 10, 22) + timedelta(minutes=10 * n) for n in range(16 * 24 * 6)]
+    calendar = RULES.calendar(tz_name)
+
+    expected = [reference_is_open(moment, tz_name) for moment in grid]
+    assert calendar.is_open(np.array([moment.timestamp() for moment in grid])).tolist() == expected
+    assert [is_valid_send_time(moment, tz_name, RULES) for moment in grid] == expected
+    assert [calendar.is_open_at(moment) for moment in grid] == expected
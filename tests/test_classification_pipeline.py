@@ -0,0 +1,63 @@
+import asyncio
+import threading
+
+from src.email_management.src.lib.classification_pipeline import (
+    ProccessedEmailAnalysis, ReplyClassifier
+)
+
+ANALYSIS = ProccessedEmailAnalysis.model_validate({
+    'level_of_interest': 'high',
+    'is_related': True,
+    'reply': {'subject': 'Re: Quick question', 'body': 'Great, does Tuesday work?'},
+})
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class StubLLM:
+    """generate() stand-in, rate limits the first call for every body in `limited`"""
+
+    def __init__(self, limited=()):
+        self.limited = set(limited)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, user_input: str) -> ProccessedEmailAnalysis:
+        with self._lock:
+            self.calls.append(user_input)
+            if user_input in self.limited:
+                self.limited.discard(user_input)
+                raise RateLimitError('Rate limit reached')
+        return ANALYSIS
+
+
+def test_classifies_retries_and_writes_in_batches():
+    llm = StubLLM(limited={'reply 3', 'reply 7'})
+    writes = []
+    classifier = ReplyClassifier(generate=llm, max_in_flight=4, base_delay=0.001, write_batch_size=4,
+                                 store=lambda rows: writes.append(rows) or len(rows), cache=None)
+    emails = [{'email_id': f'AAMk-{i}', 'body': f'reply {i}'} for i in range(10)]
+
+    results = asyncio.run(classifier.run(emails))
+
+    assert all(result.analysis == ANALYSIS for result in results)
+    assert len(llm.calls) == 12
+    assert sorted(len(rows) for rows in writes) == [2, 4, 4]
+    assert writes[0][0]['level_of_interest'] == 'high' and writes[0][0]['reply_body'] == 'Great, does Tuesday work?'
+    stats = classifier.stats()
+    assert (stats['completed'], stats['failed'], stats['retries']) == (10, 0, 2)
+    assert stats['p50_seconds'] <= stats['p90_seconds'] <= stats['p99_seconds']
+    assert stats['throughput_per_second'] > 0
+
+
+def test_non_retryable_errors_fail_without_retry():
+    def generate(user_input):
+        raise ValueError('unparseable response')
+
+    classifier = ReplyClassifier(generate=generate, store=len, cache=None)
+    result, = asyncio.run(classifier.run([{'email_id': 'AAMk-1', 'body': 'hi'}]))
+
+    assert result.analysis is None and result.attempts == 1
+    assert classifier.stats()['failed'] == 1
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+
+import pytest
+import requests
+
+import src.email_management.src.lib.imap_tools_based_functions as graph
+from src.email_management.src.lib.imap_tools_based_functions import EmailManager
+
+MAILBOX = 'anna@veloxforce.de'
+BASE = f'https://graph.microsoft.com/v1.0/users/{MAILBOX}/mailFolders'
+SINCE = datetime(2026, 10, 12, tzinfo=timezone.utc)
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} Server Error', response=self)
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Graph pages by URL, the query string of the first request is ignored"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.requested.append(url)
+        return self.pages[url]
+
+
+def delta_pages(folder, *messages_per_page, last=None):
+    """A chain of delta pages for `folder`, the last one carrying `last` or a deltaLink"""
+    urls = [f'{BASE}/{folder}/messages/delta'] + [
+        f'{BASE}/{folder}/messages/delta?$skiptoken={n}' for n in range(1, len(messages_per_page))
+    ]
+    pages = {}
+    for n, (url, ids) in enumerate(zip(urls, messages_per_page)):
+        payload = {'value': [{'id': message_id} for message_id in ids]}
+        if n + 1 < len(urls):
+            payload['@odata.nextLink'] = urls[n + 1]
+        else:
+            payload['@odata.deltaLink'] = f'{BASE}/{folder}/messages/delta?$deltatoken={folder}'
+        pages[url] = FakeResponse(200, payload)
+    if last is not None:
+        pages[urls[-1]] = last
+    return pages
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(graph, 'DELTA_TOKENS_FILE', str(tmp_path / 'delta_tokens.json'))
+    manager = EmailManager('client', 'secret', 'tenant', MAILBOX)
+    monkeypatch.setattr(manager, 'authenticate', lambda: True)
+    return manager
+
+
+def test_next_links_are_followed_to_the_delta_link(manager):
+    pages = delta_pages('inbox', ['m1', 'm2'], ['m3'], ['m4'])
+    pages[f'{BASE}/inbox/messages/delta?$skiptoken=1'].payload['value'].append({'id': 'm0', '@removed': {}})
+    pages.update(delta_pages('sentitems', ['s1']))
+    manager.session = FakeSession(pages)
+
+    emails, delta_links = manager.sync_emails(SINCE)
+
+    assert [email['id'] for email in emails] == ['m1', 'm2', 'm3', 'm4', 's1']
+    assert delta_links == {
+        'inbox': f'{BASE}/inbox/messages/delta?$deltatoken=inbox',
+        'sentitems': f'{BASE}/sentitems/messages/delta?$deltatoken=sentitems',
+    }
+    assert len(manager.session.requested) == 4
+
+
+def test_partially_synced_folder_returns_no_delta_link(manager):
+    pages = delta_pages('inbox', ['m1', 'm2'], ['m3'], last=FakeResponse(503))
+    pages.update(delta_pages('sentitems', ['s1']))
+    manager.session = FakeSession(pages)
+
+    emails, delta_links = manager.sync_emails(SINCE)
+
+    # What was fetched is returned, the next sync starts the inbox over
+    assert [email['id'] for email in emails] == ['m1', 'm2', 's1']
+    assert list(delta_links) == ['sentitems']
+
+    with pytest.raises(requests.HTTPError):
+        manager.sync_emails(SINCE, strict=True)
+
+
+def test_chain_without_a_delta_link_returns_none(manager):
+    pages = delta_pages('inbox', ['m1'])
+    del pages[f'{BASE}/inbox/messages/delta'].payload['@odata.deltaLink']
+    manager.session = FakeSession(pages)
+
+    emails, delta_links = manager.sync_emails(SINCE, folders=('inbox',))
+
+    assert [email['id'] for email in emails] == ['m1']
+    assert delta_links == {}
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from src.email_management.scheduler.dispatcher import SendDispatcher
+
+SENDER = 'worker@veloxforce.de'
+
+
+def make_tracker(*scheduled_times):
+    queue = [
+        {"queue_id": n, "scheduled_time": scheduled.isoformat(), "status": "pending"}
+        for n, scheduled in enumerate(scheduled_times)
+    ]
+    return {"sending_accounts": {SENDER: {"email_queue": queue}}}
+
+
+def test_load_skips_entries_in_flight():
+    now = datetime.now(pytz.UTC)
+    tracker = make_tracker(now - timedelta(minutes=1), now + timedelta(hours=1))
+    dispatcher = SendDispatcher()
+    assert dispatcher.load(tracker) == 2
+
+    due = dispatcher.pop_due()
+    assert [entry["queue_id"] for _, entry in due] == [0]
+    # Still pending in the tracker queue while it is being sent
+    assert dispatcher.load(tracker) == 0
+    assert dispatcher.stats()["in_flight"] == 1
+
+
+def test_done_releases_entry():
+    now = datetime.now(pytz.UTC)
+    tracker = make_tracker(now - timedelta(minutes=1))
+    dispatcher = SendDispatcher()
+    dispatcher.load(tracker)
+    (_, entry), = dispatcher.pop_due()
+
+    # A failed send leaves the entry in the queue, it can be loaded again
+    dispatcher.done(entry)
+    assert dispatcher.load(tracker) == 1
+
+    (_, entry), = dispatcher.pop_due()
+    tracker["sending_accounts"][SENDER]["email_queue"].remove(entry)
+    dispatcher.done(entry)
+    assert dispatcher.load(tracker) == 0
+    assert dispatcher.stats()["in_flight"] == 0
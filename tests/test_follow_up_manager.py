@@ -0,0 +1,207 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+import pytz
+
+import src.email_management.sendreply as sendreply
+from src.email_management.follow_up.follow_up_manager import FOLLOWUP_RETRY_DELAY, FollowUpManager
+from src.email_management.follow_up.follow_up_scheduler import FollowUpScheduler
+from src.email_management.follow_up.sequence_engine import FollowUpSequence, SequenceEngine
+
+SENDER = 'anna.berg@veloxforce.de'
+
+
+class FakeSender:
+    def __init__(self, succeed: bool):
+        self.succeed = succeed
+        self.sent = []
+
+    def send_email(self, recipient, subject, body, time_zone=None, headers=None):
+        self.sent.append(recipient)
+        return (True, {'message_id': '<1@veloxforce.de>'}) if self.succeed else (False, {})
+
+
+@pytest.fixture
+def table(monkeypatch):
+    """received_email rows by id, updated in place by update_followup_due"""
+    rows = {}
+
+    def update_followup_due(ids, due_at, extra=None):
+        for row_id in ids:
+            rows[row_id].update({'followup_due_at': due_at, **(extra or {})})
+        return len(ids)
+
+    monkeypatch.setattr(sys.modules[SequenceEngine.__module__], 'update_followup_due', update_followup_due)
+    monkeypatch.setattr(sendreply, 'update_original_email_status', lambda row: None)
+    return rows
+
+
+def make_manager(table, sender, monkeypatch):
+    sequence = FollowUpSequence.from_dict({'stages': [
+        {'delay_days': 3, 'template': 'Hi {recipient_name}'},
+        {'delay_days': 4, 'template': 'Last one'},
+    ]})
+    monkeypatch.setattr(sendreply, 'init_sender', lambda email: sender)
+    manager = FollowUpManager(engine=SequenceEngine({'default': sequence}))
+    # Every row still due is a candidate, in one page
+    monkeypatch.setattr(manager, 'iter_followup_candidates', lambda: iter([[
+        dict(row) for row in table.values() if row['followup_due_at'] is not None
+    ]]))
+    return manager
+
+
+def add_row(table, row_id):
+    table[row_id] = {
+        'id': row_id, 'email_id': f'AAMk-{row_id}', 'sender': SENDER, 'recipient': f'lead.{row_id}@example.com',
+        'subject': 'Quick question', 'campaign_id': 'c1', 'followup_stage': 0, 'followup_attempts': 0,
+        'followup_due_at': '2026-10-01T08:00:00+00:00',
+    }
+
+
+def test_send_reply_reports_a_failed_send(monkeypatch):
+    monkeypatch.setattr(sendreply, 'init_sender', lambda email: FakeSender(succeed=False))
+    success, _ = sendreply.send_reply(SENDER, 'lead@example.com', 'Quick question', 'Hi', 'AAMk-1',
+                                      original_email={'id': 1}, update_original=False)
+    assert success is False
+
+
+def test_failed_follow_up_does_not_advance(table, monkeypatch):
+    add_row(table, 1)
+    sender = FakeSender(succeed=False)
+    sent = asyncio.run(make_manager(table, sender, monkeypatch).process_followups())
+
+    assert sent == 0 and sender.sent == ['lead.1@example.com']
+    assert table[1]['followup_stage'] == 0
+    assert table[1]['followup_attempts'] == 1
+
+
+def test_sent_follow_up_advances(table, monkeypatch):
+    add_row(table, 1)
+    sent = asyncio.run(make_manager(table, FakeSender(succeed=True), monkeypatch).process_followups())
+
+    assert sent == 1
+    assert table[1]['followup_stage'] == 1
+    assert table[1]['followup_due_at'] is not None
+
+
+def test_failing_sender_is_stopped_after_max_attempts(table, monkeypatch):
+    manager_module = sys.modules[FollowUpManager.__module__]
+    monkeypatch.setattr(manager_module, 'FOLLOWUP_MAX_ATTEMPTS', 3)
+    add_row(table, 1)
+    sender = FakeSender(succeed=False)
+    manager = make_manager(table, sender, monkeypatch)
+
+    for _ in range(5):
+        asyncio.run(manager.process_followups())
+
+    # Retried while due, stopped on the third failure and not tried again
+    assert len(sender.sent) == 3
+    assert table[1]['followup_attempts'] == 3
+    assert table[1]['followup_stop_reason'] == 'send_failed'
+    assert table[1]['followup_due_at'] is None
+    assert table[1]['followup_stage'] == 0
+
+
+class DueQuery:
+    """The part of the PostgREST query builder the due-row queries use"""
+
+    def __init__(self, rows, queries):
+        self.rows = rows
+        self.filters = []
+        self.order_by = None
+        self.limit_to = None
+        self.not_ = self
+        queries.append(self)
+
+    def select(self, columns):
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row[column] is not None and row[column] <= value)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row[column] > value)
+        return self
+
+    def is_(self, column, value):
+        # Only used negated, as not_.is_(column, "null")
+        self.filters.append(lambda row: row[column] is not None)
+        return self
+
+    def order(self, column):
+        self.order_by = column
+        return self
+
+    def limit(self, count):
+        self.limit_to = count
+        return self
+
+    def execute(self):
+        data = sorted((row for row in self.rows if all(f(row) for f in self.filters)),
+                      key=lambda row: row[self.order_by])
+        return SimpleNamespace(data=[dict(row) for row in data[:self.limit_to]])
+
+
+def due_rows_manager(rows, monkeypatch):
+    queries = []
+    client = SimpleNamespace(from_=lambda table: DueQuery(rows, queries))
+    manager = FollowUpManager()
+    monkeypatch.setattr(manager, 'supabase', SimpleNamespace(client=client))
+    return manager, queries
+
+
+def test_only_due_rows_are_candidates(monkeypatch):
+    now = datetime.now(pytz.UTC)
+    rows = [
+        {'id': n, 'followup_due_at': due.isoformat() if due else None}
+        for n, due in enumerate([now - timedelta(days=1), None, now + timedelta(hours=1),
+                                 now - timedelta(minutes=1), now - timedelta(days=3)], start=1)
+    ]
+    manager, queries = due_rows_manager(rows, monkeypatch)
+
+    pages = list(manager.iter_followup_candidates(page_size=2))
+
+    assert [[row['id'] for row in page] for page in pages] == [[1, 4], [5]]
+    # A short page ends the scan
+    assert len(queries) == 2
+
+
+def test_next_followup_due_is_the_earliest_pending_row(monkeypatch):
+    rows = [
+        {'id': 1, 'followup_due_at': None},
+        {'id': 2, 'followup_due_at': '2026-10-20T09:00:00+00:00'},
+        {'id': 3, 'followup_due_at': '2026-10-19T14:30:00+00:00'},
+    ]
+    manager, _ = due_rows_manager(rows, monkeypatch)
+    assert manager.next_followup_due() == datetime(2026, 10, 19, 14, 30, tzinfo=pytz.UTC)
+
+    manager, _ = due_rows_manager([{'id': 1, 'followup_due_at': None}], monkeypatch)
+    assert manager.next_followup_due() is None
+
+
+def test_failed_follow_up_is_due_again_after_the_retry_delay(table, monkeypatch):
+    add_row(table, 1)
+    started = datetime.now(pytz.UTC)
+    asyncio.run(make_manager(table, FakeSender(succeed=False), monkeypatch).process_followups())
+
+    due_at = datetime.fromisoformat(table[1]['followup_due_at'])
+    retry_delay = timedelta(seconds=FOLLOWUP_RETRY_DELAY)
+    assert started + retry_delay <= due_at <= datetime.now(pytz.UTC) + retry_delay
+
+
+@pytest.mark.parametrize('due_in, expected', [
+    (None, 3600),
+    (timedelta(minutes=10), 600),
+    (timedelta(hours=5), 3600),
+    (-timedelta(minutes=5), 1),
+])
+def test_scheduler_sleeps_until_the_next_due_row(due_in, expected):
+    scheduler = FollowUpScheduler(check_interval=3600)
+    next_due = None if due_in is None else datetime.now(pytz.UTC) + due_in
+    scheduler.manager = SimpleNamespace(next_followup_due=lambda: next_due)
+
+    assert scheduler.seconds_until_next_due() == pytest.approx(expected, abs=1)
@@ -0,0 +1,48 @@
+import pytest
+
+from src.email_management.src.lib.html_extract import extract_first_message
+
+
+def test_outlook_body_is_cut_after_the_first_element_to_proof():
+    body = (
+        '<html><body><div dir="ltr"><div class="elementToProof">Hi Anna,<br><div>Tuesday works.</div></div>'
+        '<div id="appendonsend"></div><div id="divRplyFwdMsg"><b>From:</b> Anna</div>'
+        '<div class="elementToProof">Quick question about automation</div></div></body></html>'
+    )
+    assert extract_first_message(body) == 'Hi Anna,\nTuesday works.'
+
+
+@pytest.mark.parametrize('quote', [
+    '<blockquote>Quick question about automation</blockquote>',
+    '<div class="gmail_quote"><div class="gmail_attr">On Mon, Anna wrote:</div>Quick question</div>',
+    '<div id="divRplyFwdMsg"><b>From:</b> Anna</div><div>Quick question</div>',
+    '<hr id="stopSpelling"><div>Quick question</div>',
+])
+def test_html_body_is_cut_at_the_quote_marker(quote):
+    body = f'<div dir="ltr"><div>Sounds good,</div><div>call me Thursday.</div></div>{quote}'
+    assert extract_first_message(body) == 'Sounds good,\ncall me Thursday.'
+
+
+@pytest.mark.parametrize('header', [
+    'On Mon, 12 Oct 2026 at 09:14, Anna Berg <anna.berg@veloxforce.de> wrote:',
+    'Am Mo., 12. Okt. 2026 um 09:14 Uhr schrieb Anna Berg <anna.berg@veloxforce.de>:',
+    'Op ma 12 okt 2026 om 09:14 schreef Anna Berg <anna.berg@veloxforce.de>:',
+    'El lun, 12 oct 2026 a las 9:14, Anna Berg (<anna.berg@veloxforce.de>) escribió:',
+    '-----Original Message-----',
+    '-----Ursprüngliche Nachricht-----',
+    'Van: Anna Berg <anna.berg@veloxforce.de>',
+])
+def test_plain_text_is_cut_at_the_quote_header(header):
+    body = f'Sounds good, call me Thursday.\n\n{header}\n> Quick question about automation\n'
+    assert extract_first_message(body) == 'Sounds good, call me Thursday.'
+
+
+def test_plain_text_is_cut_at_the_first_quoted_line():
+    assert extract_first_message('Not interested.\n> Quick question\n> Anna') == 'Not interested.'
+
+
+def test_body_without_a_marker_is_kept_whole():
+    assert extract_first_message('<div><p>Sounds good,</p><p>call me Thursday.</p></div>') == \
+        'Sounds good,\ncall me Thursday.'
+    assert extract_first_message('Sounds good,\ncall me Thursday.') == 'Sounds good,\ncall me Thursday.'
+    assert extract_first_message(None) == ''
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+
+import src.email_management.src.lib.llm_cache as llm_cache_module
+from src.email_management.src.lib.llm_cache import LLMCache, make_key
+
+MODEL = 'gpt-4o-2024-08-06'
+PROMPT = 'Classify the reply to our cold email.'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(llm_cache_module, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return LLMCache(str(tmp_path / 'llm_cache.db'), ttl=3600, max_entries=3, evict_every=1000)
+
+
+def test_entries_expire_after_the_ttl(cache, clock):
+    cache.put('k1', {'level_of_interest': 'high'}, latency=1.5)
+    clock.now += 3599
+    assert cache.get('k1') == {'level_of_interest': 'high'}
+
+    clock.now += 2
+    assert cache.get('k1') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_ratio': 0.5, 'latency_saved_seconds': 1.5}
+
+    cache.evict()
+    assert cache.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 0
+
+
+def test_least_recently_used_entries_are_evicted_at_the_cap(cache, clock):
+    for n in range(1, 4):
+        cache.put(f'k{n}', n)
+        clock.now += 1
+    # k1 is used again, so k2 is now the least recently used
+    assert cache.get('k1') == 1
+    clock.now += 1
+    cache.put('k4', 4)
+    cache.put('k5', 5)
+    cache.evict()
+
+    assert {key: cache.get(key) for key in ('k1', 'k2', 'k3', 'k4', 'k5')} == \
+        {'k1': 1, 'k2': None, 'k3': None, 'k4': 4, 'k5': 5}
+
+
+def test_eviction_runs_every_evict_every_puts(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / 'llm_cache.db'), ttl=3600, max_entries=2, evict_every=4)
+    for n in range(4):
+        cache.put(f'k{n}', n)
+        clock.now += 1
+    assert cache.conn.execute("SELECT key FROM llm_cache ORDER BY key").fetchall() == [('k2',), ('k3',)]
+
+
+def test_keys_separate_models_and_prompt_versions():
+    key = make_key(MODEL, PROMPT, 'Sounds  interesting,\nTell me more')
+    # Only case and whitespace of the body are normalized away
+    assert key == make_key(MODEL, PROMPT, 'sounds interesting, tell me more')
+    assert key != make_key('gpt-4o-mini', PROMPT, 'sounds interesting, tell me more')
+    assert key != make_key(MODEL, PROMPT + ' Answer in JSON.', 'sounds interesting, tell me more')
+    assert key != make_key(MODEL, PROMPT, 'not interested')
+
+
+def test_cache_survives_a_reopen(cache, tmp_path):
+    cache.put(make_key(MODEL, PROMPT, 'tell me more'), {'is_related': True})
+    reopened = LLMCache(str(tmp_path / 'llm_cache.db'), ttl=3600)
+    assert reopened.get(make_key(MODEL, PROMPT, 'Tell me more')) == {'is_related': True}
+    assert reopened.get(make_key('gpt-4o-mini', PROMPT, 'tell me more')) is None
@@ -0,0 +1,67 @@
+import gzip
+import os
+from datetime import date
+
+import pytest
+
+import src.email_management.src.lib.outbound_log as outbound_log_module
+from src.email_management.src.lib.outbound_log import OutboundLogWriter, read_outbound_log
+
+
+class FakeDatetime:
+    """datetime.now() for the writer, moved by the test"""
+
+    today = None
+
+    @classmethod
+    def now(cls):
+        return cls.today
+
+
+def entry(campaign_id, recipient, sender='anna@veloxforce.de'):
+    return {'status': 'sent', 'email_data': {'campaign_id': campaign_id, 'sender': sender, 'recipient': recipient}}
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    monkeypatch.setattr(outbound_log_module, 'datetime', FakeDatetime)
+    return OutboundLogWriter(log_dir=str(tmp_path), buffer_size=2, archive=True)
+
+
+def test_round_trip_across_a_rotated_day(writer, tmp_path):
+    FakeDatetime.today = date(2026, 10, 15)
+    writer.write(entry('c1', 'lead1@example.com'))
+    writer.write(entry('c2', 'lead2@example.com'))
+    writer.write(entry('c1', 'lead3@example.com'))
+    FakeDatetime.today = date(2026, 10, 16)
+    writer.write(entry('c1', 'lead4@example.com', sender='jan@veloxforce.de'))
+    writer.flush()
+
+    assert sorted(os.listdir(tmp_path)) == ['initial_sendinglog_20261015.jsonl.gz', 'initial_sendinglog_20261016.jsonl']
+    with gzip.open(tmp_path / 'initial_sendinglog_20261015.jsonl.gz', 'rt') as f:
+        assert len(f.readlines()) == 3
+
+    recipients = lambda **filters: [e['email_data']['recipient'] for e in read_outbound_log(str(tmp_path), **filters)]
+    assert recipients() == [f'lead{n}@example.com' for n in range(1, 5)]
+    assert recipients(campaign_id='c1') == ['lead1@example.com', 'lead3@example.com', 'lead4@example.com']
+    assert recipients(sender='jan@veloxforce.de') == ['lead4@example.com']
+    assert recipients(campaign_id='c1', start=date(2026, 10, 16)) == ['lead4@example.com']
+
+
+@pytest.mark.parametrize('campaign_id', ['Q4 "Automation" push', 'path\\to\\list', 'Frühjahr ünd ñ', 'tab\tseparated'])
+def test_campaign_ids_that_json_escapes_are_found(writer, tmp_path, campaign_id):
+    FakeDatetime.today = date(2026, 10, 15)
+    writer.write(entry(campaign_id, 'lead1@example.com'))
+    writer.write(entry('c2', 'lead2@example.com'))
+    writer.flush()
+
+    assert [e['email_data']['recipient'] for e in read_outbound_log(str(tmp_path), campaign_id=campaign_id)] == \
+        ['lead1@example.com']
+
+
+def test_ascii_escaped_lines_are_found(tmp_path):
+    # Written by json.dumps with its default ensure_ascii=True
+    (tmp_path / 'initial_sendinglog_20261015.jsonl').write_text(
+        '{"email_data": {"campaign_id": "Fr\\u00fchjahr", "recipient": "lead1@example.com"}}\n'
+    )
+    assert len(list(read_outbound_log(str(tmp_path), campaign_id='Frühjahr'))) == 1
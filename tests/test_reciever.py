@@ -0,0 +1,67 @@
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import src.email_management.reciever as reciever
+
+ACCOUNTS = [{'email': f'{name}@veloxforce.de'} for name in ('anna', 'jan', 'sanne')]
+EARLIER = datetime(2026, 10, 12, 8, 0, tzinfo=timezone.utc)
+STARTED = datetime(2026, 10, 12, 9, 0, tzinfo=timezone.utc)
+
+
+class FakeBuffer:
+    def __init__(self, batch_size, strict, fail=False):
+        self.fail = fail
+
+    def flush(self):
+        if self.fail:
+            raise RuntimeError('duplicate key value violates unique constraint')
+
+
+@pytest.fixture
+def poll(tmp_path, monkeypatch):
+    """Runs reciever.main with jan's mailbox failing, returns the saved cursors and delta tokens"""
+    last_run_file = tmp_path / 'last_run.json'
+    last_run_file.write_text(json.dumps({'mailboxes': {a['email']: EARLIER.isoformat() for a in ACCOUNTS}}))
+    saved_tokens = {}
+
+    def fetch_mailbox(account, size, timeout):
+        if account['email'] == 'jan@veloxforce.de':
+            raise TimeoutError('graph.microsoft.com timed out')
+        return STARTED, [{'id': f"AAMk-{account['email']}"}], {'inbox': f"https://graph/delta?{account['email']}"}
+
+    monkeypatch.setattr(reciever, 'LAST_RUN_FILE', str(last_run_file))
+    monkeypatch.setattr(reciever, 'get_worker_accounts', lambda: ACCOUNTS)
+    monkeypatch.setattr(reciever, 'fetch_mailbox', fetch_mailbox)
+    monkeypatch.setattr(reciever, 'process_raw_email', lambda raw, buffer: {'email_id': raw['id']})
+    monkeypatch.setattr(reciever, 'mark_conversations_replied', lambda incoming: 0)
+    monkeypatch.setattr(reciever, 'sequence_engine', SimpleNamespace(handle_incoming=lambda emails: 0))
+    monkeypatch.setattr(reciever, 'save_delta_tokens', lambda mailbox, links: saved_tokens.update({mailbox: links}))
+
+    def run(flush_fails=False):
+        monkeypatch.setattr(reciever, 'EmailRecordBuffer', lambda **kwargs: FakeBuffer(fail=flush_fails, **kwargs))
+        emails = reciever.main(size=10)
+        cursors = json.loads(last_run_file.read_text())['mailboxes']
+        return emails, {mailbox: datetime.fromisoformat(at) for mailbox, at in cursors.items()}, saved_tokens
+
+    return run
+
+
+def test_failed_mailbox_keeps_its_cursor(poll, caplog):
+    emails, cursors, tokens = poll()
+
+    assert len(emails) == 2
+    assert cursors == {'anna@veloxforce.de': STARTED, 'jan@veloxforce.de': EARLIER, 'sanne@veloxforce.de': STARTED}
+    assert set(tokens) == {'anna@veloxforce.de', 'sanne@veloxforce.de'}
+    failure, = [record for record in caplog.records if record.name == reciever.__name__]
+    assert failure.getMessage() == 'Failed to fetch jan@veloxforce.de' and failure.exc_info
+
+
+def test_failed_flush_moves_no_cursor(poll):
+    emails, cursors, tokens = poll(flush_fails=True)
+
+    assert emails == []
+    assert set(cursors.values()) == {EARLIER}
+    assert tokens == {}
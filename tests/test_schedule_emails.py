@@ -0,0 +1,93 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+import src.email_management.sender as sender
+from src.email_management.scheduler.models.sending_rules import SendingRules
+
+ACCOUNT = 'worker@veloxforce.de'
+AMSTERDAM = pytz.timezone('Europe/Amsterdam')
+# Friday 16 October 2026, 09:00 in Amsterdam
+NOW = datetime(2026, 10, 16, 7, 0, tzinfo=pytz.UTC)
+# Business hours inside one schedule day (07:00 to 07:00 UTC), so each open
+# day takes exactly the daily limit
+HOURS = {'allowed_hours': {'start': '09:00', 'end': '18:00'}}
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW.astimezone(tz) if tz else NOW.replace(tzinfo=None)
+
+
+class Account:
+    daily_limit = 2
+
+
+def make_emails(count):
+    return [
+        {'email_recipient': f'lead{n}@example.nl', 'time_zone': 'Europe/Amsterdam',
+         'email_content': 'Quick question about automation', 'language': 'en'}
+        for n in range(count)
+    ]
+
+
+def schedule(emails, rules, queued=()):
+    tracker = {'sending_accounts': {}, 'campaigns': {'c1': {}}}
+    if queued:
+        sender.initialize_sender_in_tracker(tracker, ACCOUNT, Account.daily_limit)
+        for moment in queued:
+            tracker['sending_accounts'][ACCOUNT]['email_queue'].append(
+                {'campaign_id': 'c0', 'scheduled_time': moment.isoformat(), 'status': 'pending'}
+            )
+            sender.update_daily_schedule_count(tracker, ACCOUNT, moment)
+    unplaced = sender.schedule_emails_optimized(emails, {ACCOUNT: Account()}, tracker, 'c1', rules)
+    queue = tracker['sending_accounts'][ACCOUNT]['email_queue']
+    scheduled = [datetime.fromisoformat(entry['scheduled_time']) for entry in queue if entry['campaign_id'] == 'c1']
+    return scheduled, unplaced, tracker['campaigns']['c1']
+
+
+@pytest.fixture(autouse=True)
+def frozen_now(monkeypatch):
+    monkeypatch.setattr(sender, 'datetime', FrozenDatetime)
+
+
+def test_closed_days_grow_the_window():
+    rules = SendingRules.from_dict({
+        **HOURS,
+        'excluded_days': ['Saturday', 'Sunday'],
+        'holidays': {'NL': ['2026-10-19']},
+    })
+    scheduled, unplaced, campaign = schedule(make_emails(6), rules)
+
+    # Three open days are needed, found on Friday, Tuesday and Wednesday
+    days = Counter(moment.astimezone(AMSTERDAM).date().isoformat() for moment in scheduled)
+    assert days == {'2026-10-16': 2, '2026-10-20': 2, '2026-10-21': 2}
+    assert unplaced == [] and campaign['unplaced_recipients'] == []
+
+
+def test_window_grows_past_slots_taken_by_other_campaigns():
+    rules = SendingRules.from_dict({**HOURS, 'excluded_days': ['Saturday', 'Sunday']})
+    # Friday is already full with another campaign's emails
+    queued = [NOW + timedelta(hours=1), NOW + timedelta(hours=2)]
+    scheduled, unplaced, _ = schedule(make_emails(4), rules, queued)
+
+    days = Counter(moment.astimezone(AMSTERDAM).date().isoformat() for moment in scheduled)
+    assert days == {'2026-10-19': 2, '2026-10-20': 2}
+    assert unplaced == []
+
+
+def test_unplaced_recipients_once_capacity_runs_out(monkeypatch):
+    monkeypatch.setattr(sender, 'MAX_PLANNING_DAYS', 3)
+    rules = SendingRules.from_dict({**HOURS, 'excluded_days': []})
+    emails = make_emails(10)
+    scheduled, unplaced, campaign = schedule(emails, rules)
+
+    # Two per day over the three days the window may span
+    assert len(scheduled) == 6
+    assert max(scheduled) < NOW + timedelta(days=3)
+    assert unplaced == emails[6:]
+    assert campaign['emails_unplaced'] == 4
+    assert campaign['unplaced_recipients'] == [email['email_recipient'] for email in emails[6:]]
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+import src.email_management.sender as sender
+from src.email_management.scheduler.dispatcher import SendDispatcher
+from src.email_management.scheduler.utils.tracker_store import TrackerStore
+
+ACCOUNT = 'worker@veloxforce.de'
+
+
+class BlockingSender:
+    """Sends succeed once `release` is set, like a send stuck behind a rate limit"""
+
+    daily_limit = 30
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.sent = []
+
+    def send_email(self, recipient, subject, body, time_zone=None, headers=None):
+        self.release.wait(5)
+        self.sent.append(recipient)
+        return True, {'message_id': f'<{recipient}>'}
+
+
+class NullLog:
+    def write(self, entry):
+        pass
+
+    def flush(self):
+        pass
+
+
+class NullBuffer(NullLog):
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def add(self, record, kind):
+        pass
+
+
+def queue_entry(recipient, campaign_id):
+    return {
+        "campaign_id": campaign_id,
+        "scheduled_time": (datetime.now(pytz.UTC) - timedelta(minutes=1)).isoformat(),
+        "status": "pending",
+        "email_data": {"email_recipient": recipient, "subjectline": "Quick question", "email_content": "Hi"},
+    }
+
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    monkeypatch.setattr(sender, 'tracker_store', TrackerStore(str(tmp_path / 'sending_tracker.db')))
+    monkeypatch.setattr(sender, 'outbound_log', NullLog())
+    monkeypatch.setattr(sender, 'EmailRecordBuffer', NullBuffer)
+    monkeypatch.setattr(sender.smtp_pool, 'prune', lambda: 0)
+    monkeypatch.setattr(sender, 'dispatcher', SendDispatcher())
+    return {
+        "sending_accounts": {ACCOUNT: {
+            "daily_limit": 30, "time_between_emails": 0, "daily_schedule_count": {},
+            "email_queue": [queue_entry('lead1@example.com', 'c1')],
+        }},
+        "campaigns": {campaign_id: {"emails_sent": 0, "emails_failed": 0} for campaign_id in ('c1', 'c2')},
+    }
+
+
+def test_campaign_added_while_draining_joins_the_run(tracker):
+    blocking = BlockingSender()
+
+    async def scenario():
+        run = asyncio.create_task(sender.process_scheduled_emails(tracker, {ACCOUNT: blocking}))
+        # The dispatcher has handed the first email over and stopped, the
+        # worker is still busy with it
+        while sender.dispatcher.running or not sender.dispatcher.stats()['in_flight']:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        assert sender.active_tracker is tracker
+
+        # What entrypoint does for a campaign scheduled meanwhile
+        with sender._tracker_lock:
+            tracker["sending_accounts"][ACCOUNT]["email_queue"].append(queue_entry('lead2@example.com', 'c2'))
+            assert sender.dispatcher.load(tracker) == 1
+
+        blocking.release.set()
+        await asyncio.wait_for(run, 5)
+
+    asyncio.run(scenario())
+    assert blocking.sent == ['lead1@example.com', 'lead2@example.com']
+    assert tracker["sending_accounts"][ACCOUNT]["email_queue"] == []
+    assert sender.active_tracker is None
+
+
+def test_entrypoint_plans_under_the_tracker_lock(tracker, monkeypatch):
+    locked = []
+    plan = sender.schedule_emails_optimized
+
+    def schedule(*args, **kwargs):
+        locked.append(sender._tracker_lock.locked())
+        return plan(*args, **kwargs)
+
+    monkeypatch.setattr(sender, 'schedule_emails_optimized', schedule)
+    monkeypatch.setattr(sender, 'initialize_email_senders', lambda: {ACCOUNT: BlockingSender()})
+    # A send loop owns the tracker, the campaign joins it
+    monkeypatch.setattr(sender, 'active_tracker', tracker)
+    emails = [{'email_recipient': 'lead3@example.com', 'time_zone': 'Europe/Amsterdam',
+               'email_content': 'Hi there,\nbody', 'language': 'en', 'subjectline': 'Quick question'}]
+
+    assert asyncio.run(sender.entrypoint(emails, 'c3'))
+    assert locked == [True]
+    assert len(tracker["sending_accounts"][ACCOUNT]["email_queue"]) == 2
+    assert sender.dispatcher.stats()['queued'] == 2
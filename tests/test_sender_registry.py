@@ -0,0 +1,91 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from src.email_management.src.lib.sender_registry import SenderRegistry
+
+ENV_KEYS = ['WORKER_EMAILS_COUNT', 'EMAILS_COUNT'] + [
+    f'{name}_{slot}' for slot in range(1, 5)
+    for name in ('MS365_EMAIL', 'MS365_APP_PASSWORD', 'DAILY_LIMIT', 'REGION', 'CLIENT_ID', 'CLIENT_SECRET', 'TENANT_ID')
+]
+
+
+def write_env(path, mtime, **overrides):
+    values = {'WORKER_EMAILS_COUNT': 3, 'EMAILS_COUNT': 2}
+    for slot, email in enumerate(['Anna@veloxforce.de', 'jan@veloxforce.nl', 'sanne@veloxforce.nl',
+                                  'tom@veloxforceai.com'], start=1):
+        values.update({f'MS365_EMAIL_{slot}': email, f'DAILY_LIMIT_{slot}': 30, f'CLIENT_ID_{slot}': f'client-{slot}'})
+    values.update(overrides)
+    path.write_text(''.join(f'{key}={value}\n' for key, value in values.items() if value is not None))
+    os.utime(path, (mtime, mtime))
+
+
+def make_registry(env_path):
+    built = []
+
+    def factory(config):
+        sender = SimpleNamespace(email=config.email, daily_limit=config.daily_limit)
+        built.append(sender)
+        return sender
+
+    registry = SenderRegistry(str(env_path), check_interval=0, sender_factory=factory)
+    registry.built = built
+    return registry
+
+
+@pytest.fixture
+def env_path(tmp_path, monkeypatch):
+    # load_dotenv writes into os.environ, undo it after the test
+    for key in ENV_KEYS:
+        monkeypatch.delenv(key, raising=False)
+    return tmp_path / '.env'
+
+
+def test_each_accessor_sees_its_own_slots(env_path):
+    write_env(env_path, 1_000_000)
+    registry = make_registry(env_path)
+
+    # WORKER_EMAILS_COUNT=3 for campaigns and polling, EMAILS_COUNT=2 for replies
+    assert list(registry.senders()) == ['Anna@veloxforce.de', 'jan@veloxforce.nl', 'sanne@veloxforce.nl']
+    assert [account['email'] for account in registry.accounts()] == list(registry.senders())
+    assert registry.accounts()[1]['client_id'] == 'client-2'
+
+    assert registry.get('anna@VELOXFORCE.de').email == 'Anna@veloxforce.de'
+    assert registry.get('jan@veloxforce.nl').email == 'jan@veloxforce.nl'
+    assert registry.get('sanne@veloxforce.nl') is None
+    assert registry.get('tom@veloxforceai.com') is None
+    assert registry.get(None) is None
+
+
+def test_slot_defaults_when_worker_count_is_unset(env_path):
+    write_env(env_path, 1_000_000, WORKER_EMAILS_COUNT=None)
+    registry = make_registry(env_path)
+
+    # Campaigns default to 5 slots, polling to none
+    assert len(registry.senders()) == 4
+    assert registry.accounts() == []
+    assert registry.get('jan@veloxforce.nl') is not None
+    assert registry.get('sanne@veloxforce.nl') is None
+
+
+def test_reload_keeps_unchanged_senders(env_path):
+    write_env(env_path, 1_000_000)
+    registry = make_registry(env_path)
+    before = registry.senders()
+    assert len(registry.built) == 3
+
+    # Unchanged mtime, nothing is re-read
+    registry.senders()
+    assert len(registry.built) == 3
+
+    write_env(env_path, 1_000_100, DAILY_LIMIT_2=50, WORKER_EMAILS_COUNT=4)
+    after = registry.senders()
+
+    assert list(after) == ['Anna@veloxforce.de', 'jan@veloxforce.nl', 'sanne@veloxforce.nl', 'tom@veloxforceai.com']
+    assert after['Anna@veloxforce.de'] is before['Anna@veloxforce.de']
+    assert after['sanne@veloxforce.nl'] is before['sanne@veloxforce.nl']
+    # Only the account whose configuration changed is rebuilt, plus the new slot
+    assert after['jan@veloxforce.nl'] is not before['jan@veloxforce.nl']
+    assert after['jan@veloxforce.nl'].daily_limit == 50
+    assert len(registry.built) == 5
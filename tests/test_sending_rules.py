@@ -0,0 +1,43 @@
+import json
+import os
+
+import pytest
+
+from src.email_management.scheduler.models.sending_rules import RulesFile
+
+
+def write_rules(path, daily_limit, mtime):
+    path.write_text(json.dumps({
+        'default': {'daily_limit_per_sender': daily_limit},
+        'campaigns': {'c1': {'min_time_between_emails': 30}},
+    }))
+    os.utime(path, (mtime, mtime))
+
+
+def test_edits_are_picked_up(tmp_path):
+    path = tmp_path / 'sending_rules.json'
+    write_rules(path, 30, 1_000_000)
+    rules_file = RulesFile(str(path), check_interval=0)
+    base, campaigns = rules_file.current()
+    assert base.daily_limit_per_sender == 30 and campaigns['c1']['min_time_between_emails'] == 30
+
+    write_rules(path, 50, 1_000_100)
+    assert rules_file.current()[0].daily_limit_per_sender == 50
+
+
+def test_invalid_edit_keeps_previous_rules(tmp_path):
+    path = tmp_path / 'sending_rules.json'
+    write_rules(path, 30, 1_000_000)
+    rules_file = RulesFile(str(path), check_interval=0)
+    rules_file.current()
+
+    path.write_text('{"default": ')
+    os.utime(path, (1_000_100, 1_000_100))
+    assert rules_file.current()[0].daily_limit_per_sender == 30
+
+
+def test_invalid_file_fails_first_load(tmp_path):
+    path = tmp_path / 'sending_rules.json'
+    path.write_text('{"default": ')
+    with pytest.raises(ValueError):
+        RulesFile(str(path)).current()
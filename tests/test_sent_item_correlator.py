@@ -0,0 +1,62 @@
+from src.email_management.src.lib.sent_item_correlator import PendingSend, SentItemCorrelator
+
+ACCOUNT = 'anna.berg@veloxforce.de'
+
+
+class FakeGraphClient:
+    """Sent items by Message-ID, failing the first `failures` lookups"""
+
+    def __init__(self, message_ids, failures=0):
+        self.items = {
+            message_id: {'id': f'AAMk-{n}', 'internetMessageId': message_id, 'conversationId': f'conv-{n}'}
+            for n, message_id in enumerate(message_ids)
+        }
+        self.failures = failures
+        self.lookups = 0
+
+    def get_sent_emails_by_message_ids(self, account, message_ids):
+        self.lookups += 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('graph.microsoft.com timed out')
+        return {message_id: self.items[message_id] for message_id in message_ids if message_id in self.items}
+
+
+def test_failing_callback_keeps_the_item_for_the_next_pass():
+    stored = {}
+    broken = {'<2@veloxforce.de>'}
+
+    def on_resolved(message_id, graph_headers):
+        if message_id in broken:
+            raise RuntimeError('canceling statement due to statement timeout')
+        stored[message_id] = graph_headers['email_id']
+        return True
+
+    message_ids = ['<1@veloxforce.de>', '<2@veloxforce.de>', '<3@veloxforce.de>']
+    graph = FakeGraphClient(message_ids)
+    correlator = SentItemCorrelator(on_resolved=on_resolved)
+    # Queued directly, enqueue() would start the worker thread
+    for message_id in message_ids:
+        correlator._pending[message_id] = PendingSend(message_id, ACCOUNT, graph)
+
+    assert correlator.resolve_pending() == 2
+    assert stored == {'<1@veloxforce.de>': 'AAMk-0', '<3@veloxforce.de>': 'AAMk-2'}
+    assert list(correlator._pending) == ['<2@veloxforce.de>']
+
+    broken.clear()
+    assert correlator.resolve_pending() == 1
+    assert stored['<2@veloxforce.de>'] == 'AAMk-1'
+    assert correlator.pending_count() == 0
+    # The Graph data was kept, the retry only needed the callback
+    assert graph.lookups == 1
+
+
+def test_failed_lookup_is_retried():
+    graph = FakeGraphClient(['<1@veloxforce.de>'], failures=1)
+    correlator = SentItemCorrelator(on_resolved=lambda message_id, graph_headers: True)
+    correlator._pending['<1@veloxforce.de>'] = PendingSend('<1@veloxforce.de>', ACCOUNT, graph)
+
+    assert correlator.resolve_pending() == 0
+    assert correlator.pending_count() == 1
+    assert correlator.resolve_pending() == 1
+    assert graph.lookups == 2
@@ -0,0 +1,48 @@
+import sys
+from datetime import timedelta
+
+import pytest
+
+from src.email_management.follow_up.sequence_engine import FollowUpSequence, SequenceEngine, name_from_address
+
+
+def sequence(template, subject=None):
+    return FollowUpSequence.from_dict({'stages': [{'delay_days': 3, 'template': template, 'subject': subject}]})
+
+
+@pytest.mark.parametrize('template', [
+    '<style>p { color: red }</style>Hi {recipient_name}',
+    'Hi {first_name}',
+    'Hi {recipient_name',
+])
+def test_invalid_templates_fail_at_load(template):
+    with pytest.raises(ValueError, match='Stage 1'):
+        sequence(template)
+
+
+def test_render_uses_names_from_addresses():
+    engine = SequenceEngine({'default': sequence(
+        '<style>p {{ color: red }}</style>Hi {recipient_name}, {sender_name}', 'Following up: {subject}'
+    )})
+    row = {'recipient': 'jan.de-vries@example.nl', 'sender': 'anna.berg@veloxforce.de', 'subject': 'Re: Quick question'}
+    assert engine.render(row) == ('Following up: Quick question',
+                                  '<style>p { color: red }</style>Hi Jan, Anna Berg')
+
+
+@pytest.mark.parametrize('address', ['info@example.com', 'jdevries@example.com', 'j.devries@example.com', None])
+def test_no_name_without_a_clear_one(address):
+    assert name_from_address(address) is None
+
+
+def test_retry_stops_after_max_attempts(monkeypatch):
+    module = sys.modules[SequenceEngine.__module__]
+    updates = []
+    monkeypatch.setattr(module, 'update_followup_due',
+                        lambda ids, due_at, extra=None: updates.append((ids, due_at, extra)) or len(ids))
+    rows = [{'id': 1, 'followup_attempts': 0}, {'id': 2, 'followup_attempts': 2}]
+    stopped = SequenceEngine({}).retry(rows, timedelta(hours=1), max_attempts=3)
+
+    assert stopped == 1
+    retried, = [u for u in updates if u[1] is not None]
+    assert retried[0] == [1] and retried[2] == {'followup_attempts': 1}
+    assert ([2], None, {'followup_attempts': 3, 'followup_stop_reason': 'send_failed'}) in updates
@@ -0,0 +1,26 @@
+import sys
+
+from src.email_management.benchmarks.fake_postgrest import FakePostgrest
+from src.email_management.src.lib.thread_matcher import ThreadMatcher
+
+
+def outbound(row_id, sender, recipient, created_at):
+    return {'id': row_id, 'sender': sender, 'recipient': recipient, 'subject': 'Quick question',
+            'conversation_topic': 'Quick question', 'created_at': created_at}
+
+
+def test_addresses_are_matched_literally(monkeypatch):
+    fake = FakePostgrest()
+    fake.load('outbound_email', [
+        outbound(1, 'jan_de@veloxforce.de', 'Lead@Example.com', '2026-10-12T09:00:00+00:00'),
+        # Would match jan_de@ and lead@ if _ and % were wildcards, and is newer
+        outbound(2, 'janxde@veloxforce.de', 'lead@example.com', '2026-10-14T09:00:00+00:00'),
+        outbound(3, 'jan_de@veloxforce.de', 'lead%@example.com', '2026-10-15T09:00:00+00:00'),
+    ])
+    monkeypatch.setattr(sys.modules[ThreadMatcher.__module__].supabase_client, 'client', fake)
+
+    reply = {'sender': 'lead@example.com', 'recipient': 'Jan_De@veloxforce.de', 'subject': 'RE: Quick question'}
+    assert ThreadMatcher().find_parent(reply)['id'] == 1
+
+    reply = {'sender': 'lead%@example.com', 'recipient': 'jan_de@veloxforce.de', 'subject': 'AW: Quick question'}
+    assert ThreadMatcher().find_parent(reply)['id'] == 3
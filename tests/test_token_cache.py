@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+from src.email_management.src.lib.token_cache import GRAPH_SCOPES, TokenCache
+
+
+class FakeAuthority:
+    """Stands in for the MSAL token endpoint, counts and optionally slows requests"""
+
+    def __init__(self, expires_in: int = 3600, delay: float = 0.0):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.requests = []
+        self.apps = []
+        self.fail = False
+        self._lock = threading.Lock()
+
+    def app_factory(self, client_id: str, client_secret: str, tenant_id: str):
+        authority = self
+
+        class FakeApp:
+            def acquire_token_for_client(self, scopes):
+                time.sleep(authority.delay)
+                with authority._lock:
+                    authority.requests.append((tenant_id, client_id, client_secret, tuple(scopes)))
+                    n = len(authority.requests)
+                if authority.fail:
+                    return {"error": "invalid_client", "error_description": "bad secret"}
+                return {"access_token": f"token-{n}", "expires_in": authority.expires_in}
+
+        self.apps.append((tenant_id, client_id, client_secret))
+        return FakeApp()
+
+
+@pytest.fixture
+def authority():
+    return FakeAuthority()
+
+
+def test_reuses_token_until_refresh_margin(authority):
+    cache = TokenCache(app_factory=authority.app_factory)
+
+    tokens = {cache.get_token("tenant", "client", "secret") for _ in range(5)}
+
+    assert tokens == {"token-1"}
+    assert len(authority.requests) == 1
+    assert cache.stats()["hits"] == 4
+    assert cache.stats()["misses"] == 1
+
+
+def test_refreshes_in_background_inside_margin():
+    authority = FakeAuthority(expires_in=60)
+    cache = TokenCache(refresh_margin=300, app_factory=authority.app_factory)
+
+    assert cache.get_token("tenant", "client", "secret") == "token-1"
+    # Still valid, so the old token is returned while the next one is fetched
+    assert cache.get_token("tenant", "client", "secret") == "token-1"
+    for _ in range(100):
+        if len(authority.requests) == 2:
+            break
+        time.sleep(0.01)
+
+    assert cache.get_token("tenant", "client", "secret") == "token-2"
+    assert cache.stats()["refreshes"] >= 1
+
+
+def test_concurrent_misses_share_one_request():
+    authority = FakeAuthority(delay=0.1)
+    cache = TokenCache(app_factory=authority.app_factory)
+    results = []
+
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_token("tenant", "client", "secret")))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["token-1"] * 10
+    assert len(authority.requests) == 1
+
+
+def test_scopes_are_part_of_the_key(authority):
+    cache = TokenCache(app_factory=authority.app_factory)
+    other_scopes = ["https://outlook.office365.com/.default"]
+
+    graph = cache.get_token("tenant", "client", "secret", GRAPH_SCOPES)
+    outlook = cache.get_token("tenant", "client", "secret", other_scopes)
+
+    assert graph != outlook
+    assert [request[3] for request in authority.requests] == [tuple(GRAPH_SCOPES), tuple(other_scopes)]
+    # Both scope sets share one MSAL app
+    assert len(authority.apps) == 1
+
+
+def test_tenants_and_clients_are_cached_separately(authority):
+    cache = TokenCache(app_factory=authority.app_factory)
+
+    cache.get_token("tenant-a", "client", "secret")
+    cache.get_token("tenant-b", "client", "secret")
+    cache.get_token("tenant-a", "client-2", "secret")
+    cache.get_token("tenant-a", "client", "secret")
+
+    assert len(authority.requests) == 3
+
+
+def test_secret_change_drops_old_tokens(authority):
+    cache = TokenCache(app_factory=authority.app_factory)
+
+    assert cache.get_token("tenant", "client", "old") == "token-1"
+    assert cache.get_token("tenant", "client", "new") == "token-2"
+    assert authority.requests[-1][2] == "new"
+
+
+def test_invalidate_forces_a_new_token(authority):
+    cache = TokenCache(app_factory=authority.app_factory)
+
+    cache.get_token("tenant", "client", "secret")
+    cache.invalidate("tenant", "client")
+
+    assert cache.get_token("tenant", "client", "secret") == "token-2"
+
+
+def test_failure_is_counted_and_not_cached(authority):
+    cache = TokenCache(app_factory=authority.app_factory)
+    authority.fail = True
+
+    assert cache.get_token("tenant", "client", "secret") is None
+    assert cache.stats()["failures"] == 1
+
+    authority.fail = False
+    assert cache.get_token("tenant", "client", "secret") == "token-2"
@@ -0,0 +1,22 @@
+from src.email_management.scheduler.utils.rate_limiter import TokenBucket
+from src.email_management.scheduler.utils.tracker_store import TrackerStore
+
+SENDER = 'worker@veloxforce.de'
+
+
+def test_sends_of_the_day_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'sending_tracker.db')
+    store = TrackerStore(path)
+    store.save({"campaigns": {"c1": {"status": "new", "total_emails": 3}}})
+    store.record_send(None, "c1", "emails_sent", SENDER)
+    store.record_send(None, "c1", "emails_failed", SENDER)
+    store.record_send(None, "c1", "emails_sent")
+    store.close()
+
+    restarted = TrackerStore(path)
+    assert restarted.sent_today(SENDER) == 2
+    assert restarted.sent_today('other@veloxforce.de') == 0
+
+    bucket = TokenBucket(interval=0, daily_limit=2, sent_today=restarted.sent_today(SENDER))
+    assert not bucket.try_acquire()
+    restarted.close()